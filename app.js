@@ -24,11 +24,114 @@ const formatNumber = (value) => {
     return new Intl.NumberFormat('en-US').format(value);
 };
 
+// Pre-aggregated data written by export_static.py; the page only sums a few
+// short per-category arrays and draws them
+const DATA_URL = 'static_data/manifest.json';
+
+// Day names in the order of the exported weekday arrays (Monday first)
+const dayNames = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+
+let manifest = null;
+const periodData = {};
+
+// Aggregates for one period, fetched the first time it is selected when exported as shards
+async function loadPeriod(timePeriod) {
+    if (!periodData[timePeriod]) {
+        const entry = manifest.periods.find(period => period.value === timePeriod);
+        if (entry.data) {
+            periodData[timePeriod] = entry.data;
+        } else {
+            const response = await fetch(new URL(entry.file, new URL(DATA_URL, window.location.href)));
+            periodData[timePeriod] = await response.json();
+        }
+    }
+    return periodData[timePeriod];
+}
+
+// Element-wise sum of the rows for which keep(row, index) is true
+const sumRows = (rows, keep) => {
+    const total = Array(rows.length ? rows[0].length : 0).fill(0);
+    rows.forEach((row, index) => {
+        if (keep(row, index)) {
+            row.forEach((value, i) => { total[i] += value; });
+        }
+    });
+    return total;
+};
+
+// Combine a period's per-category and per-bitmask aggregates for the selected categories
+function selectView(data, selectedCategories) {
+    // Selecting no categories shows all of them, as in the Dash app
+    const selected = data.categories.map(category =>
+        selectedCategories.length === 0 || selectedCategories.includes(category));
+    const selectedMask = selected.reduce((mask, isSelected, code) =>
+        isSelected ? mask | (1n << BigInt(code)) : mask, 0n);
+    
+    // Revenue is split per category; transaction counts per category bitmask,
+    // of which a selection counts every bitmask it intersects
+    const byCategory = rows => sumRows(rows, (_, code) => selected[code]);
+    const byMask = rows => sumRows(rows, (_, index) => (BigInt(data.masks[index]) & selectedMask) !== 0n);
+    
+    const productSales = {};
+    data.products.names.forEach((name, index) => {
+        if (selected[data.products.categories[index]]) {
+            productSales[name] = (productSales[name] || 0) + data.products.revenue[index];
+        }
+    });
+    
+    const histograms = data.customer_frequency.histograms;
+    const allMask = ((1n << BigInt(data.categories.length)) - 1n).toString();
+    
+    return {
+        title: data.title,
+        frequency: data.frequency,
+        dates: data.dates,
+        revenue: byCategory(data.revenue),
+        transactions: byMask(data.transactions),
+        totalRevenue: data.revenue_total.reduce((sum, value, code) => selected[code] ? sum + value : sum, 0),
+        categorySales: Object.fromEntries(data.categories
+            .map((category, code) => [category, data.revenue_total[code]])
+            .filter(([, value], code) => selected[code] && value > 0)),
+        productSales: productSales,
+        months: data.month.months,
+        monthCategorySales: Object.fromEntries(data.categories
+            .map((category, code) => [category, data.month.revenue[code]])
+            .filter(([, values], code) => selected[code] && values.some(value => value > 0))),
+        monthSales: byCategory(data.month.revenue),
+        daySales: byCategory(data.weekday.revenue),
+        dayTransactions: byMask(data.weekday.transactions),
+        frequencyLabels: data.customer_frequency.labels,
+        // Larger category counts only export all categories and single ones;
+        // other combinations show all categories, with a notice
+        frequencyAllCategories: !(selectedMask.toString() in histograms),
+        frequencyCounts: histograms[selectedMask.toString()] || histograms[allMask]
+    };
+}
+
 // Initialize dashboard
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
+    // Missing before export_static.py has run, and blocked when the page is opened from file://
+    try {
+        const response = await fetch(DATA_URL);
+        if (!response.ok) {
+            throw new Error(`${DATA_URL}: ${response.status}`);
+        }
+        manifest = await response.json();
+    } catch (error) {
+        console.error(error);
+        document.getElementById('data-missing').classList.remove('d-none');
+        return;
+    }
+    
+    // Offer only the periods that were exported
+    const exported = manifest.periods.map(period => period.value);
+    Array.from(document.getElementById('time-period').options)
+        .filter(option => !exported.includes(option.value))
+        .forEach(option => option.remove());
+    
     // Populate category checkboxes
     const categoryCheckboxesContainer = document.getElementById('category-checkboxes');
-    allCategories.forEach((category, index) => {
+    manifest.categories.forEach((category, index) => {
         const checkboxDiv = document.createElement('div');
         checkboxDiv.className = 'category-checkbox';
         
@@ -57,7 +160,7 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 // Update dashboard based on filters
-function updateDashboard() {
+async function updateDashboard() {
     // Get selected time period
     const timePeriod = document.getElementById('time-period').value;
     
@@ -65,145 +168,52 @@ function updateDashboard() {
     const selectedCategories = Array.from(document.querySelectorAll('.category-filter:checked'))
         .map(checkbox => checkbox.value);
     
-    // Filter data based on time period
-    let filteredData = [...salesData];
-    
-    if (timePeriod !== 'ALL') {
-        const endDate = new Date(Math.max(...filteredData.map(t => t.date.getTime())));
-        let startDate;
-        
-        if (timePeriod === '30D') {
-            startDate = new Date(endDate);
-            startDate.setDate(endDate.getDate() - 30);
-        } else if (timePeriod === '90D') {
-            startDate = new Date(endDate);
-            startDate.setDate(endDate.getDate() - 90);
-        } else if (timePeriod === '6M') {
-            startDate = new Date(endDate);
-            startDate.setMonth(endDate.getMonth() - 6);
-        } else if (timePeriod === '1Y') {
-            startDate = new Date(endDate);
-            startDate.setFullYear(endDate.getFullYear() - 1);
-        }
-        
-        filteredData = filteredData.filter(transaction => transaction.date >= startDate);
-    }
-    
-    // Filter by selected categories
-    if (selectedCategories.length > 0 && selectedCategories.length < allCategories.length) {
-        filteredData = filteredData.map(transaction => {
-            const filteredItems = transaction.items.filter(item => 
-                selectedCategories.includes(item.category)
-            );
-            
-            if (filteredItems.length === 0) {
-                return null;
-            }
-            
-            return {
-                ...transaction,
-                items: filteredItems,
-                totalAmount: filteredItems.reduce((sum, item) => sum + item.totalPrice, 0) - transaction.discount
-            };
-        }).filter(transaction => transaction !== null);
-    }
-    
-    // Create flattened data for analysis
-    const flatData = filteredData.flatMap(transaction => 
-        transaction.items.map(item => ({
-            transactionId: transaction.transactionId,
-            date: transaction.date,
-            customerId: transaction.customerId,
-            category: item.category,
-            product: item.product,
-            quantity: item.quantity,
-            unitPrice: item.unitPrice,
-            totalPrice: item.totalPrice
-        }))
-    );
+    // Aggregates of the period, combined for the selected categories
+    const view = selectView(await loadPeriod(timePeriod), selectedCategories);
     
     // Update key metrics
-    updateKeyMetrics(filteredData, flatData);
+    updateKeyMetrics(view);
     
     // Update charts
-    updateRevenueTimeChart(filteredData, timePeriod);
-    updateCategorySalesChart(flatData);
-    updateTopProductsChart(flatData);
-    updateSeasonalTrendsChart(flatData);
-    updateWeeklyPatternChart(flatData);
-    updateCustomerFrequencyChart(filteredData);
+    updateRevenueTimeChart(view);
+    updateCategorySalesChart(view);
+    updateTopProductsChart(view);
+    updateSeasonalTrendsChart(view);
+    updateWeeklyPatternChart(view);
+    updateCustomerFrequencyChart(view);
     
     // Update insights
-    updateInsights(filteredData, flatData);
+    updateInsights(view);
 }
 
 // Update key metrics
-function updateKeyMetrics(filteredData, flatData) {
-    // Calculate total revenue
-    const totalRevenue = filteredData.reduce((sum, transaction) => sum + transaction.totalAmount, 0);
+function updateKeyMetrics(view) {
+    // Total revenue
+    const totalRevenue = view.totalRevenue;
     document.getElementById('total-revenue').textContent = formatCurrency(totalRevenue);
     
-    // Calculate total transactions
-    const totalTransactions = filteredData.length;
+    // Total transactions
+    const totalTransactions = view.transactions.reduce((sum, count) => sum + count, 0);
     document.getElementById('total-transactions').textContent = formatNumber(totalTransactions);
     
     // Calculate average basket size
-    const avgBasketSize = totalRevenue / totalTransactions;
+    const avgBasketSize = totalTransactions ? totalRevenue / totalTransactions : 0;
     document.getElementById('avg-basket-size').textContent = formatCurrency(avgBasketSize);
 }
 
 // Update revenue over time chart
-function updateRevenueTimeChart(filteredData, timePeriod) {
-    // Group data by appropriate time period
-    let timeFormat, groupingFunction;
-    
-    if (timePeriod === '30D' || timePeriod === '90D') {
-        // Group by day for shorter periods
-        timeFormat = 'MMM D, YYYY';
-        groupingFunction = date => date.toISOString().split('T')[0];
-    } else if (timePeriod === '6M') {
-        // Group by week for medium periods
-        timeFormat = 'MMM D, YYYY';
-        groupingFunction = date => {
-            const weekStart = new Date(date);
-            weekStart.setDate(date.getDate() - date.getDay());
-            return weekStart.toISOString().split('T')[0];
-        };
-    } else {
-        // Group by month for longer periods
-        timeFormat = 'MMM YYYY';
-        groupingFunction = date => `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
-    }
-    
-    // Group data by time period
-    const revenueByTime = {};
-    const transactionsByTime = {};
-    
-    filteredData.forEach(transaction => {
-        const timeKey = groupingFunction(transaction.date);
-        
-        if (!revenueByTime[timeKey]) {
-            revenueByTime[timeKey] = 0;
-            transactionsByTime[timeKey] = 0;
-        }
-        
-        revenueByTime[timeKey] += transaction.totalAmount;
-        transactionsByTime[timeKey]++;
-    });
-    
-    // Convert to arrays for Chart.js
-    const timeLabels = Object.keys(revenueByTime).sort();
-    const revenueData = timeLabels.map(key => revenueByTime[key]);
-    const transactionData = timeLabels.map(key => transactionsByTime[key]);
+function updateRevenueTimeChart(view) {
+    // Daily bins for short periods, weekly for six months, monthly beyond
+    const revenueData = view.revenue;
+    const transactionData = view.transactions;
     
     // Format labels based on time period
-    const formattedLabels = timeLabels.map(key => {
-        if (timeFormat === 'MMM YYYY') {
-            const [year, month] = key.split('-');
-            const date = new Date(parseInt(year), parseInt(month) - 1, 1);
+    const formattedLabels = view.dates.map(key => {
+        const date = new Date(`${key}T00:00:00`);
+        if (view.frequency === 'M') {
             return date.toLocaleDateString('en-US', { month: 'short', year: 'numeric' });
         } else {
-            return new Date(key).toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
+            return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
         }
     });
     
@@ -296,17 +306,8 @@ function updateRevenueTimeChart(filteredData, timePeriod) {
 }
 
 // Update category sales chart
-function updateCategorySalesChart(flatData) {
-    // Group data by category
-    const salesByCategory = {};
-    
-    flatData.forEach(item => {
-        if (!salesByCategory[item.category]) {
-            salesByCategory[item.category] = 0;
-        }
-        
-        salesByCategory[item.category] += item.totalPrice;
-    });
+function updateCategorySalesChart(view) {
+    const salesByCategory = view.categorySales;
     
     // Convert to arrays for Chart.js
     const categories = Object.keys(salesByCategory);
@@ -365,17 +366,8 @@ function updateCategorySalesChart(flatData) {
 }
 
 // Update top products chart
-function updateTopProductsChart(flatData) {
-    // Group data by product
-    const salesByProduct = {};
-    
-    flatData.forEach(item => {
-        if (!salesByProduct[item.product]) {
-            salesByProduct[item.product] = 0;
-        }
-        
-        salesByProduct[item.product] += item.totalPrice;
-    });
+function updateTopProductsChart(view) {
+    const salesByProduct = view.productSales;
     
     // Convert to arrays for Chart.js and sort
     const productEntries = Object.entries(salesByProduct)
@@ -434,34 +426,11 @@ function updateTopProductsChart(flatData) {
 }
 
 // Update seasonal trends chart
-function updateSeasonalTrendsChart(flatData) {
-    // Group data by month and category
-    const salesByMonthCategory = {};
+function updateSeasonalTrendsChart(view) {
     const months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
     
-    flatData.forEach(item => {
-        const month = item.date.getMonth();
-        const category = item.category;
-        
-        const key = `${month}-${category}`;
-        if (!salesByMonthCategory[key]) {
-            salesByMonthCategory[key] = 0;
-        }
-        
-        salesByMonthCategory[key] += item.totalPrice;
-    });
-    
-    // Get unique months and categories in the data
-    const uniqueMonths = [...new Set(flatData.map(item => item.date.getMonth()))].sort();
-    const uniqueCategories = [...new Set(flatData.map(item => item.category))];
-    
-    // Create datasets for each category
-    const datasets = uniqueCategories.map((category, index) => {
-        const data = uniqueMonths.map(month => {
-            const key = `${month}-${category}`;
-            return salesByMonthCategory[key] || 0;
-        });
-        
+    // One line per selected category over the months in the data
+    const datasets = Object.entries(view.monthCategorySales).map(([category, data], index) => {
         return {
             label: category,
             data: data,
@@ -483,7 +452,7 @@ function updateSeasonalTrendsChart(flatData) {
     window.seasonalTrendsChart = new Chart(ctx, {
         type: 'line',
         data: {
-            labels: uniqueMonths.map(month => months[month]),
+            labels: view.months.map(month => months[month - 1]),
             datasets: datasets
         },
         options: {
@@ -516,22 +485,9 @@ function updateSeasonalTrendsChart(flatData) {
 }
 
 // Update weekly pattern chart
-function updateWeeklyPatternChart(flatData) {
-    // Group data by day of week
-    const salesByDay = Array(7).fill(0);
-    const transactionsByDay = Array(7).fill(0);
-    const transactionCounts = {};
-    
-    flatData.forEach(item => {
-        const dayOfWeek = item.date.getDay();
-        salesByDay[dayOfWeek] += item.totalPrice;
-        
-        // Count unique transactions
-        if (!transactionCounts[`${dayOfWeek}-${item.transactionId}`]) {
-            transactionCounts[`${dayOfWeek}-${item.transactionId}`] = true;
-            transactionsByDay[dayOfWeek]++;
-        }
-    });
+function updateWeeklyPatternChart(view) {
+    const salesByDay = view.daySales;
+    const transactionsByDay = view.dayTransactions;
     
     // Create chart
     const ctx = document.getElementById('weekly-pattern-chart').getContext('2d');
@@ -544,7 +500,7 @@ function updateWeeklyPatternChart(flatData) {
     window.weeklyPatternChart = new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'],
+            labels: dayNames,
             datasets: [
                 {
                     label: 'Revenue',
@@ -615,40 +571,11 @@ function updateWeeklyPatternChart(flatData) {
 }
 
 // Update customer frequency chart
-function updateCustomerFrequencyChart(filteredData) {
-    // Count purchases per customer
-    const purchasesPerCustomer = {};
-    
-    filteredData.forEach(transaction => {
-        if (!purchasesPerCustomer[transaction.customerId]) {
-            purchasesPerCustomer[transaction.customerId] = 0;
-        }
-        
-        purchasesPerCustomer[transaction.customerId]++;
-    });
-    
-    // Create frequency bins
-    const frequencyBins = {
-        '1': 0,
-        '2': 0,
-        '3': 0,
-        '4-5': 0,
-        '6-10': 0,
-        '11-20': 0,
-        '21-50': 0,
-        '51+': 0
-    };
-    
-    Object.values(purchasesPerCustomer).forEach(frequency => {
-        if (frequency === 1) frequencyBins['1']++;
-        else if (frequency === 2) frequencyBins['2']++;
-        else if (frequency === 3) frequencyBins['3']++;
-        else if (frequency >= 4 && frequency <= 5) frequencyBins['4-5']++;
-        else if (frequency >= 6 && frequency <= 10) frequencyBins['6-10']++;
-        else if (frequency >= 11 && frequency <= 20) frequencyBins['11-20']++;
-        else if (frequency >= 21 && frequency <= 50) frequencyBins['21-50']++;
-        else frequencyBins['51+']++;
-    });
+function updateCustomerFrequencyChart(view) {
+    // Customers per purchase count bin, precomputed for the selected categories
+    const labels = view.frequencyLabels;
+    const counts = view.frequencyCounts;
+    document.getElementById('customer-frequency-notice').classList.toggle('d-none', !view.frequencyAllCategories);
     
     // Create chart
     const ctx = document.getElementById('customer-frequency-chart').getContext('2d');
@@ -661,10 +588,10 @@ function updateCustomerFrequencyChart(filteredData) {
     window.customerFrequencyChart = new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: Object.keys(frequencyBins),
+            labels: labels,
             datasets: [{
                 label: 'Number of Customers',
-                data: Object.values(frequencyBins),
+                data: counts,
                 backgroundColor: '#6f42c1',
                 borderColor: '#6033b1',
                 borderWidth: 1
@@ -696,25 +623,19 @@ function updateCustomerFrequencyChart(filteredData) {
 }
 
 // Update insights based on the data
-function updateInsights(filteredData, flatData) {
+function updateInsights(view) {
     const insightsContainer = document.getElementById('insights-container');
     
     // Clear previous insights
     insightsContainer.innerHTML = '';
     
-    // Calculate key metrics for insights
-    const totalRevenue = filteredData.reduce((sum, transaction) => sum + transaction.totalAmount, 0);
+    const totalRevenue = view.totalRevenue;
+    if (!totalRevenue) {
+        return;
+    }
     
     // Top category
-    const salesByCategory = {};
-    flatData.forEach(item => {
-        if (!salesByCategory[item.category]) {
-            salesByCategory[item.category] = 0;
-        }
-        salesByCategory[item.category] += item.totalPrice;
-    });
-    
-    const topCategory = Object.entries(salesByCategory)
+    const topCategory = Object.entries(view.categorySales)
         .sort((a, b) => b[1] - a[1])[0];
     
     const topCategoryName = topCategory[0];
@@ -722,15 +643,7 @@ function updateInsights(filteredData, flatData) {
     const topCategoryPercentage = (topCategorySales / totalRevenue * 100).toFixed(1);
     
     // Top product
-    const salesByProduct = {};
-    flatData.forEach(item => {
-        if (!salesByProduct[item.product]) {
-            salesByProduct[item.product] = 0;
-        }
-        salesByProduct[item.product] += item.totalPrice;
-    });
-    
-    const topProduct = Object.entries(salesByProduct)
+    const topProduct = Object.entries(view.productSales)
         .sort((a, b) => b[1] - a[1])[0];
     
     const topProductName = topProduct[0];
@@ -738,33 +651,18 @@ function updateInsights(filteredData, flatData) {
     const topProductPercentage = (topProductSales / totalRevenue * 100).toFixed(1);
     
     // Weekly pattern
-    const salesByDay = Array(7).fill(0);
-    flatData.forEach(item => {
-        const dayOfWeek = item.date.getDay();
-        salesByDay[dayOfWeek] += item.totalPrice;
-    });
-    
+    const salesByDay = view.daySales;
     const bestDayIndex = salesByDay.indexOf(Math.max(...salesByDay));
     const worstDayIndex = salesByDay.indexOf(Math.min(...salesByDay));
-    const dayNames = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'];
     
     // Seasonal trends (if enough data)
     let seasonalInsight = '';
-    const salesByMonth = Array(12).fill(0);
-    const monthCounts = Array(12).fill(0);
-    
-    flatData.forEach(item => {
-        const month = item.date.getMonth();
-        salesByMonth[month] += item.totalPrice;
-        monthCounts[month]++;
-    });
+    const salesByMonth = view.monthSales;
     
     // Only include seasonal insight if we have data for at least 3 months
-    const monthsWithData = monthCounts.filter(count => count > 0).length;
-    
-    if (monthsWithData >= 3) {
-        const bestMonthIndex = salesByMonth.indexOf(Math.max(...salesByMonth));
-        const worstMonthIndex = salesByMonth.indexOf(Math.min(...salesByMonth.filter((val, idx) => monthCounts[idx] > 0)));
+    if (view.months.length >= 3) {
+        const bestMonthIndex = view.months[salesByMonth.indexOf(Math.max(...salesByMonth))] - 1;
+        const worstMonthIndex = view.months[salesByMonth.indexOf(Math.min(...salesByMonth))] - 1;
         const monthNames = ['January', 'February', 'March', 'April', 'May', 'June', 
                            'July', 'August', 'September', 'October', 'November', 'December'];
         
@@ -776,19 +674,12 @@ function updateInsights(filteredData, flatData) {
     }
     
     // Average basket size
-    const avgBasketSize = totalRevenue / filteredData.length;
-    
-    // Customer loyalty
-    const purchasesPerCustomer = {};
-    filteredData.forEach(transaction => {
-        if (!purchasesPerCustomer[transaction.customerId]) {
-            purchasesPerCustomer[transaction.customerId] = 0;
-        }
-        purchasesPerCustomer[transaction.customerId]++;
-    });
+    const totalTransactions = view.transactions.reduce((sum, count) => sum + count, 0);
+    const avgBasketSize = totalRevenue / totalTransactions;
     
-    const repeatCustomers = Object.values(purchasesPerCustomer).filter(count => count > 1).length;
-    const totalCustomers = Object.keys(purchasesPerCustomer).length;
+    // Customer loyalty: everyone outside the single-purchase bin is a repeat shopper
+    const totalCustomers = view.frequencyCounts.reduce((sum, count) => sum + count, 0);
+    const repeatCustomers = totalCustomers - view.frequencyCounts[0];
     const repeatPercentage = (repeatCustomers / totalCustomers * 100).toFixed(1);
     
     // Create insights HTML
@@ -810,7 +701,8 @@ function updateInsights(filteredData, flatData) {
             <p><strong>Basket Size:</strong> The average transaction value is ${formatCurrency(avgBasketSize)}. 
                Consider implementing cross-selling strategies to increase basket size.</p>
                
-            <p><strong>Customer Loyalty:</strong> ${repeatPercentage}% of customers are repeat shoppers. 
+            <p><strong>Customer Loyalty:</strong> ${repeatPercentage}% of customers
+               ${view.frequencyAllCategories ? 'across all categories ' : ''}are repeat shoppers. 
                Implement a loyalty program to increase customer retention and frequency.</p>
         </div>
         
@@ -1,26 +1,163 @@
-import pandas as pd
-import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
+from dash import dcc, html, Input, Output, State, Patch
 import dash_bootstrap_components as dbc
-from datetime import datetime, timedelta
+from datetime import timedelta
+import gzip
+import logging
 import os
+import threading
+import time
+from urllib.parse import parse_qs
+import flask
+from concurrent.futures import ThreadPoolExecutor
+from charts import (dashboard_filters, compact_figure, build_revenue_time_figure, build_category_sales_figure,
+                    build_top_products_figure, build_seasonal_trends_figure, build_weekly_pattern_figure,
+                    build_customer_frequency_figure, build_frequently_bought_together_figure, build_rfm_segments_figure,
+                    build_cohort_retention_figure)
+from insights import compute_insights
+from metrics import registry as metrics
+from result_cache import ResultCache
+from stores import parse_store_sources, StoreRegistry
 
-# Check if data exists, if not generate it
-if not os.path.exists('pet_shop_sales_data.csv'):
-    import generate_data
+# Stage timings are logged as JSON lines at INFO; set DASHBOARD_LOG_LEVEL=INFO to see them
+if os.environ.get('DASHBOARD_LOG_LEVEL'):
+    logging.basicConfig(level=os.environ['DASHBOARD_LOG_LEVEL'].upper(), format='%(asctime)s %(name)s %(message)s')
+
+DATA_PATH = 'pet_shop_sales_data.csv'
+
+# Query backend: 'pandas' holds the CSV in memory; 'parquet' queries the
+# date-partitioned Parquet files in DASHBOARD_PARQUET_DIR in place, for
+# histories that do not fit in memory; 'shared' attaches to the dataset
+# published in DASHBOARD_SHARED_DIR, shared by every worker process
+BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+
+# Set DASHBOARD_SKETCH_ERROR (e.g. 0.02) to estimate distinct counts of
+# selections above DASHBOARD_EXACT_BELOW transactions from mergeable sketches
+DATASET_OPTIONS = {
+    'sketch_error': float(os.environ['DASHBOARD_SKETCH_ERROR']) if os.environ.get('DASHBOARD_SKETCH_ERROR') else None,
+    'exact_below': int(os.environ.get('DASHBOARD_EXACT_BELOW', 50000)),
+}
+
+# One server can host many stores: DASHBOARD_STORES="north=north.csv,south=south_parquet"
+# Each store loads on first use; DASHBOARD_MEMORY_BUDGET_MB caps what stays loaded
+if os.environ.get('DASHBOARD_STORES'):
+    store_sources = parse_store_sources(os.environ['DASHBOARD_STORES'])
+elif BACKEND == 'parquet':
+    store_sources = {'default': os.environ['DASHBOARD_PARQUET_DIR']}
+elif BACKEND == 'shared':
+    # Workers map the columns published by shared_dataset.py instead of each loading a copy
+    store_sources = {'default': os.environ['DASHBOARD_SHARED_DIR']}
+else:
+    store_sources = {'default': DATA_PATH}
+
+# Sample data is generated when the default CSV is missing, as part of loading
+# the first store; until it is written, nothing can be read from that store
+GENERATE_DATA = not os.environ.get('DASHBOARD_STORES') and BACKEND == 'pandas' and not os.path.exists(DATA_PATH)
+data_ready = threading.Event()
+if not GENERATE_DATA:
+    data_ready.set()
+
+def generate_data():
+    """Write the sample sales data, letting requests waiting on it through however it ends"""
+    from generate_data import generate_sales_data
     print("Generating sample data...")
+    try:
+        generate_sales_data().to_csv(DATA_PATH, index=False)
+    finally:
+        data_ready.set()
+
+def get_dataset(store):
+    """A store's dataset, loading it if needed once the sample data exists"""
+    data_ready.wait()
+    return stores.get(store)
+
+# Filtered views shared by the charts of one filter state, keyed by store and
+# dataset version. Each holds its dataset, so a store's views are dropped when
+# it is evicted, or replaced by ingest, for the memory budget to hold
+selection_cache = ResultCache(maxsize=16)
+
+def release_store(store, keep_version=None):
+    """Drop the cached views of a store's datasets other than keep_version"""
+    selection_cache.discard(lambda key: key[0] == store and key[1] != keep_version)
+
+stores = StoreRegistry(
+    store_sources,
+    memory_budget=float(os.environ['DASHBOARD_MEMORY_BUDGET_MB']) * 1e6 if os.environ.get('DASHBOARD_MEMORY_BUDGET_MB') else None,
+    options=DATASET_OPTIONS,
+    on_evict=release_store
+)
+DEFAULT_STORE = stores.names()[0]
+
+# The layout only needs the first store's categories and date range, which
+# are read without loading it (or, for sample data still to be generated,
+# known from the generator's settings)
+if GENERATE_DATA:
+    from generate_data import CATEGORIES, END_DATE, START_DATE
+    store_metadata = {'categories': sorted(CATEGORIES), 'start_date': START_DATE, 'end_date': END_DATE}
+else:
+    store_metadata = stores.metadata(DEFAULT_STORE)
+
+# With DASHBOARD_BACKGROUND_LOAD=1 the server starts answering right away and
+# the first store is loaded on a background thread; /health reports when it
+# is ready, and callbacks arriving before then wait for the load in progress
+BACKGROUND_LOAD = os.environ.get('DASHBOARD_BACKGROUND_LOAD', '0') != '0'
+startup = {'status': 'loading', 'error': None}
+
+def load_default_store():
+    """Load and prepare the first store's dataset, recording the outcome for /health"""
+    try:
+        if GENERATE_DATA:
+            generate_data()
+        stores.get(DEFAULT_STORE)
+    except Exception as e:
+        startup.update(status='failed', error=str(e))
+        raise
+    startup['status'] = 'ready'
+
+if BACKGROUND_LOAD:
+    threading.Thread(target=load_default_store, name='load-default-store', daemon=True).start()
+else:
+    load_default_store()
+
+def ingest_new_rows(store=None):
+    """Fold rows appended to a store's data into its dataset and swap the new version in"""
+    store = store or DEFAULT_STORE
+    with metrics.stage('ingest', store=store) as ingest_stage:
+        rows_added = stores.ingest(store)
+        ingest_stage.rows = rows_added
+    if rows_added:
+        # Views of the replaced version would keep it alive alongside the new one
+        current = stores.peek(store)
+        if current is not None:
+            release_store(store, keep_version=current.version)
+    return rows_added
+
+def watch_sales_data(interval):
+    """Poll every loaded store's data for appended rows every interval seconds"""
+    while True:
+        time.sleep(interval)
+        for store in stores.names():
+            try:
+                rows_added = ingest_new_rows(store)
+            except Exception as e:
+                print(f"Could not ingest new sales data for {store}: {e}")
+                continue
+            if rows_added:
+                print(f"Ingested {rows_added} new sales records for {store}")
+
+if os.environ.get('DASHBOARD_WATCH_INTERVAL'):
+    threading.Thread(target=watch_sales_data, args=(float(os.environ['DASHBOARD_WATCH_INTERVAL']),),
+                     daemon=True).start()
 
-# Load data
-df = pd.read_csv('pet_shop_sales_data.csv')
-df['date'] = pd.to_datetime(df['date'])
+# Threads that build the charts concurrently when all outputs are requested at once
+chart_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('DASHBOARD_CHART_THREADS', 8)))
 
 # Create app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = 'Pet Shop Sales Analysis'
+# WSGI entry point, e.g. gunicorn app:server
+server = app.server
 
 # Define time period options
 time_periods = [
@@ -28,11 +165,17 @@ time_periods = [
     {'label': 'Last 90 Days', 'value': '90D'},
     {'label': 'Last 6 Months', 'value': '6M'},
     {'label': 'Last Year', 'value': '1Y'},
-    {'label': 'All Time', 'value': 'ALL'}
+    {'label': 'All Time', 'value': 'ALL'},
+    {'label': 'Custom Range', 'value': 'CUSTOM'}
 ]
 
 # Define layout
 app.layout = dbc.Container([
+    # ?store=<name> opens the dashboard on that store
+    dcc.Location(id='url', refresh=False),
+    # The store the filters were last reset for; charts redraw when it changes
+    dcc.Store(id='active-store', data=DEFAULT_STORE),
+    
     dbc.Row([
         dbc.Col([
             html.H1("Pet Shop Sales Analysis Dashboard", className="text-center my-4"),
@@ -46,6 +189,16 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardBody([
                     html.H5("Filter Data", className="card-title"),
+                    html.Div([
+                        html.Label("Select Store:"),
+                        dcc.Dropdown(
+                            id='store-dropdown',
+                            options=[{'label': name, 'value': name} for name in stores.names()],
+                            value=DEFAULT_STORE,
+                            clearable=False
+                        ),
+                        html.Div(className="my-2")
+                    ], style={} if len(stores.names()) > 1 else {'display': 'none'}),
                     html.Label("Select Time Period:"),
                     dcc.Dropdown(
                         id='time-period-dropdown',
@@ -54,11 +207,28 @@ app.layout = dbc.Container([
                         clearable=False
                     ),
                     html.Div(className="my-2"),
+                    dcc.DatePickerRange(
+                        id='date-range-picker',
+                        min_date_allowed=store_metadata['start_date'].date(),
+                        max_date_allowed=store_metadata['end_date'].date(),
+                        start_date=(store_metadata['end_date'] - timedelta(days=30)).date(),
+                        end_date=store_metadata['end_date'].date(),
+                        display_format='YYYY-MM-DD',
+                        disabled=True
+                    ),
+                    html.Div(className="my-2"),
+                    dbc.Checklist(
+                        id='compare-toggle',
+                        options=[{'label': 'Compare to previous period', 'value': 'previous'}],
+                        value=[],
+                        switch=True
+                    ),
+                    html.Div(className="my-2"),
                     html.Label("Select Categories:"),
                     dcc.Dropdown(
                         id='category-dropdown',
-                        options=[{'label': cat, 'value': cat} for cat in sorted(df['category'].unique())],
-                        value=sorted(df['category'].unique()),
+                        options=[{'label': cat, 'value': cat} for cat in store_metadata['categories']],
+                        value=store_metadata['categories'],
                         multi=True,
                         clearable=False
                     ),
@@ -151,7 +321,34 @@ app.layout = dbc.Container([
                     dcc.Graph(id="customer-frequency-graph")
                 ])
             ])
-        ], width=12)
+        ], width=6),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardBody([
+                    html.H5("Frequently Bought Together", className="card-title"),
+                    dcc.Graph(id="frequently-bought-together-graph")
+                ])
+            ])
+        ], width=6)
+    ], className="mb-4"),
+    
+    dbc.Row([
+        dbc.Col([
+            dbc.Card([
+                dbc.CardBody([
+                    html.H5("Customer Segments", className="card-title"),
+                    dcc.Graph(id="rfm-segments-graph")
+                ])
+            ])
+        ], width=6),
+        dbc.Col([
+            dbc.Card([
+                dbc.CardBody([
+                    html.H5("Cohort Retention", className="card-title"),
+                    dcc.Graph(id="cohort-retention-graph")
+                ])
+            ])
+        ], width=6)
     ], className="mb-4"),
     
     dbc.Row([
@@ -171,374 +368,277 @@ app.layout = dbc.Container([
     
 ], fluid=True)
 
-# Define callback to update all visualizations
-@app.callback(
-    [Output("total-revenue", "children"),
-     Output("total-transactions", "children"),
-     Output("avg-basket-size", "children"),
-     Output("revenue-time-graph", "figure"),
-     Output("category-sales-graph", "figure"),
-     Output("top-products-graph", "figure"),
-     Output("seasonal-trends-graph", "figure"),
-     Output("weekly-pattern-graph", "figure"),
-     Output("customer-frequency-graph", "figure"),
-     Output("insights-text", "children")],
-    [Input("apply-filters-button", "n_clicks")],
-    [State("time-period-dropdown", "value"),
-     State("category-dropdown", "value")]
-)
-def update_dashboard(n_clicks, time_period, categories):
-    # Filter data based on time period
-    filtered_df = df.copy()
-    
-    if time_period != 'ALL':
-        end_date = df['date'].max()
-        if time_period == '30D':
-            start_date = end_date - timedelta(days=30)
-        elif time_period == '90D':
-            start_date = end_date - timedelta(days=90)
-        elif time_period == '6M':
-            start_date = end_date - timedelta(days=180)
-        elif time_period == '1Y':
-            start_date = end_date - timedelta(days=365)
-        
-        filtered_df = filtered_df[filtered_df['date'] >= start_date]
-    
-    # Filter by selected categories
-    if categories:
-        filtered_df = filtered_df[filtered_df['category'].isin(categories)]
-    
+# Each chart is computed by its own function from a shared filtered view, and
+# registered below as its own callback so a slow chart never holds back the rest
+def filter_key(store, dataset, filters):
+    """Hashable filter state, including the store and its dataset version, for cache keys"""
+    return (store, dataset.version, filters['time_period'], filters['categories'],
+            filters['start_date'], filters['end_date'], filters['compare'])
+
+def get_selection(store, dataset, filters):
+    """Filtered view for a filter state, computed once and shared by every chart"""
+    # Comparing only changes what is drawn, not which rows are selected
+    key = filter_key(store, dataset, filters)[:-1]
+    
+    def select():
+        with metrics.stage('select') as stage:
+            selection = dataset.select(filters['start_date'], list(filters['categories']), filters['end_date'])
+            stage.rows = len(selection.cube)
+        return selection
+    
+    return selection_cache.get_or_compute(key, select)
+
+def format_change(current, previous):
+    """Period-over-period change shown under a KPI"""
+    if not previous:
+        return html.Small("no data for previous period", className="d-block text-muted")
+    change = (current / previous - 1) * 100
+    color = "text-success" if change >= 0 else "text-danger"
+    return html.Small(f"{change:+.1f}% vs previous period", className=f"d-block {color}")
+
+def build_kpis(selection, filters):
+    """Total revenue, total transactions and average basket size cards"""
+    # Headline totals come from the prefix sums, whatever the range
+    if filters['compare']:
+        totals, previous = selection.compare_previous()
+    else:
+        totals, previous = selection.totals(), None
+
     # Calculate key metrics
-    total_revenue = f"${filtered_df['total_price'].sum():,.2f}"
-    total_transactions = f"{filtered_df['transaction_id'].nunique():,}"
+    total_revenue = f"${totals['revenue']:,.2f}"
+    total_transactions = f"{totals['transactions']:,}"
     
     # Calculate average basket size (average transaction value)
-    transaction_totals = filtered_df.groupby('transaction_id')['total_price'].sum()
-    avg_basket = f"${transaction_totals.mean():.2f}"
-    
-    # Revenue over time graph
-    # Determine appropriate time grouping based on selected period
-    if time_period in ['30D', '90D']:
-        # Group by day for shorter periods
-        time_df = filtered_df.groupby(filtered_df['date'].dt.date)['total_price'].sum().reset_index()
-        time_df['date'] = pd.to_datetime(time_df['date'])
-        time_title = 'Daily Revenue'
-    elif time_period in ['6M']:
-        # Group by week for medium periods
-        time_df = filtered_df.groupby(pd.Grouper(key='date', freq='W-MON'))['total_price'].sum().reset_index()
-        time_title = 'Weekly Revenue'
-    else:
-        # Group by month for longer periods
-        time_df = filtered_df.groupby(pd.Grouper(key='date', freq='M'))['total_price'].sum().reset_index()
-        time_title = 'Monthly Revenue'
-    
-    revenue_time_fig = px.line(
-        time_df, 
-        x='date', 
-        y='total_price',
-        title=time_title,
-        labels={'date': 'Date', 'total_price': 'Revenue ($)'}
-    )
-    revenue_time_fig.update_layout(hovermode="x unified")
-    
-    # Add transaction count as a secondary axis
-    if time_period in ['30D', '90D']:
-        transaction_df = filtered_df.groupby(filtered_df['date'].dt.date)['transaction_id'].nunique().reset_index()
-        transaction_df['date'] = pd.to_datetime(transaction_df['date'])
-    elif time_period in ['6M']:
-        transaction_df = filtered_df.groupby(pd.Grouper(key='date', freq='W-MON'))['transaction_id'].nunique().reset_index()
-    else:
-        transaction_df = filtered_df.groupby(pd.Grouper(key='date', freq='M'))['transaction_id'].nunique().reset_index()
-    
-    revenue_time_fig.add_trace(
-        go.Scatter(
-            x=transaction_df['date'],
-            y=transaction_df['transaction_id'],
-            name='Transactions',
-            yaxis='y2',
-            line=dict(color='red', dash='dot')
-        )
-    )
-    
-    revenue_time_fig.update_layout(
-        yaxis2=dict(
-            title='Number of Transactions',
-            overlaying='y',
-            side='right'
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        )
-    )
-    
-    # Sales by category graph
-    category_sales = filtered_df.groupby('category')['total_price'].sum().reset_index()
-    category_sales = category_sales.sort_values('total_price', ascending=False)
-    
-    category_sales_fig = px.pie(
-        category_sales,
-        values='total_price',
-        names='category',
-        title='Sales by Category',
-        hole=0.4,
-        color_discrete_sequence=px.colors.qualitative.Pastel
-    )
-    
-    category_sales_fig.update_traces(textposition='inside', textinfo='percent+label')
+    avg_basket_value = totals['revenue'] / totals['transactions'] if totals['transactions'] else 0.0
+    avg_basket = f"${avg_basket_value:.2f}"
     
-    # Top 10 best-selling products graph
-    product_sales = filtered_df.groupby('product')['total_price'].sum().reset_index()
-    product_sales = product_sales.sort_values('total_price', ascending=False).head(10)
+    if previous is None:
+        return total_revenue, total_transactions, avg_basket
     
-    top_products_fig = px.bar(
-        product_sales,
-        x='total_price',
-        y='product',
-        title='Top 10 Best-Selling Products',
-        labels={'total_price': 'Revenue ($)', 'product': 'Product'},
-        orientation='h',
-        color='total_price',
-        color_continuous_scale=px.colors.sequential.Blues
-    )
-    
-    top_products_fig.update_layout(yaxis={'categoryorder': 'total ascending'})
-    
-    # Seasonal trends graph (monthly sales by category)
-    filtered_df['month'] = filtered_df['date'].dt.month
-    filtered_df['month_name'] = filtered_df['date'].dt.strftime('%b')
-    
-    seasonal_df = filtered_df.groupby(['month', 'month_name', 'category'])['total_price'].sum().reset_index()
-    
-    # Create a proper month order
-    month_order = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
-                  7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'}
-    
-    # Only include months that are in the filtered data
-    available_months = sorted(filtered_df['month'].unique())
-    month_names = [month_order[m] for m in available_months]
-    
-    seasonal_trends_fig = px.line(
-        seasonal_df,
-        x='month',
-        y='total_price',
-        color='category',
-        title='Seasonal Sales Trends by Category',
-        labels={'total_price': 'Revenue ($)', 'month': 'Month'}
-    )
-    
-    seasonal_trends_fig.update_layout(
-        xaxis=dict(
-            tickmode='array',
-            tickvals=available_months,
-            ticktext=month_names
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        )
-    )
-    
-    # Weekly sales pattern graph
-    filtered_df['day_of_week'] = filtered_df['date'].dt.dayofweek
-    filtered_df['day_name'] = filtered_df['date'].dt.strftime('%a')
-    
-    weekly_df = filtered_df.groupby(['day_of_week', 'day_name'])['total_price'].sum().reset_index()
-    
-    # Create proper day order
-    day_order = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
-    
-    # Only include days that are in the filtered data
-    available_days = sorted(filtered_df['day_of_week'].unique())
-    day_names = [day_order[d] for d in available_days]
-    
-    weekly_pattern_fig = px.bar(
-        weekly_df,
-        x='day_of_week',
-        y='total_price',
-        title='Weekly Sales Pattern',
-        labels={'total_price': 'Revenue ($)', 'day_of_week': 'Day of Week'},
-        color='total_price',
-        color_continuous_scale=px.colors.sequential.Viridis
-    )
-    
-    weekly_pattern_fig.update_layout(
-        xaxis=dict(
-            tickmode='array',
-            tickvals=available_days,
-            ticktext=day_names
-        )
-    )
-    
-    # Add transaction count line
-    weekly_txn_df = filtered_df.groupby(['day_of_week', 'day_name'])['transaction_id'].nunique().reset_index()
-    
-    weekly_pattern_fig.add_trace(
-        go.Scatter(
-            x=weekly_txn_df['day_of_week'],
-            y=weekly_txn_df['transaction_id'],
-            name='Transactions',
-            mode='lines+markers',
-            yaxis='y2',
-            line=dict(color='red')
-        )
-    )
-    
-    weekly_pattern_fig.update_layout(
-        yaxis2=dict(
-            title='Number of Transactions',
-            overlaying='y',
-            side='right'
-        )
-    )
-    
-    # Customer purchasing frequency
-    customer_freq = filtered_df.groupby('customer_id')['transaction_id'].nunique().reset_index()
-    customer_freq.columns = ['customer_id', 'purchase_frequency']
-    
-    # Create bins for frequency
-    bins = [0, 1, 2, 3, 5, 10, 20, 50, 100]
-    labels = ['1', '2', '3', '4-5', '6-10', '11-20', '21-50', '51+']
-    customer_freq['frequency_group'] = pd.cut(customer_freq['purchase_frequency'], bins=bins, labels=labels, right=False)
-    
-    frequency_counts = customer_freq['frequency_group'].value_counts().reset_index()
-    frequency_counts.columns = ['frequency_group', 'count']
-    frequency_counts = frequency_counts.sort_values('frequency_group')
-    
-    customer_frequency_fig = px.bar(
-        frequency_counts,
-        x='frequency_group',
-        y='count',
-        title='Customer Purchase Frequency Distribution',
-        labels={'frequency_group': 'Number of Purchases', 'count': 'Number of Customers'},
-        color='count',
-        color_continuous_scale=px.colors.sequential.Reds
-    )
+    previous_basket = previous['revenue'] / previous['transactions'] if previous['transactions'] else 0.0
+    return ([total_revenue, format_change(totals['revenue'], previous['revenue'])],
+            [total_transactions, format_change(totals['transactions'], previous['transactions'])],
+            [avg_basket, format_change(avg_basket_value, previous_basket)])
+
+def build_insights(selection, filters):
+    """Business insights and recommendations"""
+    return generate_insights(selection)
+
+# (name, outputs, builder) for every independently computed part of the dashboard
+DASHBOARD_CHARTS = [
+    ('kpis', [Output("total-revenue", "children"),
+              Output("total-transactions", "children"),
+              Output("avg-basket-size", "children")], build_kpis),
+    ('revenue-time', Output("revenue-time-graph", "figure"), build_revenue_time_figure),
+    ('category-sales', Output("category-sales-graph", "figure"), build_category_sales_figure),
+    ('top-products', Output("top-products-graph", "figure"), build_top_products_figure),
+    ('seasonal-trends', Output("seasonal-trends-graph", "figure"), build_seasonal_trends_figure),
+    ('weekly-pattern', Output("weekly-pattern-graph", "figure"), build_weekly_pattern_figure),
+    ('customer-frequency', Output("customer-frequency-graph", "figure"), build_customer_frequency_figure),
+    ('frequently-bought-together', Output("frequently-bought-together-graph", "figure"),
+     build_frequently_bought_together_figure),
+    ('rfm-segments', Output("rfm-segments-graph", "figure"), build_rfm_segments_figure),
+    ('cohort-retention', Output("cohort-retention-graph", "figure"), build_cohort_retention_figure),
+    ('insights', Output("insights-text", "children"), build_insights)
+]
+
+# Memoize dashboard outputs per filter state, one entry per chart, so the cache
+# holds DASHBOARD_CACHE_SIZE whole selections. Set DASHBOARD_CACHE_DIR to share
+# the cache between worker processes through the filesystem.
+result_cache = ResultCache(
+    maxsize=int(os.environ.get('DASHBOARD_CACHE_SIZE', 128)) * len(DASHBOARD_CHARTS),
+    ttl=float(os.environ['DASHBOARD_CACHE_TTL']) if os.environ.get('DASHBOARD_CACHE_TTL') else None,
+    directory=os.environ.get('DASHBOARD_CACHE_DIR')
+)
+
+def figure_patch(figure):
+    """Partial update replacing a figure's traces and layout but not its template"""
+    figure_json = figure.to_plotly_json()
+    patch = Patch()
+    patch['data'] = figure_json['data']
+    for key, value in figure_json['layout'].items():
+        if key != 'template':
+            patch['layout'][key] = value
+    return patch
+
+def compute_chart(name, builder, store, dataset, filters):
+    """One dashboard part for a filter state, memoized per part"""
+    key = (name,) + filter_key(store, dataset, filters)
     
-    # Generate insights based on the data
-    insights_html = generate_insights(filtered_df)
+    def build():
+        selection = get_selection(store, dataset, filters)
+        with metrics.profiled(name), metrics.stage('build_chart', chart=name):
+            return compact_figure(builder(selection, filters))
     
-    return (
-        total_revenue,
-        total_transactions,
-        avg_basket,
-        revenue_time_fig,
-        category_sales_fig,
-        top_products_fig,
-        seasonal_trends_fig,
-        weekly_pattern_fig,
-        customer_frequency_fig,
-        insights_html
+    return result_cache.get_or_compute(key, build)
+
+def register_chart_callback(name, outputs, builder):
+    @app.callback(
+        outputs,
+        [Input("apply-filters-button", "n_clicks"),
+         Input("active-store", "data")],
+        [State("time-period-dropdown", "value"),
+         State("category-dropdown", "value"),
+         State("date-range-picker", "start_date"),
+         State("date-range-picker", "end_date"),
+         State("compare-toggle", "value")]
     )
+    def update_chart(n_clicks, store, time_period, categories, start_date, end_date, compare):
+        with metrics.stage('callback', chart=name):
+            store = store or DEFAULT_STORE
+            current = get_dataset(store)
+            filters = dashboard_filters(current, time_period, categories, start_date, end_date, bool(compare))
+            result = compute_chart(name, builder, store, current, filters)
+            # The first render ships the whole figure; after that only the data
+            # and layout change, so the template the browser already has is kept
+            if n_clicks and isinstance(result, go.Figure):
+                return figure_patch(result)
+            return result
+    return update_chart
 
-def generate_insights(df):
-    """Generate business insights and recommendations based on the data"""
-    insights = []
-    
-    # Top category
-    top_category = df.groupby('category')['total_price'].sum().sort_values(ascending=False).index[0]
-    top_category_sales = df[df['category'] == top_category]['total_price'].sum()
-    total_sales = df['total_price'].sum()
-    top_category_percentage = (top_category_sales / total_sales) * 100
-    
-    insights.append(html.P([
-        html.Strong("Top Performing Category: "), 
-        f"{top_category} accounts for ${top_category_sales:,.2f} in sales ({top_category_percentage:.1f}% of total revenue)."
-    ]))
-    
-    # Top product
-    top_product = df.groupby('product')['total_price'].sum().sort_values(ascending=False).index[0]
-    top_product_sales = df[df['product'] == top_product]['total_price'].sum()
-    top_product_percentage = (top_product_sales / total_sales) * 100
-    
-    insights.append(html.P([
-        html.Strong("Best-Selling Product: "), 
-        f"{top_product} generates ${top_product_sales:,.2f} in sales ({top_product_percentage:.1f}% of total revenue)."
-    ]))
-    
-    # Weekly pattern insight
-    day_sales = df.groupby(df['date'].dt.dayofweek)['total_price'].sum()
-    best_day_idx = day_sales.idxmax()
-    worst_day_idx = day_sales.idxmin()
-    day_names = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
-    
-    insights.append(html.P([
-        html.Strong("Weekly Sales Pattern: "), 
-        f"{day_names[best_day_idx]} is the highest-grossing day, while {day_names[worst_day_idx]} has the lowest sales. ",
-        "Consider running promotions on slower days to boost traffic and revenue."
-    ]))
-    
-    # Seasonal insights
-    if len(df['date'].dt.month.unique()) > 3:  # Only if we have enough months
-        month_sales = df.groupby(df['date'].dt.month)['total_price'].sum()
-        best_month_idx = month_sales.idxmax()
-        worst_month_idx = month_sales.idxmin()
-        month_names = {1: 'January', 2: 'February', 3: 'March', 4: 'April', 5: 'May', 6: 'June',
-                      7: 'July', 8: 'August', 9: 'September', 10: 'October', 11: 'November', 12: 'December'}
-        
-        insights.append(html.P([
-            html.Strong("Seasonal Trends: "), 
-            f"{month_names[best_month_idx]} shows the highest sales, while {month_names[worst_month_idx]} has the lowest. ",
-            "Plan inventory and staffing accordingly for these seasonal fluctuations."
-        ]))
-    
-    # Average basket size
-    transaction_totals = df.groupby('transaction_id')['total_price'].sum()
-    avg_basket = transaction_totals.mean()
-    
-    insights.append(html.P([
-        html.Strong("Basket Size: "), 
-        f"The average transaction value is ${avg_basket:.2f}. ",
-        "Consider implementing cross-selling strategies to increase basket size."
-    ]))
-    
-    # Customer frequency
-    customer_freq = df.groupby('customer_id')['transaction_id'].nunique()
-    repeat_customers = (customer_freq > 1).sum()
-    total_customers = len(customer_freq)
-    repeat_percentage = (repeat_customers / total_customers) * 100
-    
-    insights.append(html.P([
-        html.Strong("Customer Loyalty: "), 
-        f"{repeat_percentage:.1f}% of customers are repeat shoppers. ",
-        "Implement a loyalty program to increase customer retention and frequency."
-    ]))
+for chart_name, chart_outputs, chart_builder in DASHBOARD_CHARTS:
+    register_chart_callback(chart_name, chart_outputs, chart_builder)
+
+@app.callback(
+    Output("date-range-picker", "disabled"),
+    [Input("time-period-dropdown", "value")]
+)
+def toggle_date_range(time_period):
+    return time_period != 'CUSTOM'
+
+@app.callback(
+    Output("store-dropdown", "value"),
+    [Input("url", "search")]
+)
+def select_store_from_url(search):
+    """Store named in the page's ?store= query, if it is one being served"""
+    requested = parse_qs((search or '').lstrip('?')).get('store', [None])[0]
+    if requested not in stores.sources:
+        return dash.no_update
+    return requested
+
+@app.callback(
+    [Output("active-store", "data"),
+     Output("category-dropdown", "options"),
+     Output("category-dropdown", "value"),
+     Output("date-range-picker", "min_date_allowed"),
+     Output("date-range-picker", "max_date_allowed"),
+     Output("date-range-picker", "start_date"),
+     Output("date-range-picker", "end_date")],
+    [Input("store-dropdown", "value")],
+    prevent_initial_call=True
+)
+def update_store_filters(store):
+    """Categories and selectable dates of the chosen store, set before its charts are drawn"""
+    data_ready.wait()
+    metadata = stores.metadata(store or DEFAULT_STORE)
+    categories = metadata['categories']
+    return (store, [{'label': cat, 'value': cat} for cat in categories], categories,
+            metadata['start_date'].date(), metadata['end_date'].date(),
+            (metadata['end_date'] - timedelta(days=30)).date(), metadata['end_date'].date())
+
+def build_dashboard(store, dataset, filters):
+    """Compute all dashboard outputs, building the charts concurrently"""
+    futures = [chart_executor.submit(compute_chart, name, builder, store, dataset, filters)
+               for name, _, builder in DASHBOARD_CHARTS]
+    results = [future.result() for future in futures]
+    return tuple(results[0]) + tuple(results[1:])
+
+def update_dashboard(n_clicks, time_period, categories, start_date=None, end_date=None, compare=False,
+                     store=None):
+    """All dashboard outputs for a store's current dataset, as the callbacks would return them"""
+    store = store or DEFAULT_STORE
+    current = get_dataset(store)
+    filters = dashboard_filters(current, time_period, categories, start_date, end_date, compare)
+    return build_dashboard(store, current, filters)
+
+@app.server.before_request
+def start_request_timer():
+    flask.g.request_start = time.perf_counter()
+
+@app.server.after_request
+def record_request(response):
+    """Time whole requests; for callbacks the excess over 'callback' is mostly serialization"""
+    start = flask.g.pop('request_start', None)
+    if start is not None:
+        metrics.observe('http_request', time.perf_counter() - start,
+                        endpoint=flask.request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+# Callback responses are mostly numeric JSON and compress well
+COMPRESS_RESPONSES = os.environ.get('DASHBOARD_COMPRESS', '1') != '0'
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_MIMETYPES = {'application/json', 'text/html'}
+
+@app.server.after_request
+def compress_response(response):
+    """Gzip JSON and HTML responses for clients that accept it"""
+    if (not COMPRESS_RESPONSES
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in flask.request.headers.get('Accept-Encoding', '')):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    return flask.jsonify(result_cache.stats())
+
+@app.server.route('/metrics')
+def prometheus_metrics():
+    """Stage latencies, row counts, dataset size and cache counters for Prometheus"""
+    for name, value in result_cache.stats().items():
+        metrics.set_gauge(f'result_cache_{name}', value)
+    store_stats = stores.stats()
+    for name in stores.names():
+        metrics.set_gauge('store_memory_bytes', store_stats['loaded'].get(name, 0), store=name)
+    for name in ('stores', 'memory', 'loads', 'evictions'):
+        metrics.set_gauge(f'store_registry_{name}', store_stats[name])
+    return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.server.route('/health')
+def health():
+    """Readiness probe: 200 once the first store is loaded, 503 while loading or after a failed load"""
+    body = {'status': startup['status'], 'stores': stores.stats()['loaded']}
+    if startup['error']:
+        body['error'] = startup['error']
+    return flask.jsonify(body), 200 if startup['status'] == 'ready' else 503
+
+@app.server.route('/stores')
+def store_stats():
+    return flask.jsonify(stores.stats())
+
+@app.server.route('/ingest', methods=['POST'])
+def ingest():
+    """Pick up rows appended to a store's data right away, e.g. after a POS export (?store=<name>)"""
+    store = flask.request.args.get('store', DEFAULT_STORE)
+    if store not in stores.sources:
+        return flask.jsonify({'error': f"Unknown store: {store}"}), 404
+    rows_added = ingest_new_rows(store)
+    current = stores.peek(store)
+    return flask.jsonify({'rows_added': rows_added, 'version': None if current is None else current.version})
+
+def generate_insights(selection):
+    """Generate business insights and recommendations based on a SalesSelection"""
+    report = compute_insights(selection)
     
-    # Recommendations section
-    recommendations = [
-        html.P([
-            html.Strong("1. Inventory Optimization: "), 
-            f"Focus on maintaining optimal stock levels for top-selling products, especially {top_product} and other items in the {top_category} category."
-        ]),
-        html.P([
-            html.Strong("2. Marketing Strategy: "), 
-            f"Increase marketing efforts during {day_names[worst_day_idx]} and {month_names.get(worst_month_idx, 'slower months')} to boost sales during slower periods."
-        ]),
-        html.P([
-            html.Strong("3. Customer Retention: "), 
-            "Implement a customer loyalty program with personalized offers based on purchase history to increase repeat business."
-        ]),
-        html.P([
-            html.Strong("4. Cross-Selling: "), 
-            "Train staff to suggest complementary products to increase average transaction value."
-        ]),
-        html.P([
-            html.Strong("5. Seasonal Promotions: "), 
-            "Plan seasonal promotions and product bundles to capitalize on peak selling periods and mitigate slow seasons."
-        ])
-    ]
+    def paragraphs(items):
+        return [html.P([html.Strong(title)] + parts) for title, parts in items]
     
     return html.Div([
         html.H6("Key Insights:", className="mt-2"),
-        html.Div(insights),
+        html.Div(paragraphs(report['insights'])),
         html.H6("Recommendations:", className="mt-4"),
-        html.Div(recommendations)
+        html.Div(paragraphs(report['recommendations']))
     ])
 
 if __name__ == '__main__':
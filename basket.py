@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# Fewest baskets a product pair must share to be ranked or recommended; the
+# lift of rarer pairs is mostly noise
+MIN_PAIR_BASKETS = 5
+
+
+def cooccurrence(rows, columns, num_columns):
+    """Column and column-pair counts of the binary incidence matrix X with ones at (rows, columns).
+
+    Repeated (row, column) entries count once. Returns the number of rows
+    holding each column (the diagonal of XᵀX) and first, second, count for
+    every pair first < second held together by at least one row (the
+    nonzero upper triangle of XᵀX), ordered by first then second.
+
+    With scipy installed XᵀX is a sparse matrix product. Without it, the
+    nonzeros of each row's outer product are enumerated by index arithmetic
+    over the row-sorted entries and counted with np.unique; either way the
+    work is proportional to the pairs actually held, with no Python loop
+    over rows.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    if sparse is not None:
+        num_rows = int(rows.max()) + 1 if len(rows) else 0
+        x = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, columns)), shape=(num_rows, num_columns))
+        x.sum_duplicates()
+        x.data[:] = 1
+        product = sparse.triu(x.T @ x).tocoo()
+        first, second, counts = product.row.astype(np.int64), product.col.astype(np.int64), product.data
+        diagonal = first == second
+        column_counts = np.zeros(num_columns, dtype=np.int64)
+        column_counts[first[diagonal]] = counts[diagonal]
+        order = np.argsort(first[~diagonal] * num_columns + second[~diagonal], kind='stable')
+        return (column_counts, first[~diagonal][order], second[~diagonal][order],
+                counts[~diagonal][order].astype(np.int64))
+
+    # Distinct entries, sorted by row and then column
+    codes = np.unique(rows * num_columns + columns)
+    rows, columns = codes // num_columns, codes % num_columns
+    column_counts = np.bincount(columns, minlength=num_columns)
+
+    # Pair every entry with each later entry of the same row
+    positions = np.arange(len(codes))
+    partners = np.searchsorted(rows, rows, side='right') - positions - 1
+    left = np.repeat(positions, partners)
+    right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+    pair_codes, counts = np.unique(columns[left] * num_columns + columns[right], return_counts=True)
+    return column_counts, pair_codes // num_columns, pair_codes % num_columns, counts.astype(np.int64)
+
+def pair_statistics(products, categories, item_counts, first, second, counts, num_baskets):
+    """Support, confidence and lift of product pairs, most lifted first.
+
+    products and categories label each item; item_counts is the number of
+    baskets holding each item, and first, second, counts the baskets
+    holding each pair of items. confidence is P(second | first) and
+    reverse_confidence P(first | second).
+    """
+    count_first = item_counts[first].astype(np.float64)
+    count_second = item_counts[second].astype(np.float64)
+    counts = np.asarray(counts, dtype=np.float64)
+    pairs = pd.DataFrame({
+        'product': np.asarray(products)[first],
+        'category': np.asarray(categories)[first],
+        'other_product': np.asarray(products)[second],
+        'other_category': np.asarray(categories)[second],
+        'baskets': counts.astype(np.int64),
+        'support': counts / num_baskets if num_baskets else 0.0,
+        'confidence': counts / count_first,
+        'reverse_confidence': counts / count_second,
+        'lift': counts * num_baskets / (count_first * count_second),
+    })
+    return pairs.sort_values(['lift', 'baskets'], ascending=False, kind='stable', ignore_index=True)
+
+
+class BasketIndex:
+    """Per-day counts of the baskets holding each product and each pair of products.
+
+    Items are (category, product) combinations, so a category selection
+    keeps the items of those categories exactly. Item counts are kept as
+    per-day cumulative sums, so any date range is a difference of two rows;
+    pair counts are kept per (day, pair) with nonzero count, sorted by day,
+    so a date range is a contiguous slice reduced with one bincount. Both
+    come from a single co-occurrence pass in which every day has its own
+    block of columns, which keeps transactions of different days apart.
+    """
+
+    def __init__(self, dataset):
+        self.categories = list(dataset.categories)
+        self.first_day = dataset.start_date.normalize()
+        num_days = (dataset.end_date.normalize() - self.first_day).days + 1
+
+        df = dataset.df
+        product_codes = df['product'].cat.codes.to_numpy().astype(np.int64)
+        category_codes = df['category'].cat.codes.to_numpy().astype(np.int64)
+        num_products = len(df['product'].cat.categories)
+        items, item_ids = np.unique(category_codes * num_products + product_codes, return_inverse=True)
+        self.products = df['product'].cat.categories.to_numpy()[items % num_products].astype(str)
+        self.item_categories = items // num_products
+        num_items = len(items)
+
+        day = (df['date'] - self.first_day).dt.days.to_numpy()
+        baskets = pd.factorize(df['transaction_id'])[0]
+        column_counts, first, second, counts = cooccurrence(baskets, day * num_items + item_ids,
+                                                            num_days * num_items)
+
+        daily = np.zeros((num_days + 1, num_items), dtype=np.int64)
+        daily[1:] = column_counts.reshape(num_days, num_items)
+        self.cumulative_items = np.cumsum(daily, axis=0)
+
+        # Both items of a pair are in the same day's block
+        pair_days = first // num_items
+        pair_codes, self.pair_ids = np.unique((first % num_items) * num_items + second % num_items,
+                                              return_inverse=True)
+        self.pairs = (pair_codes // num_items, pair_codes % num_items)
+        self.pair_counts = counts
+        self.pair_offsets = np.searchsorted(pair_days, np.arange(num_days + 1))
+
+    @property
+    def nbytes(self):
+        arrays = [self.cumulative_items, self.pair_ids, self.pair_counts, self.pair_offsets] + list(self.pairs)
+        return int(sum(a.nbytes for a in arrays))
+
+    def pair_statistics(self, num_baskets, start_date=None, end_date=None, categories=None, min_baskets=1):
+        """Statistics of the pairs of selected products bought together in at least min_baskets baskets.
+
+        num_baskets is the number of transactions in the date range holding
+        a product of the selected categories, which support and lift are
+        relative to.
+        """
+        num_days = len(self.cumulative_items) - 1
+        start = 0 if start_date is None else (pd.Timestamp(start_date).normalize() - self.first_day).days
+        stop = num_days if end_date is None else (pd.Timestamp(end_date).normalize() - self.first_day).days + 1
+        start, stop = min(max(start, 0), num_days), min(max(stop, 0), num_days)
+        stop = max(start, stop)
+
+        item_counts = self.cumulative_items[stop] - self.cumulative_items[start]
+        lo, hi = self.pair_offsets[start], self.pair_offsets[stop]
+        counts = np.bincount(self.pair_ids[lo:hi], weights=self.pair_counts[lo:hi],
+                             minlength=len(self.pairs[0])).astype(np.int64)
+
+        keep = counts >= max(min_baskets, 1)
+        if categories:
+            codes = [self.categories.index(c) for c in set(categories) if c in self.categories]
+            selected = np.isin(self.item_categories, codes)
+            keep &= selected[self.pairs[0]] & selected[self.pairs[1]]
+        category_names = np.asarray(self.categories, dtype=object)[self.item_categories]
+        return pair_statistics(self.products, category_names, item_counts,
+                               self.pairs[0][keep], self.pairs[1][keep], counts[keep], num_baskets)
+
+
+def scan_pair_statistics(frames, num_baskets, min_baskets=1):
+    """Pair statistics over line item frames (e.g. Parquet files) whose transactions never span frames"""
+    item_counts, pair_counts = [], []
+    for frame in frames:
+        items = frame['category'].astype(str) + '\x1f' + frame['product'].astype(str)
+        labels, item_ids = np.unique(items.to_numpy(), return_inverse=True)
+        baskets = pd.factorize(frame['transaction_id'])[0]
+        column_counts, first, second, counts = cooccurrence(baskets, item_ids, len(labels))
+        item_counts.append(pd.Series(column_counts, index=labels))
+        # Labels are sorted, so first < second in every frame's numbering alike
+        pair_counts.append(pd.Series(counts, index=pd.MultiIndex.from_arrays([labels[first], labels[second]])))
+
+    if not item_counts:
+        return pair_statistics([], [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                               np.zeros(0, dtype=np.int64), np.zeros(0), num_baskets)
+    item_counts = pd.concat(item_counts).groupby(level=0).sum()
+    pairs = pd.concat(pair_counts).groupby(level=[0, 1]).sum()
+    pairs = pairs[pairs >= max(min_baskets, 1)]
+    labels = item_counts.index.to_series().str.split('\x1f', n=1, expand=True)
+    return pair_statistics(labels[1].to_numpy(), labels[0].to_numpy(), item_counts.to_numpy(),
+                           item_counts.index.get_indexer(pairs.index.get_level_values(0)),
+                           item_counts.index.get_indexer(pairs.index.get_level_values(1)),
+                           pairs.to_numpy(), num_baskets)
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import generate_data
+from dataset import load_sales_data, SalesDataset
+
+# Category selections timed for every time period option
+CATEGORY_SELECTIONS = {
+    'all': [],
+    'single': ['Dog Food'],
+    'pair': ['Cat Toys', 'Health Products'],
+    'half': ['Cat Food', 'Dog Food', 'Grooming Services', 'Pet Accessories'],
+}
+
+# Mean transactions per day that reproduces the bundled CSV's size at scale 1
+BASE_TRANSACTIONS_PER_DAY = 25
+
+def measure(func, repeat, warmup=1):
+    """Time func over repeat runs and record its peak traced allocation in one extra run"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times_ms = np.array(times) * 1000
+    return {
+        'runs': repeat,
+        'p50_ms': round(float(np.percentile(times_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(times_ms, 95)), 3),
+        'mean_ms': round(float(times_ms.mean()), 3),
+        'min_ms': round(float(times_ms.min()), 3),
+        'peak_mb': round(peak / 1e6, 3),
+    }
+
+def compute_dashboard_uncached(dataset, time_period, categories):
+    """Build every dashboard output without the memoization layers"""
+    import app
+    filters = app.dashboard_filters(dataset, time_period, categories)
+    selection = dataset.select(filters['start_date'], list(filters['categories']), filters['end_date'])
+    return [builder(selection, filters) for _, _, builder in app.DASHBOARD_CHARTS]
+
+def benchmark_scale(scale, workdir, repeat, io_repeat, include_legacy):
+    """Run every benchmark for a dataset scale times the size of the bundled CSV"""
+    import app
+    from charts import period_start_date
+    results = []
+
+    def record(name, params, stats, rows):
+        results.append({'scale': scale, 'name': name, 'params': params, 'rows': rows, **stats})
+        label = ' '.join(f'{k}={v}' for k, v in params.items())
+        print(f"  {name:<22} {label:<36} p50 {stats['p50_ms']:>10.1f} ms  "
+              f"p95 {stats['p95_ms']:>10.1f} ms  peak {stats['peak_mb']:>9.1f} MB")
+
+    gen_kwargs = {'num_customers': generate_data.NUM_CUSTOMERS * scale,
+                  'mean_daily_transactions': BASE_TRANSACTIONS_PER_DAY * scale}
+
+    # Data generation
+    if include_legacy and scale == 1:
+        stats = measure(generate_data.generate_sales_data, io_repeat, warmup=0)
+        record('generate_sales_data', {}, stats, None)
+    sales_df = generate_data.generate_sales_data_fast(**gen_kwargs)
+    rows = len(sales_df)
+    stats = measure(lambda: generate_data.generate_sales_data_fast(**gen_kwargs), io_repeat, warmup=0)
+    record('generate_sales_data_fast', {}, stats, rows)
+
+    # Startup load: plain CSV parse, warm columnar cache, aggregate precompute
+    csv_path = os.path.join(workdir, f'sales_x{scale}.csv')
+    sales_df.to_csv(csv_path, index=False)
+    del sales_df
+    cache_dir = os.path.join(workdir, 'cache')
+    stats = measure(lambda: load_sales_data(csv_path, use_cache=False), io_repeat, warmup=0)
+    record('load_csv', {}, stats, rows)
+    load_sales_data(csv_path, cache_dir=cache_dir)
+    stats = measure(lambda: load_sales_data(csv_path, cache_dir=cache_dir), io_repeat, warmup=0)
+    record('load_cached', {}, stats, rows)
+    df = load_sales_data(csv_path, cache_dir=cache_dir)
+    stats = measure(lambda: SalesDataset(df), io_repeat, warmup=0)
+    record('build_aggregates', {}, stats, rows)
+
+    # Dashboard computation for every period and category selection
+    dataset = SalesDataset(df)
+    presets = [p['value'] for p in app.time_periods if p['value'] != 'CUSTOM']
+    for period in presets:
+        for selection_name, categories in CATEGORY_SELECTIONS.items():
+            params = {'time_period': period, 'categories': selection_name}
+            stats = measure(lambda: compute_dashboard_uncached(dataset, period, categories), repeat)
+            record('update_dashboard', params, stats, rows)
+            selection = dataset.select(period_start_date(dataset, period), categories)
+            stats = measure(lambda: app.generate_insights(selection), repeat)
+            record('generate_insights', params, stats, rows)
+            stats = measure(lambda: dataset.range_totals.compare_previous(
+                period_start_date(dataset, period), None, categories), repeat)
+            record('range_totals', params, stats, rows)
+
+    return results
+
+def compare_results(results, baseline_path):
+    """Print the p50 change of every benchmark also present in an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(result):
+        return result['scale'], result['name'], json.dumps(result['params'], sort_keys=True)
+
+    previous = {key(result): result for result in baseline['results']}
+    print(f"\nChange in p50 against {baseline_path} ({baseline['meta'].get('git_revision')})")
+    for result in results:
+        old = previous.get(key(result))
+        if old is None or not old['p50_ms']:
+            continue
+        change = (result['p50_ms'] / old['p50_ms'] - 1) * 100
+        label = ' '.join(f'{k}={v}' for k, v in result['params'].items())
+        print(f"  {result['scale']:>4}x {result['name']:<22} {label:<36} "
+              f"{old['p50_ms']:>10.1f} -> {result['p50_ms']:>10.1f} ms ({change:+.1f}%)")
+
+def git_revision():
+    """Current commit of the working tree, if it is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    """Parse command line options for the benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark data generation, loading and dashboard computation')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='dataset sizes as multiples of the bundled CSV')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per dashboard benchmark')
+    parser.add_argument('--io-repeat', type=int, default=3, help='timed runs per generation/load benchmark')
+    parser.add_argument('--skip-legacy', action='store_true', help='do not time the loop-based generator')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file for the results')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            print(f"\nScale {scale}x")
+            results.extend(benchmark_scale(scale, workdir, args.repeat, args.io_repeat, not args.skip_legacy))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
@@ -0,0 +1,425 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from basket import MIN_PAIR_BASKETS
+from downsample import downsample_series
+
+# Most points drawn per time series line, about one per pixel of chart width
+MAX_POINTS = int(os.environ.get('DASHBOARD_MAX_POINTS', 800))
+
+# Most recent monthly acquisition cohorts drawn in the retention heatmap
+MAX_COHORTS = 12
+
+def period_start_date(dataset, time_period):
+    """First date included by a time period option, or None for all time"""
+    start_date = None
+    
+    if time_period != 'ALL':
+        end_date = dataset.end_date
+        if time_period == '30D':
+            start_date = end_date - timedelta(days=30)
+        elif time_period == '90D':
+            start_date = end_date - timedelta(days=90)
+        elif time_period == '6M':
+            start_date = end_date - timedelta(days=180)
+        elif time_period == '1Y':
+            start_date = end_date - timedelta(days=365)
+    
+    return start_date
+
+def dashboard_filters(dataset, time_period, categories, start_date=None, end_date=None, compare=False):
+    """Normalized filter state shared by the cache keys and the chart builders"""
+    # Selecting no categories or all of them shows the same data, so both
+    # share one state
+    selected = sorted(set(categories or []) & set(dataset.categories))
+    if not selected or len(selected) == len(dataset.categories):
+        selected = []
+    if time_period == 'CUSTOM':
+        # Picker values arrive as ISO date strings; the end date is inclusive
+        start_date = pd.Timestamp(start_date).normalize() if start_date else None
+        end_date = pd.Timestamp(end_date).normalize() if end_date else None
+    else:
+        start_date, end_date = period_start_date(dataset, time_period), None
+    return {
+        'time_period': time_period,
+        'categories': tuple(selected),
+        'start_date': start_date,
+        'end_date': end_date,
+        'compare': bool(compare),
+    }
+
+def compact_array(values):
+    """Shorter JSON for one trace array: dates without a time, prices to the cent"""
+    if not isinstance(values, np.ndarray):
+        return values
+    if values.dtype == object and len(values) and isinstance(values[0], datetime):
+        # Plotly Express hands dates over as datetime objects
+        values = pd.DatetimeIndex(values).to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype('datetime64[D]')
+        if (days == values).all():
+            return np.datetime_as_string(days)
+    elif np.issubdtype(values.dtype, np.floating):
+        return values.round(2)
+    return values
+
+def compact_figure(figure):
+    """Shrink a figure's data arrays before it is cached and sent to the browser"""
+    if not isinstance(figure, go.Figure):
+        return figure
+    for trace in figure.data:
+        for prop in ('x', 'y', 'values'):
+            if prop in trace:
+                trace[prop] = compact_array(trace[prop])
+    return figure
+
+_express_lock = threading.Lock()
+_express_ready = False
+
+def plotly_express():
+    """plotly.express, which is slow to import, so it is only loaded once a chart is drawn.
+
+    The default template creates its nested properties on first access, and
+    chart threads reaching one at the same time can corrupt it, so the first
+    call draws a throwaway bar and line chart before any real one is built.
+    """
+    global _express_ready
+    import plotly.express as px
+    with _express_lock:
+        if not _express_ready:
+            px.bar(x=[0], y=[0])
+            px.line(x=[0], y=[0])
+            _express_ready = True
+    return px
+
+# Chart builders take a selection and the normalized filter state; they have
+# no Dash dependencies, so batch reports can call them too
+def time_frequency(filters):
+    """Resampling frequency and title for the revenue over time chart"""
+    time_period = filters['time_period']
+    if time_period == 'CUSTOM':
+        # Pick the granularity a preset period of similar length would use
+        if filters['start_date'] is None or filters['end_date'] is None:
+            time_period = 'ALL'
+        else:
+            span = (filters['end_date'] - filters['start_date']).days
+            time_period = '90D' if span <= 90 else '6M' if span <= 180 else 'ALL'
+    
+    # Determine appropriate time grouping based on selected period
+    if time_period in ['30D', '90D']:
+        # Group by day for shorter periods
+        time_freq = None
+        time_title = 'Daily Revenue'
+    elif time_period in ['6M']:
+        # Group by week for medium periods
+        time_freq = 'W-MON'
+        time_title = 'Weekly Revenue'
+    else:
+        # Group by month for longer periods
+        time_freq = 'M'
+        time_title = 'Monthly Revenue'
+    
+    return time_freq, time_title
+
+def build_revenue_time_figure(selection, filters):
+    """Revenue over time with the transaction count on a secondary axis"""
+    px = plotly_express()
+    
+    time_freq, time_title = time_frequency(filters)
+    
+    time_df = downsample_series(selection.revenue_by_date(time_freq), MAX_POINTS).reset_index()
+    
+    revenue_time_fig = px.line(
+        time_df, 
+        x='date', 
+        y='total_price',
+        title=time_title,
+        labels={'date': 'Date', 'total_price': 'Revenue ($)'}
+    )
+    revenue_time_fig.update_layout(hovermode="x unified")
+    
+    # Add transaction count as a secondary axis
+    transaction_df = downsample_series(selection.transactions_by_date(time_freq), MAX_POINTS).reset_index()
+    
+    revenue_time_fig.add_trace(
+        go.Scatter(
+            x=transaction_df['date'],
+            y=transaction_df['transactions'],
+            name='Transactions',
+            yaxis='y2',
+            line=dict(color='red', dash='dot')
+        )
+    )
+    
+    # Overlay the previous period's revenue, shifted onto the current dates
+    if filters['compare'] and not time_df.empty:
+        start_date = time_df['date'].min() if selection.start_date is None else selection.start_date
+        end_date = selection.dataset.end_date if selection.end_date is None else selection.end_date
+        length = end_date.normalize() - start_date.normalize() + pd.Timedelta(days=1)
+        previous = selection.dataset.select(start_date - length, list(filters['categories']),
+                                            start_date - pd.Timedelta(days=1))
+        previous_df = downsample_series(previous.revenue_by_date(time_freq), MAX_POINTS).reset_index()
+        revenue_time_fig.add_trace(
+            go.Scatter(
+                x=previous_df['date'] + length,
+                y=previous_df['total_price'],
+                name='Previous Period',
+                line=dict(color='gray', dash='dash')
+            )
+        )
+    
+    revenue_time_fig.update_layout(
+        yaxis2=dict(
+            title='Number of Transactions',
+            overlaying='y',
+            side='right'
+        ),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+    
+    return revenue_time_fig
+
+def build_category_sales_figure(selection, filters):
+    """Pie chart of revenue by category"""
+    px = plotly_express()
+    
+    category_sales = selection.revenue_by('category').reset_index()
+    category_sales = category_sales.sort_values('total_price', ascending=False)
+    
+    category_sales_fig = px.pie(
+        category_sales,
+        values='total_price',
+        names='category',
+        title='Sales by Category',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    
+    category_sales_fig.update_traces(textposition='inside', textinfo='percent+label')
+    
+    return category_sales_fig
+
+def build_top_products_figure(selection, filters):
+    """Top 10 best-selling products by revenue"""
+    px = plotly_express()
+    
+    product_sales = selection.revenue_by('product').reset_index()
+    product_sales = product_sales.sort_values('total_price', ascending=False).head(10)
+    
+    top_products_fig = px.bar(
+        product_sales,
+        x='total_price',
+        y='product',
+        title='Top 10 Best-Selling Products',
+        labels={'total_price': 'Revenue ($)', 'product': 'Product'},
+        orientation='h',
+        color='total_price',
+        color_continuous_scale=px.colors.sequential.Blues
+    )
+    
+    top_products_fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    
+    return top_products_fig
+
+def build_seasonal_trends_figure(selection, filters):
+    """Monthly revenue by category"""
+    px = plotly_express()
+    
+    seasonal_df = selection.revenue_by_month_and_category().reset_index()
+    seasonal_df['category'] = seasonal_df['category'].astype(str)
+    
+    # Create a proper month order
+    month_order = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
+                  7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'}
+    
+    # Only include months that are in the filtered data
+    available_months = sorted(seasonal_df['month'].unique())
+    month_names = [month_order[m] for m in available_months]
+    
+    seasonal_trends_fig = px.line(
+        seasonal_df,
+        x='month',
+        y='total_price',
+        color='category',
+        title='Seasonal Sales Trends by Category',
+        labels={'total_price': 'Revenue ($)', 'month': 'Month'}
+    )
+    
+    seasonal_trends_fig.update_layout(
+        xaxis=dict(
+            tickmode='array',
+            tickvals=available_months,
+            ticktext=month_names
+        ),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+    
+    return seasonal_trends_fig
+
+def build_weekly_pattern_figure(selection, filters):
+    """Revenue and transactions by day of week"""
+    px = plotly_express()
+    
+    weekly_df = selection.revenue_by_weekday().reset_index()
+    
+    # Create proper day order
+    day_order = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
+    
+    # Only include days that are in the filtered data
+    available_days = sorted(weekly_df['day_of_week'].unique())
+    day_names = [day_order[d] for d in available_days]
+    
+    weekly_pattern_fig = px.bar(
+        weekly_df,
+        x='day_of_week',
+        y='total_price',
+        title='Weekly Sales Pattern',
+        labels={'total_price': 'Revenue ($)', 'day_of_week': 'Day of Week'},
+        color='total_price',
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    
+    weekly_pattern_fig.update_layout(
+        xaxis=dict(
+            tickmode='array',
+            tickvals=available_days,
+            ticktext=day_names
+        )
+    )
+    
+    # Add transaction count line
+    weekly_txn_df = selection.transactions_by_weekday().reset_index()
+    
+    weekly_pattern_fig.add_trace(
+        go.Scatter(
+            x=weekly_txn_df['day_of_week'],
+            y=weekly_txn_df['transactions'],
+            name='Transactions',
+            mode='lines+markers',
+            yaxis='y2',
+            line=dict(color='red')
+        )
+    )
+    
+    weekly_pattern_fig.update_layout(
+        yaxis2=dict(
+            title='Number of Transactions',
+            overlaying='y',
+            side='right'
+        )
+    )
+    
+    return weekly_pattern_fig
+
+def build_customer_frequency_figure(selection, filters):
+    """Distribution of customers by number of purchases"""
+    px = plotly_express()
+    
+    customer_freq = selection.customer_frequency().reset_index()
+    customer_freq.columns = ['customer_id', 'purchase_frequency']
+    
+    # Create bins for frequency
+    bins = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+    labels = ['1', '2', '3', '4-5', '6-10', '11-20', '21-50', '51+']
+    customer_freq['frequency_group'] = pd.cut(customer_freq['purchase_frequency'], bins=bins, labels=labels, right=False)
+    
+    frequency_counts = customer_freq['frequency_group'].value_counts().reset_index()
+    frequency_counts.columns = ['frequency_group', 'count']
+    frequency_counts = frequency_counts.sort_values('frequency_group')
+    
+    customer_frequency_fig = px.bar(
+        frequency_counts,
+        x='frequency_group',
+        y='count',
+        title='Customer Purchase Frequency Distribution',
+        labels={'frequency_group': 'Number of Purchases', 'count': 'Number of Customers'},
+        color='count',
+        color_continuous_scale=px.colors.sequential.Reds
+    )
+    
+    return customer_frequency_fig
+
+def build_frequently_bought_together_figure(selection, filters):
+    """Top 10 product pairs by lift, among pairs bought together often enough to rank"""
+    px = plotly_express()
+    
+    pairs = selection.product_pairs(min_baskets=MIN_PAIR_BASKETS).head(10).copy()
+    pairs['pair'] = pairs['product'] + ' + ' + pairs['other_product']
+    
+    frequently_bought_together_fig = px.bar(
+        pairs,
+        x='lift',
+        y='pair',
+        title='Frequently Bought Together',
+        labels={'lift': 'Lift', 'pair': 'Product Pair', 'confidence': 'Confidence',
+                'baskets': 'Baskets', 'support': 'Support'},
+        orientation='h',
+        color='confidence',
+        color_continuous_scale=px.colors.sequential.Greens,
+        hover_data={'baskets': True, 'support': ':.2%', 'confidence': ':.1%'}
+    )
+    
+    frequently_bought_together_fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    
+    return frequently_bought_together_fig
+
+def build_rfm_segments_figure(selection, filters):
+    """Customers per recency/frequency segment over the whole history, colored by mean spend"""
+    px = plotly_express()
+    
+    # Scored from the per-customer history, so the filters do not apply
+    segments = selection.dataset.customer_history.segments().reset_index()
+    segments['segment'] = segments['segment'].astype(str)
+    
+    rfm_segments_fig = px.bar(
+        segments,
+        x='segment',
+        y='customers',
+        title='Customer Segments (RFM, all time)',
+        labels={'segment': 'Segment', 'customers': 'Number of Customers', 'monetary': 'Mean Spend ($)',
+                'recency': 'Mean Days Since Last Purchase', 'frequency': 'Mean Purchases'},
+        color='monetary',
+        color_continuous_scale=px.colors.sequential.Purples,
+        hover_data={'recency': ':.1f', 'frequency': ':.1f', 'monetary': ':,.2f'}
+    )
+    
+    return rfm_segments_fig
+
+def build_cohort_retention_figure(selection, filters):
+    """Share of each recent monthly acquisition cohort buying again in each later month"""
+    px = plotly_express()
+    
+    sizes, shares = selection.dataset.customer_history.retention()
+    shares = shares.tail(MAX_COHORTS)
+    
+    cohort_retention_fig = px.imshow(
+        np.round(shares.to_numpy() * 100, 1),
+        x=[str(offset) for offset in shares.columns],
+        y=[f"{cohort:%Y-%m} ({sizes[cohort]:,})" for cohort in shares.index],
+        title='Monthly Cohort Retention (%)',
+        labels={'x': 'Months Since First Purchase', 'y': 'Cohort (customers)', 'color': 'Retained (%)'},
+        color_continuous_scale=px.colors.sequential.Teal,
+        zmin=0,
+        zmax=100,
+        text_auto='.0f',
+        aspect='auto'
+    )
+    
+    return cohort_retention_fig
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from dataset import load_sales_data
+from generate_data import write_sales_data_chunked
+
+# A few months of a small store, reproducible from the seed
+SALES_OPTIONS = {'num_customers': 60, 'start_date': pd.Timestamp('2024-01-01'), 'num_days': 150,
+                 'mean_daily_transactions': 12, 'seed': 7}
+
+
+@pytest.fixture(scope='session')
+def sales_csv(tmp_path_factory):
+    """A small, reproducible sales CSV spanning several months"""
+    path = tmp_path_factory.mktemp('sales') / 'sales.csv'
+    write_sales_data_chunked(str(path), **SALES_OPTIONS)
+    return path
+
+@pytest.fixture(scope='session')
+def sales_partitions(tmp_path_factory):
+    """The rows of sales_csv as monthly Parquet partitions"""
+    directory = tmp_path_factory.mktemp('partitions')
+    write_sales_data_chunked(str(directory), file_format='parquet', partitioned=True, **SALES_OPTIONS)
+    return directory
+
+@pytest.fixture
+def sales_frame(sales_csv):
+    """The typed frame of sales_csv, parsed without the cache"""
+    return load_sales_data(sales_csv, use_cache=False)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+# Customer segments by recency and frequency score, checked in order; the
+# first match wins and the last one catches everyone else
+SEGMENTS = [
+    ('Champions', 4, 4),
+    ('Loyal', 3, 3),
+    ('New & Promising', 3, 1),
+    ('At Risk', 1, 3),
+    ('Hibernating', 1, 1),
+]
+
+
+def month_numbers(dates):
+    """Months since January 1970 of each date, the ordinal of its monthly period"""
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year.to_numpy().astype(np.int64) - 1970) * 12 + dates.month.to_numpy() - 1
+
+def month_starts(numbers):
+    """First day of each month numbered by month_numbers"""
+    numbers = np.asarray(numbers, dtype=np.int64)
+    return pd.to_datetime(pd.DataFrame({'year': numbers // 12 + 1970, 'month': numbers % 12 + 1, 'day': 1}))
+
+def scores(values, ascending=True):
+    """Quintile score 1-5 of each value by rank, 5 for the largest (or smallest when not ascending)"""
+    ranks = values.rank(pct=True, ascending=ascending).to_numpy()
+    return np.clip(np.ceil(ranks * 5), 1, 5).astype(np.int8)
+
+
+class CustomerHistory:
+    """Per-customer purchase state and monthly cohort activity for the transactions before through.
+
+    state has one row per customer (indexed by customer id) with the first
+    and last purchase date, transaction count and revenue. activity counts
+    the distinct customers of each acquisition cohort (month of first
+    purchase) active in each later month, keyed by (cohort, months since
+    acquisition) as month numbers.
+
+    Both are additive over days, so extend() folds in the transactions of
+    later days with work proportional to those transactions, plus one copy
+    of the state; nothing is recomputed from earlier line items. A history
+    is never modified after construction; rfm() is memoized.
+    """
+
+    def __init__(self, state=None, activity=None, through=None):
+        if state is None:
+            state = pd.DataFrame({'first_date': pd.Series(dtype='datetime64[ns]'),
+                                  'last_date': pd.Series(dtype='datetime64[ns]'),
+                                  'transactions': pd.Series(dtype=np.int64),
+                                  'revenue': pd.Series(dtype=np.float64)},
+                                 index=pd.Index([], dtype=object, name='customer_id'))
+        if activity is None:
+            activity = pd.Series(dtype=np.int64, index=pd.MultiIndex.from_arrays(
+                [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)], names=['cohort', 'offset']))
+        self.state = state
+        self.activity = activity
+        self.through = through
+        self._rfm = None
+
+    @property
+    def nbytes(self):
+        return int(self.state.memory_usage(deep=True).sum() + self.activity.memory_usage(deep=True))
+
+    def extend(self, transactions, through):
+        """History with transactions (rows of a transaction table, all on or after self.through) added"""
+        if transactions.empty:
+            return CustomerHistory(self.state, self.activity, through)
+
+        # Per-customer totals of the batch, reduced over category codes; grouping
+        # on the categorical itself would hash every known customer id
+        customers = transactions['customer_id']
+        codes = customers.cat.codes.to_numpy().astype(np.int64)
+        customer_codes, rows = np.unique(codes, return_inverse=True)
+        dates = transactions['date'].to_numpy()
+        first_date = np.full(len(customer_codes), np.iinfo(np.int64).max)
+        last_date = np.full(len(customer_codes), np.iinfo(np.int64).min)
+        np.minimum.at(first_date, rows, dates.view(np.int64))
+        np.maximum.at(last_date, rows, dates.view(np.int64))
+        batch = pd.DataFrame({
+            'first_date': first_date.view('datetime64[ns]'),
+            'last_date': last_date.view('datetime64[ns]'),
+            'transactions': np.bincount(rows, minlength=len(customer_codes)).astype(np.int64),
+            'revenue': np.bincount(rows, weights=transactions['basket_value'].to_numpy(), minlength=len(customer_codes)),
+        }, index=pd.Index(customers.cat.categories[customer_codes], dtype=object, name=self.state.index.name))
+        positions = self.state.index.get_indexer(batch.index)
+        known = positions >= 0
+
+        # Cohort of every customer in the batch and the last month already counted for them
+        cohort = month_numbers(batch['first_date'])
+        last_counted = np.full(len(batch), np.iinfo(np.int64).min)
+        if known.any():
+            cohort[known] = month_numbers(self.state['first_date'].to_numpy()[positions[known]])
+            last_counted[known] = month_numbers(self.state['last_date'].to_numpy()[positions[known]])
+
+        # Distinct (customer, month) pairs of the batch, counted once per
+        # customer and month whatever the number of appends within a month
+        months = month_numbers(dates)
+        first_month = months.min()
+        span = months.max() - first_month + 1
+        pairs = np.unique(rows * span + (months - first_month))
+        pair_rows = pairs // span
+        active_month = pairs % span + first_month
+        new = active_month > last_counted[pair_rows]
+        counts = (pd.DataFrame({'cohort': cohort[pair_rows][new],
+                                'offset': (active_month - cohort[pair_rows])[new]})
+                  .groupby(['cohort', 'offset']).size())
+        activity = self.activity.add(counts, fill_value=0).astype(np.int64)
+
+        first_dates = self.state['first_date'].to_numpy().copy()
+        last_dates = self.state['last_date'].to_numpy().copy()
+        counts_so_far = self.state['transactions'].to_numpy().copy()
+        revenue = self.state['revenue'].to_numpy().copy()
+        updated = positions[known]
+        first_dates[updated] = np.minimum(first_dates[updated], batch['first_date'].to_numpy()[known])
+        last_dates[updated] = np.maximum(last_dates[updated], batch['last_date'].to_numpy()[known])
+        counts_so_far[updated] += batch['transactions'].to_numpy()[known]
+        revenue[updated] += batch['revenue'].to_numpy()[known]
+        state = pd.DataFrame({'first_date': first_dates, 'last_date': last_dates,
+                              'transactions': counts_so_far, 'revenue': revenue}, index=self.state.index)
+        state = pd.concat([state, batch[~known].astype(state.dtypes.to_dict())])
+        return CustomerHistory(state, activity, through)
+
+    def rfm(self):
+        """Recency (days before the last purchase of anyone), frequency and monetary value per customer,
+        with their quintile scores and segment"""
+        if self._rfm is None:
+            state = self.state
+            recency = (state['last_date'].max() - state['last_date']).dt.days
+            rfm = pd.DataFrame({'recency': recency, 'frequency': state['transactions'],
+                                'monetary': state['revenue']})
+            rfm['r_score'] = scores(rfm['recency'], ascending=False)
+            rfm['f_score'] = scores(rfm['frequency'])
+            rfm['m_score'] = scores(rfm['monetary'])
+            conditions = [(rfm['r_score'] >= r) & (rfm['f_score'] >= f) for _, r, f in SEGMENTS]
+            names = [name for name, _, _ in SEGMENTS]
+            rfm['segment'] = pd.Categorical(np.select(conditions, names, default=names[-1]), categories=names)
+            self._rfm = rfm
+        return self._rfm
+
+    def segments(self):
+        """Customers, mean recency, frequency and monetary value per RFM segment"""
+        return (self.rfm().groupby('segment', observed=False)
+                .agg(customers=('recency', 'size'), recency=('recency', 'mean'),
+                     frequency=('frequency', 'mean'), monetary=('monetary', 'mean')))
+
+    def retention(self, start_date=None, end_date=None):
+        """Share of each monthly cohort acquired within start_date..end_date active N months later.
+
+        Returns cohort sizes indexed by the cohort's first day and a cohorts x
+        months-since-acquisition frame of shares, NaN where the month is
+        still in the future.
+        """
+        counts = self.activity.unstack('offset', fill_value=0)
+        if start_date is not None:
+            counts = counts[counts.index >= month_numbers([start_date])[0]]
+        if end_date is not None:
+            counts = counts[counts.index <= month_numbers([end_date])[0]]
+        if counts.empty:
+            return pd.Series(dtype=np.int64), pd.DataFrame()
+
+        last_month = month_numbers([self.state['last_date'].max()])[0]
+        cohorts = counts.index.to_numpy()
+        offsets = counts.columns.to_numpy()
+        sizes = counts[0] if 0 in counts.columns else pd.Series(0, index=counts.index)
+        shares = counts.div(sizes.replace(0, np.nan), axis=0)
+        shares = shares.where(cohorts[:, None] + offsets[None, :] <= last_month)
+        index = pd.DatetimeIndex(month_starts(cohorts), name='cohort')
+        sizes.index = index
+        shares.index = index
+        return sizes.rename('customers'), shares
@@ -0,0 +1,650 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import io
+import json
+import os
+import threading
+from basket import BasketIndex
+from customers import CustomerHistory
+from metrics import registry as metrics
+from sketches import DistinctSketches
+
+# Columns stored as pandas categoricals in the typed frame
+CATEGORICAL_COLUMNS = ['customer_id', 'category', 'product']
+
+CACHE_VERSION = 2
+
+def compact_sales_frame(df):
+    """Shrink a typed sales frame to the smallest dtypes that hold its values.
+
+    Categorical columns keep their integer codes plus lookup table, transaction
+    ids become int32 and quantities the smallest integer type that fits.
+    unit_price and discount are only displayed, so they drop to float32, while
+    total_price stays float64 so revenue sums are exact to the cent.
+    """
+    for column in CATEGORICAL_COLUMNS:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if df['transaction_id'].max() < np.iinfo(np.int32).max:
+        df['transaction_id'] = df['transaction_id'].astype(np.int32)
+    df['quantity'] = pd.to_numeric(df['quantity'], downcast='integer')
+    df['unit_price'] = df['unit_price'].astype(np.float32)
+    df['discount'] = df['discount'].astype(np.float32)
+    return df
+
+def _typed_frame(df):
+    """Convert a raw sales frame read from CSV into compact typed columns"""
+    df['date'] = pd.to_datetime(df['date'])
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    # Integer-code transaction ids like TXN-000001 by their numeric suffix,
+    # falling back to order of appearance for ids without one
+    numbers = _transaction_numbers(df['transaction_id'])
+    if numbers is not None:
+        df['transaction_id'] = numbers
+    else:
+        df['transaction_id'] = pd.factorize(df['transaction_id'])[0].astype(np.int64)
+    return compact_sales_frame(df)
+
+def _transaction_numbers(ids):
+    """Numeric suffixes of transaction ids as int64, or None unless every id has one"""
+    numbers = ids.astype(str).str.extract(r'(\d+)$', expand=False)
+    return numbers.astype(np.int64) if numbers.notna().all() else None
+
+def _file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _source_signature(csv_path, verify_hash, stat=None):
+    """Describe the CSV so a cache built from it can be checked for staleness"""
+    if stat is None:
+        stat = os.stat(csv_path)
+    signature = {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if verify_hash:
+        signature['sha256'] = _file_hash(csv_path)
+    return signature
+
+def _cache_paths(csv_path, cache_dir):
+    """Locations of the parquet cache and its metadata for csv_path"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.sales_cache')
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(cache_dir, f'{name}.parquet'), os.path.join(cache_dir, f'{name}.json')
+
+def _read_signature(meta_path):
+    """Signature stored alongside an existing cache, or None"""
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(df, cache_path, meta_path, signature):
+    """Write the parquet cache and its metadata, replacing any old cache atomically"""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_suffix = f'.tmp-{os.getpid()}'
+    df.to_parquet(cache_path + tmp_suffix, index=False)
+    with open(meta_path + tmp_suffix, 'w') as f:
+        json.dump(signature, f)
+    os.replace(cache_path + tmp_suffix, cache_path)
+    os.replace(meta_path + tmp_suffix, meta_path)
+
+def _complete_lines_end(f, size, block_size=1 << 16):
+    """Byte offset just past the last newline in the first size bytes of the binary file f"""
+    position = size
+    while position > 0:
+        start = max(position - block_size, 0)
+        f.seek(start)
+        block = f.read(position - start)
+        newline = block.rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+class _PrefixReader(io.RawIOBase):
+    """Read-only stream over the first limit bytes of a binary file"""
+
+    def __init__(self, f, limit):
+        self.f = f
+        self.remaining = limit
+        f.seek(0)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+def load_sales_data(csv_path='pet_shop_sales_data.csv', use_cache=True, cache_dir=None, verify_hash=False):
+    """Load the sales CSV as a typed frame, going through a columnar cache when possible.
+
+    The first load parses the CSV and writes a Parquet copy with datetime64
+    dates, categorical customer/category/product columns and integer-coded
+    transaction ids. Later loads read that copy as long as the CSV's mtime and
+    size (and SHA-256, with verify_hash=True) are unchanged.
+    """
+    return _load_sales_data(csv_path, use_cache, cache_dir, verify_hash)[0]
+
+def load_sales_data_and_tail(csv_path='pet_shop_sales_data.csv', use_cache=True, cache_dir=None):
+    """Load the sales CSV and a SalesCsvTail that continues exactly where the load stopped.
+
+    The file size is taken once and only the complete lines before it are
+    loaded; the tail starts at that same offset. Rows appended while the
+    load runs are therefore returned by the tail's first read and never
+    counted twice.
+    """
+    df, end = _load_sales_data(csv_path, use_cache, cache_dir)
+    return df, SalesCsvTail(csv_path, end)
+
+def _load_sales_data(csv_path, use_cache, cache_dir, verify_hash=False):
+    """Typed frame of the CSV's complete lines as of one stat, and the byte offset where they end"""
+    with open(csv_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        end = _complete_lines_end(f, stat.st_size)
+        # A cache describes the whole file, so it is only used while the file
+        # ends with a complete line
+        use_cache = use_cache and end == stat.st_size
+
+        if use_cache:
+            cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+            signature = _source_signature(csv_path, verify_hash, stat)
+            cached_signature = _read_signature(meta_path)
+            if cached_signature is not None and os.path.exists(cache_path):
+                if not verify_hash:
+                    cached_signature.pop('sha256', None)
+                if cached_signature == signature:
+                    return pd.read_parquet(cache_path), end
+
+        df = _typed_frame(pd.read_csv(io.BufferedReader(_PrefixReader(f, end))))
+
+    if use_cache:
+        try:
+            _write_cache(df, cache_path, meta_path, signature)
+        except OSError as e:
+            print(f"Could not write sales data cache: {e}")
+    return df, end
+
+def read_sales_metadata(csv_path='pet_shop_sales_data.csv', cache_dir=None):
+    """Categories and first/last date of a sales CSV, without loading it.
+
+    With an up-to-date columnar cache only its footer and category column are
+    read; otherwise just the date and category columns of the CSV are parsed.
+    """
+    cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+    cached_signature = _read_signature(meta_path)
+    if cached_signature is not None and os.path.exists(cache_path):
+        cached_signature.pop('sha256', None)
+        if cached_signature == _source_signature(csv_path, verify_hash=False):
+            import pyarrow.compute as pc
+            import pyarrow.parquet as pq
+            from parquet_dataset import _date_statistics
+            start_date, end_date = _date_statistics(cache_path, pq.ParquetFile(cache_path))
+            categories = pc.unique(pq.read_table(cache_path, columns=['category'])['category']
+                                   .combine_chunks().cast('string')).to_pylist()
+            return {'categories': sorted(categories), 'start_date': start_date, 'end_date': end_date}
+
+    df = pd.read_csv(csv_path, usecols=['date', 'category'], parse_dates=['date'])
+    return {'categories': sorted(df['category'].unique()),
+            'start_date': df['date'].min(), 'end_date': df['date'].max()}
+
+class SalesCsvTail:
+    """Reads rows appended to a sales CSV since the previous read.
+
+    Only the bytes after the last complete line already consumed are parsed.
+    read_new_rows() returns None when the file shrank, i.e. it was truncated
+    or rewritten, in which case the caller should reload it in full. It does
+    the same for rows whose transaction ids have no numeric suffix: those are
+    numbered by order of appearance, which restarts with every read, so
+    appended rows would reuse the codes of loaded transactions.
+    """
+
+    def __init__(self, csv_path, offset=None):
+        self.csv_path = csv_path
+        with open(csv_path, 'rb') as f:
+            self.columns = f.readline().decode().strip().split(',')
+        self.offset = os.path.getsize(csv_path) if offset is None else offset
+
+    def read_new_rows(self):
+        """Typed frame of the complete rows appended since the last call"""
+        size = os.path.getsize(self.csv_path)
+        if size < self.offset:
+            return None
+        if size == self.offset:
+            return pd.DataFrame(columns=self.columns)
+
+        with open(self.csv_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        # Leave a partially written last line for the next read
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return pd.DataFrame(columns=self.columns)
+        self.offset += end
+        new_rows = pd.read_csv(io.BytesIO(data[:end]), header=None, names=self.columns)
+        if _transaction_numbers(new_rows['transaction_id']) is None:
+            return None
+        return _typed_frame(new_rows)
+
+def _build_aggregates(df):
+    """Build the date-keyed aggregate tables for a frame of line items"""
+    day = df['date'].dt.normalize()
+    cube = (df.assign(date=day, quantity=df['quantity'].astype(np.int64), discount=df['discount'].astype(np.float64))
+            .groupby(['date', 'category', 'product'], observed=True)[['total_price', 'quantity', 'discount']]
+            .sum()
+            .reset_index())
+
+    return {'cube': cube, 'transactions': _build_transactions(df, day)}
+
+def _build_transactions(df, day):
+    """One row per transaction: date, customer, basket value, item count and category bitmask.
+
+    The bitmask has one bit per category the transaction bought from. Summing
+    the bits of the distinct (transaction, category) pairs is the same as
+    OR-ing them.
+    """
+    codes = df['category'].cat.codes.astype(np.int64)
+    pairs = pd.DataFrame({'transaction_id': df['transaction_id'], 'bit': np.left_shift(1, codes)})
+    masks = pairs.drop_duplicates().groupby('transaction_id')['bit'].sum()
+
+    grouped = pd.DataFrame({'transaction_id': df['transaction_id'], 'date': day,
+                            'customer_id': df['customer_id'], 'basket_value': df['total_price'],
+                            'item_count': df['quantity'].astype(np.int32)}).groupby('transaction_id')
+    transactions = grouped.agg(date=('date', 'first'), customer_id=('customer_id', 'first'),
+                               basket_value=('basket_value', 'sum'), item_count=('item_count', 'sum'))
+    transactions['mask'] = masks
+    return transactions.reset_index().sort_values(['date', 'transaction_id'], kind='stable', ignore_index=True)
+
+def _sorted_by_date(table):
+    """table sorted by its date column, without copying when it already is"""
+    if table['date'].is_monotonic_increasing:
+        if table.index.equals(pd.RangeIndex(len(table))):
+            return table
+        return table.reset_index(drop=True)
+    return table.sort_values('date', kind='stable', ignore_index=True)
+
+def _sorted_by_category_and_date(cube):
+    """cube sorted by category code then date, without copying when it already is"""
+    codes = cube['category'].cat.codes.to_numpy()
+    dates = cube['date'].to_numpy()
+    code_steps, date_steps = np.diff(codes), np.diff(dates)
+    if (code_steps >= 0).all() and ((code_steps > 0) | (date_steps >= np.timedelta64(0))).all() \
+            and cube.index.equals(pd.RangeIndex(len(cube))):
+        return cube
+    return cube.sort_values(['category', 'date'], kind='stable', ignore_index=True)
+
+def _date_bounds(dates, start_date=None, end_date=None):
+    """Positions [start, stop) of the dates within start_date..end_date in a sorted datetime64 array"""
+    start = 0 if start_date is None else np.searchsorted(dates, np.datetime64(start_date), side='left')
+    stop = len(dates) if end_date is None else np.searchsorted(dates, np.datetime64(end_date), side='right')
+    return start, max(start, stop)
+
+def _date_slice(table, start_date=None, end_date=None):
+    """Rows of a date-sorted table within start_date..end_date"""
+    if start_date is None and end_date is None:
+        return table
+    start, stop = _date_bounds(table['date'].to_numpy(), start_date, end_date)
+    return table.iloc[start:stop]
+
+def _harmonize_categoricals(frames):
+    """Give each categorical column the same sorted union of categories in every frame"""
+    for column in frames[0].columns:
+        if not isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            continue
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[column].cat.categories)
+        dtype = pd.CategoricalDtype(categories)
+        for frame in frames:
+            if frame[column].dtype != dtype:
+                frame[column] = frame[column].astype(dtype)
+    return frames
+
+class SalesDataset:
+    """Sales line items plus the pre-aggregated tables the dashboard is answered from.
+
+    Built once at load time. The cube holds revenue and quantity per
+    (date, category, product). The transaction table holds one row per
+    transaction with its date, customer, basket value, item count and
+    category bitmask, so transaction counts, basket metrics and customer
+    frequency for any selection are filtered reductions over it that never
+    touch line items.
+
+    Line items and the transaction table are kept sorted by date and the cube by
+    (category, date), with the row offset where each category starts, so any
+    date range resolves to contiguous slices found by binary search instead
+    of masks over whole tables.
+
+    A dataset is never modified after construction; append() returns a new
+    one, so callbacks holding a reference keep a consistent view.
+
+    This is the in-memory query backend. ParquetSalesDataset answers the same
+    select() queries by streaming over Parquet partitions on disk.
+
+    Given sketch_error, distinct transaction and customer counts for
+    selections with more than exact_below transactions are estimated from
+    DistinctSketches within that relative standard error.
+    """
+
+    def __init__(self, df, aggregates=None, sketch_error=None, exact_below=50000):
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date', kind='stable', ignore_index=True)
+        self.df = df
+        self.categories = list(df['category'].cat.categories)
+        if len(self.categories) > 62:
+            raise ValueError(f"At most 62 categories are supported, got {len(self.categories)}")
+        self.start_date = df['date'].min()
+        self.end_date = df['date'].max()
+        self.num_rows = len(df)
+
+        if aggregates is None:
+            aggregates = _build_aggregates(df)
+        self.cube = _sorted_by_category_and_date(aggregates['cube'])
+        self.transactions = _sorted_by_date(aggregates['transactions'])
+
+        # cube rows of category i are cube_offsets[i]:cube_offsets[i + 1]
+        self._cube_dates = self.cube['date'].to_numpy()
+        self.cube_offsets = np.searchsorted(self.cube['category'].cat.codes.to_numpy(),
+                                            np.arange(len(self.categories) + 1))
+        self.range_totals = RangeTotals(self)
+        self.sketch_error = sketch_error
+        self.exact_below = exact_below
+        self.sketches = None
+        if sketch_error:
+            # Sketches handed on by append() cover the days before the new
+            # rows; only the days from there on are sketched and merged in
+            earlier = aggregates.get('sketches')
+            if earlier is not None and earlier.error == sketch_error:
+                start_date = earlier.first_day + pd.Timedelta(days=earlier.num_days)
+                self.sketches = earlier.merge(DistinctSketches(self, sketch_error, start_date))
+            else:
+                self.sketches = DistinctSketches(self, sketch_error)
+        # Product pair counts are only built once a basket chart asks for them
+        self._baskets = None
+        self._baskets_lock = threading.Lock()
+        # Customer history, also built on first use. The part before the last
+        # day is kept apart, since a later append may add to the last day, so
+        # append() can hand it on and only the new days are folded in
+        self._customers = None
+        self._settled_customers = aggregates.get('customers')
+        self._customers_lock = threading.Lock()
+
+        # Content hash of the aggregates; identical in every process that
+        # loads the same data, so it can key caches shared between workers
+        row_hashes = pd.util.hash_pandas_object(self.cube, index=False).to_numpy()
+        self.version = hashlib.sha1(row_hashes.tobytes()).hexdigest()[:12]
+
+    def append(self, new_rows):
+        """Return a new dataset with new_rows (a typed frame) added.
+
+        Only the days touched by new_rows are re-aggregated; tables for
+        earlier days are reused. Transactions never span days, so the result
+        is the same as rebuilding from scratch.
+        """
+        if new_rows.empty:
+            return self
+        old_df, new_rows = _harmonize_categoricals([self.df.copy(deep=False), new_rows.copy(deep=False)])
+        df = pd.concat([old_df, new_rows], ignore_index=True)
+        if list(df['category'].cat.categories) != self.categories:
+            # New categories renumber the bitmasks, so start over
+            return SalesDataset(df, sketch_error=self.sketch_error, exact_below=self.exact_below)
+
+        first_day = new_rows['date'].min().normalize()
+        recent = _build_aggregates(df[df['date'] >= first_day])
+        aggregates = {}
+        for name, table in recent.items():
+            previous = getattr(self, name)
+            previous, table = _harmonize_categoricals([previous[previous['date'] < first_day].copy(), table])
+            aggregates[name] = pd.concat([previous, table], ignore_index=True)
+        settled = self._settled_customers
+        if settled is not None and first_day >= settled.through:
+            aggregates['customers'] = settled
+        if self.sketches is not None and first_day > self.sketches.first_day:
+            aggregates['sketches'] = self.sketches.before(first_day)
+        return SalesDataset(df, aggregates, self.sketch_error, self.exact_below)
+
+    def memory_usage(self):
+        """Approximate bytes held by the line items and every derived table"""
+        frames = [self.df, self.cube, self.transactions]
+        arrays = list(self.range_totals.cumulative.values()) + [self.range_totals.cumulative_transactions]
+        sketch_bytes = self.sketches.nbytes if self.sketches is not None else 0
+        basket_bytes = self._baskets.nbytes if self._baskets is not None else 0
+        customer_bytes = self._customers.nbytes if self._customers is not None else 0
+        return int(sum(frame.memory_usage(deep=True).sum() for frame in frames) + sum(a.nbytes for a in arrays)
+                   + sketch_bytes + basket_bytes + customer_bytes)
+
+    @property
+    def baskets(self):
+        """BasketIndex of per-day product and product pair basket counts, built on first use"""
+        with self._baskets_lock:
+            if self._baskets is None:
+                with metrics.stage('build_baskets') as stage:
+                    self._baskets = BasketIndex(self)
+                    stage.rows = self.num_rows
+            return self._baskets
+
+    @property
+    def customer_history(self):
+        """CustomerHistory of every transaction, built on first use.
+
+        After append() only the transactions from the previous dataset's last
+        day on are folded into its history.
+        """
+        with self._customers_lock:
+            if self._customers is None:
+                last_day = self.end_date.normalize()
+                settled = self._settled_customers
+                start = None if settled is None else settled.through
+                with metrics.stage('build_customer_history') as stage:
+                    recent = _date_slice(self.transactions, start, last_day - pd.Timedelta(days=1))
+                    stage.rows = len(recent)
+                    settled = (settled or CustomerHistory()).extend(recent, last_day)
+                    self._settled_customers = settled
+                    self._customers = settled.extend(_date_slice(self.transactions, last_day, None),
+                                                     last_day + pd.Timedelta(days=1))
+            return self._customers
+
+    def category_mask(self, categories):
+        """Bitmask with the bits of the given category names set"""
+        return sum(1 << self.categories.index(c) for c in set(categories) if c in self.categories)
+
+    def select(self, start_date=None, categories=None, end_date=None):
+        """Aggregates for start_date..end_date (inclusive, open ends when None) and categories (all when empty)"""
+        return SalesSelection(self, start_date, categories, end_date)
+
+    def cube_slice(self, start_date=None, end_date=None, categories=None):
+        """Cube rows for a date range and categories, gathered from per-category slices"""
+        if not categories and start_date is None and end_date is None:
+            return self.cube
+        codes = range(len(self.categories)) if not categories else \
+            sorted(self.categories.index(c) for c in set(categories) if c in self.categories)
+        pieces = []
+        for code in codes:
+            lo, hi = self.cube_offsets[code], self.cube_offsets[code + 1]
+            start, stop = _date_bounds(self._cube_dates[lo:hi], start_date, end_date)
+            pieces.append(self.cube.iloc[lo + start:lo + stop])
+        if len(pieces) == 1:
+            return pieces[0]
+        return pd.concat(pieces) if pieces else self.cube.iloc[:0]
+
+
+class RangeTotals:
+    """Per-day cumulative totals that answer any date range in constant time.
+
+    Revenue (in integer cents, so sums are exact), quantity and discount are
+    accumulated per (day, category). Transaction counts are accumulated per
+    (day, category bitmask); a category selection adds up the columns of the
+    bitmasks it intersects. A range total is then cumulative[end + 1] -
+    cumulative[start], whatever the number of rows or days in the range.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.first_day = dataset.start_date.normalize()
+        num_days = (dataset.end_date.normalize() - self.first_day).days + 1
+
+        cube = dataset.cube
+        day = (cube['date'] - self.first_day).dt.days.to_numpy()
+        category = cube['category'].cat.codes.to_numpy()
+        measures = {
+            'revenue': np.round(cube['total_price'].to_numpy() * 100).astype(np.int64),
+            'quantity': cube['quantity'].to_numpy().astype(np.int64),
+            'discount': cube['discount'].to_numpy().astype(np.float64),
+        }
+        self.cumulative = {}
+        for name, values in measures.items():
+            daily = np.zeros((num_days + 1, len(dataset.categories)), dtype=values.dtype)
+            np.add.at(daily, (day + 1, category), values)
+            self.cumulative[name] = np.cumsum(daily, axis=0)
+
+        transactions = dataset.transactions
+        self.masks, mask_column = np.unique(transactions['mask'].to_numpy(), return_inverse=True)
+        daily = np.zeros((num_days + 1, len(self.masks)), dtype=np.int64)
+        np.add.at(daily, ((transactions['date'] - self.first_day).dt.days.to_numpy() + 1, mask_column), 1)
+        self.cumulative_transactions = np.cumsum(daily, axis=0)
+
+    def _positions(self, start_date, end_date):
+        """Cumulative-array rows bounding the days start_date..end_date"""
+        num_days = len(self.cumulative_transactions) - 1
+        start = 0 if start_date is None else (pd.Timestamp(start_date).normalize() - self.first_day).days
+        stop = num_days if end_date is None else (pd.Timestamp(end_date).normalize() - self.first_day).days + 1
+        start, stop = min(max(start, 0), num_days), min(max(stop, 0), num_days)
+        return start, max(start, stop)
+
+    def totals(self, start_date=None, end_date=None, categories=None):
+        """Revenue, quantity, discount and transaction count for a date range and categories"""
+        start, stop = self._positions(start_date, end_date)
+        if categories:
+            columns = sorted(self.dataset.categories.index(c) for c in set(categories)
+                             if c in self.dataset.categories)
+            mask = self.dataset.category_mask(categories)
+            mask_columns = (self.masks & mask) != 0
+        else:
+            columns = slice(None)
+            mask_columns = slice(None)
+
+        totals = {name: (cumulative[stop, columns] - cumulative[start, columns]).sum()
+                  for name, cumulative in self.cumulative.items()}
+        totals['revenue'] = totals['revenue'] / 100
+        totals['quantity'] = int(totals['quantity'])
+        totals['discount'] = float(totals['discount'])
+        totals['transactions'] = int((self.cumulative_transactions[stop, mask_columns]
+                                      - self.cumulative_transactions[start, mask_columns]).sum())
+        return totals
+
+    def compare_previous(self, start_date=None, end_date=None, categories=None):
+        """Totals for a range and for the range of the same length just before it"""
+        start_date = self.first_day if start_date is None else pd.Timestamp(start_date).normalize()
+        end_date = self.dataset.end_date if end_date is None else pd.Timestamp(end_date)
+        length = end_date.normalize() - start_date + pd.Timedelta(days=1)
+        current = self.totals(start_date, end_date, categories)
+        previous = self.totals(start_date - length, start_date - pd.Timedelta(days=1), categories)
+        return current, previous
+
+
+class SalesSelection:
+    """One filter applied to a SalesDataset's aggregate tables"""
+
+    def __init__(self, dataset, start_date=None, categories=None, end_date=None):
+        self.dataset = dataset
+        self.start_date = start_date
+        self.end_date = end_date
+        self.categories = categories
+        cube = dataset.cube_slice(start_date, end_date, categories)
+        transactions = _date_slice(dataset.transactions, start_date, end_date)
+
+        if categories:
+            mask = dataset.category_mask(categories)
+            transactions = transactions[(transactions['mask'].to_numpy() & mask) != 0]
+
+        self.cube = cube
+        self.transactions = transactions
+        # Large selections count distinct values from the sketches when available
+        self.approximate = dataset.sketches is not None and len(transactions) > dataset.exact_below
+
+    def totals(self):
+        """Headline totals from the dataset's prefix sums"""
+        return self.dataset.range_totals.totals(self.start_date, self.end_date, self.categories)
+
+    def compare_previous(self):
+        """Headline totals for this selection and the previous period of the same length"""
+        return self.dataset.range_totals.compare_previous(self.start_date, self.end_date, self.categories)
+
+    def total_revenue(self):
+        return self.totals()['revenue']
+
+    def total_transactions(self):
+        return self.totals()['transactions']
+
+    def average_basket(self):
+        """Mean transaction value over the selected line items"""
+        # With a category filter only the selected categories' share of each basket counts
+        totals = self.totals()
+        return totals['revenue'] / totals['transactions']
+
+    @metrics.timed('revenue_by_date', rows='cube')
+    def revenue_by_date(self, freq=None):
+        """Revenue per day with sales, or per resample bin (e.g. 'W-MON', 'M') when freq is given"""
+        daily = self.cube.groupby('date')['total_price'].sum()
+        return daily.resample(freq).sum() if freq else daily
+
+    def distinct_customers(self):
+        """Number of customers with a selected transaction, estimated for large selections"""
+        if self.approximate:
+            return self.dataset.sketches.count('customers', self.start_date, self.end_date, self.categories)
+        return self.transactions['customer_id'].nunique()
+
+    @metrics.timed('transactions_by_date', rows='transactions')
+    def transactions_by_date(self, freq=None):
+        """Transaction count per day with sales, or per resample bin when freq is given"""
+        if self.approximate:
+            return self.dataset.sketches.count_by_date('transactions', self.start_date, self.end_date,
+                                                       self.categories, freq)
+        daily = self.transactions.groupby('date').size().rename('transactions')
+        return daily.resample(freq).sum() if freq else daily
+
+    @metrics.timed('revenue_by', rows='cube')
+    def revenue_by(self, column):
+        """Revenue per 'category' or 'product'"""
+        return self.cube.groupby(column, observed=True)['total_price'].sum()
+
+    @metrics.timed('revenue_by_month', rows='cube')
+    def revenue_by_month(self):
+        return self.cube.groupby(self.cube['date'].dt.month.rename('month'))['total_price'].sum()
+
+    @metrics.timed('revenue_by_month_and_category', rows='cube')
+    def revenue_by_month_and_category(self):
+        month = self.cube['date'].dt.month.rename('month')
+        return self.cube.groupby([month, 'category'], observed=True)['total_price'].sum()
+
+    @metrics.timed('revenue_by_weekday', rows='cube')
+    def revenue_by_weekday(self):
+        return self.cube.groupby(self.cube['date'].dt.dayofweek.rename('day_of_week'))['total_price'].sum()
+
+    @metrics.timed('transactions_by_weekday', rows='transactions')
+    def transactions_by_weekday(self):
+        if self.approximate:
+            return self.dataset.sketches.count_by_weekday('transactions', self.start_date, self.end_date,
+                                                          self.categories)
+        day_of_week = self.transactions['date'].dt.dayofweek.rename('day_of_week')
+        return self.transactions.groupby(day_of_week).size().rename('transactions')
+
+    @metrics.timed('customer_frequency', rows='transactions')
+    def customer_frequency(self):
+        """Number of selected transactions per customer"""
+        return self.transactions.groupby('customer_id', observed=True).size().rename('transactions')
+
+    @metrics.timed('product_pairs', rows='transactions')
+    def product_pairs(self, min_baskets=1):
+        """Support, confidence and lift of the selected products bought together in at least min_baskets baskets"""
+        return self.dataset.baskets.pair_statistics(self.total_transactions(), self.start_date, self.end_date,
+                                                    self.categories, min_baskets)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Positions of the points Largest-Triangle-Three-Buckets keeps out of a series.
+
+    The first and last points are always kept. Every bucket in between keeps
+    the point forming the largest triangle with the point kept in the
+    previous bucket and the mean of the next bucket, which preserves peaks,
+    troughs and the overall shape far better than taking every n-th point.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        # Twice the triangle areas; the factor does not change the argmax
+        areas = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample_series(series, threshold):
+    """Points of a Series (indexed by date or number) that LTTB keeps, at most threshold of them"""
+    if len(series) <= threshold:
+        return series
+    index = series.index
+    if np.issubdtype(index.dtype, np.datetime64):
+        x = index.asi8
+    else:
+        x = np.asarray(index, dtype=np.float64)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), threshold)]
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from charts import dashboard_filters, time_frequency
+from dataset import load_sales_data, SalesDataset, _date_slice
+
+PERIODS = ['30D', '90D', '6M', '1Y', 'ALL']
+
+# Purchase count bins of the customer frequency chart: 1, 2, 3, 4-5, 6-10, 11-20, 21-50, 51+
+FREQUENCY_EDGES = [1, 2, 3, 4, 6, 11, 21, 51]
+FREQUENCY_LABELS = ['1', '2', '3', '4-5', '6-10', '11-20', '21-50', '51+']
+
+# Customer frequency is not additive over categories, so a histogram is
+# exported for every category subset up to this many categories; above it,
+# only for all categories and each category on its own
+MAX_SUBSET_CATEGORIES = 10
+
+
+def time_buckets(dates, freq):
+    """Label of the revenue chart bin each date falls in, as resample(freq) labels them"""
+    if freq is None:
+        return dates.dt.normalize()
+    return dates.dt.to_period(freq).dt.end_time.dt.normalize()
+
+def rounded(values):
+    """Amounts to the cent, as plain lists for JSON"""
+    return np.round(np.asarray(values, dtype=np.float64), 2).tolist()
+
+def category_matrix(values, codes, keys, num_categories, labels):
+    """Sum values per (category code, key) into a categories x labels list of lists"""
+    table = (pd.DataFrame({'code': codes, 'key': keys, 'value': values})
+             .groupby(['code', 'key'])['value'].sum()
+             .unstack(fill_value=0)
+             .reindex(index=range(num_categories), columns=labels, fill_value=0))
+    return table.to_numpy()
+
+def mask_matrix(masks, keys, mask_order, labels):
+    """Transaction count per (category bitmask, key) as a masks x labels array"""
+    table = (pd.DataFrame({'mask': masks, 'key': keys})
+             .groupby(['mask', 'key']).size()
+             .unstack(fill_value=0)
+             .reindex(index=mask_order, columns=labels, fill_value=0))
+    return table.to_numpy()
+
+def category_subsets(num_categories):
+    """Bitmasks of the category selections whose customer frequency is exported"""
+    full = (1 << num_categories) - 1
+    if num_categories <= MAX_SUBSET_CATEGORIES:
+        return list(range(1, full + 1))
+    return [full] + [1 << code for code in range(num_categories)]
+
+def customer_frequency_histograms(transactions, subsets):
+    """Histogram of purchases per customer for each category subset bitmask.
+
+    Transactions are first counted per (customer, bitmask); each subset then
+    sums the counts of the bitmasks it intersects per customer with one
+    bincount, so the work per subset is proportional to those pairs rather
+    than to the transactions.
+    """
+    pairs = transactions.groupby(['customer_id', 'mask'], observed=True).size()
+    customers = pairs.index.codes[0]
+    masks = pairs.index.get_level_values('mask').to_numpy()
+    counts = pairs.to_numpy()
+    num_customers = len(pairs.index.levels[0])
+
+    histograms = {}
+    for subset in subsets:
+        hit = (masks & subset) != 0
+        per_customer = np.bincount(customers[hit], weights=counts[hit], minlength=num_customers)
+        per_customer = per_customer[per_customer > 0]
+        bins = np.searchsorted(FREQUENCY_EDGES, per_customer, side='right') - 1
+        histograms[str(subset)] = np.bincount(bins, minlength=len(FREQUENCY_EDGES)).tolist()
+    return histograms
+
+def export_period(dataset, time_period):
+    """Every aggregate the static dashboard draws for one period, broken down so any category
+    selection is a sum over a few short arrays.
+
+    Additive measures (revenue) are split per category. Transaction counts
+    are split per category bitmask: a selection counts the transactions of
+    the bitmasks it intersects. Customer frequency histograms are
+    precomputed per category subset.
+    """
+    filters = dashboard_filters(dataset, time_period, [])
+    start_date = filters['start_date']
+    freq, title = time_frequency(filters)
+    num_categories = len(dataset.categories)
+
+    cube = dataset.cube_slice(start_date, None)
+    transactions = _date_slice(dataset.transactions, start_date, None)
+    codes = cube['category'].cat.codes.to_numpy()
+    revenue = cube['total_price'].to_numpy()
+
+    # Revenue over time, with empty bins kept so every series has the same dates
+    cube_buckets = time_buckets(cube['date'], freq)
+    transaction_buckets = time_buckets(transactions['date'], freq)
+    if freq is None:
+        dates = pd.DatetimeIndex(sorted(set(cube_buckets) | set(transaction_buckets)))
+    else:
+        dates = pd.date_range(min(cube_buckets.min(), transaction_buckets.min()),
+                              max(cube_buckets.max(), transaction_buckets.max()), freq=freq)
+    mask_order = sorted(transactions['mask'].unique().tolist())
+
+    # Weekday and month rollups
+    weekdays = list(range(7))
+    months = sorted(cube['date'].dt.month.unique().tolist())
+
+    products = cube.groupby(['product', 'category'], observed=True)['total_price'].sum()
+    products = products[products != 0]
+
+    totals = [dataset.range_totals.totals(start_date, None, [category])['revenue']
+              for category in dataset.categories]
+
+    return {
+        'period': time_period,
+        'start_date': (cube['date'].min() if start_date is None else start_date).date().isoformat(),
+        'end_date': dataset.end_date.date().isoformat(),
+        'title': title,
+        'frequency': freq or 'D',
+        'categories': list(dataset.categories),
+        'masks': mask_order,
+        'revenue_total': rounded(totals),
+        'dates': [date.date().isoformat() for date in dates],
+        'revenue': [rounded(row) for row in category_matrix(revenue, codes, cube_buckets, num_categories, dates)],
+        'transactions': mask_matrix(transactions['mask'], transaction_buckets, mask_order, dates).tolist(),
+        'weekday': {
+            'revenue': [rounded(row) for row in category_matrix(revenue, codes, cube['date'].dt.dayofweek,
+                                                                num_categories, weekdays)],
+            'transactions': mask_matrix(transactions['mask'], transactions['date'].dt.dayofweek,
+                                        mask_order, weekdays).tolist(),
+        },
+        'month': {
+            'months': months,
+            'revenue': [rounded(row) for row in category_matrix(revenue, codes, cube['date'].dt.month,
+                                                                num_categories, months)],
+        },
+        'products': {
+            'names': products.index.get_level_values('product').astype(str).tolist(),
+            'categories': products.index.codes[1].tolist(),
+            'revenue': rounded(products.to_numpy()),
+        },
+        'customer_frequency': {
+            'labels': FREQUENCY_LABELS,
+            'histograms': customer_frequency_histograms(transactions, category_subsets(num_categories)),
+        },
+    }
+
+def export_dashboard(dataset, output_dir, periods=PERIODS, shard=False):
+    """Write the static dashboard's data to output_dir; returns the files written.
+
+    manifest.json lists the categories and periods. Without sharding each
+    period's data is embedded in it; with shard=True each period is written
+    to its own file, which the page fetches the first time it is selected.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {
+        'categories': list(dataset.categories),
+        'start_date': dataset.start_date.date().isoformat(),
+        'end_date': dataset.end_date.date().isoformat(),
+        'version': dataset.version,
+        'periods': [],
+    }
+    files = ['manifest.json']
+    for time_period in periods:
+        data = export_period(dataset, time_period)
+        entry = {'value': time_period, 'start_date': data['start_date']}
+        if shard:
+            entry['file'] = f'period-{time_period}.json'
+            with open(os.path.join(output_dir, entry['file']), 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            files.append(entry['file'])
+        else:
+            entry['data'] = data
+        manifest['periods'].append(entry)
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    return files
+
+def parse_args(argv=None):
+    """Parse command line options for the static dashboard export"""
+    parser = argparse.ArgumentParser(description='Pre-aggregate sales data for the static dashboard (index.html)')
+    parser.add_argument('--data', default='pet_shop_sales_data.csv', help='sales CSV to export')
+    parser.add_argument('--output', default='static_data', help='directory for the JSON files')
+    parser.add_argument('--periods', nargs='+', default=PERIODS, choices=PERIODS, help='time periods to export')
+    parser.add_argument('--shard', action='store_true',
+                        help='write one file per period, fetched by the page when first selected')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    started = time.perf_counter()
+    dataset = SalesDataset(load_sales_data(args.data))
+    files = export_dashboard(dataset, args.output, periods=args.periods, shard=args.shard)
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in files)
+    print(f"Wrote {len(files)} files ({size / 1024:.0f} KiB) to {args.output} in {time.perf_counter() - started:.1f}s")
@@ -2,9 +2,16 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import random
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 # Set random seed for reproducibility
 np.random.seed(42)
+random.seed(42)
 
 # Define constants
 START_DATE = datetime(2024, 1, 1)
@@ -125,14 +132,279 @@ def generate_sales_data():
     
     return df
 
+# Category lookup tables used by the vectorized generator, in CATEGORIES order
+CATEGORY_NAMES = np.array(list(CATEGORIES.keys()), dtype=object)
+CATEGORY_WEIGHTS = np.array([0.25, 0.20, 0.15, 0.15, 0.10, 0.05, 0.05, 0.05])
+PRODUCT_NAMES = np.array([CATEGORIES[c] for c in CATEGORY_NAMES], dtype=object)
+PRICE_BOUNDS = np.array([PRICE_RANGES[c] for c in CATEGORY_NAMES], dtype=float)
+SEASONAL_FACTORS = np.array([SEASONAL_TRENDS[c] for c in CATEGORY_NAMES])
+WEEKLY_FACTORS = np.array(WEEKLY_PATTERNS)
+
+def _daily_transaction_counts(rng, dates, mean_daily_transactions):
+    """Draw the number of transactions for each day in dates"""
+    base_transactions = rng.poisson(mean_daily_transactions, len(dates))
+    day_of_week = dates.dayofweek.to_numpy()
+    return (base_transactions * WEEKLY_FACTORS[day_of_week]).astype(np.int64)
+
+def _format_ids(prefix, numbers, width):
+    """Format non-negative integer ids as zero-padded strings, e.g. TXN-000001.
+
+    The digits are computed with array arithmetic and written as ASCII bytes,
+    one group per id length, so there is no Python call per id.
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    head = np.frombuffer(prefix.encode('ascii'), dtype=np.uint8)
+    # Digits per id: the number's own length, padded to at least width
+    lengths = np.maximum(np.searchsorted(10 ** np.arange(1, 19, dtype=np.int64), numbers, side='right') + 1, width)
+    ids = np.empty(len(numbers), dtype=f'U{len(head) + (lengths.max() if len(numbers) else width)}')
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        chars = np.empty((len(rows), len(head) + length), dtype=np.uint8)
+        chars[:, :len(head)] = head
+        powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+        chars[:, len(head):] = numbers[rows, None] // powers % 10 + ord('0')
+        ids[rows] = chars.view(f'S{chars.shape[1]}').ravel()
+    # As objects, the per-line-item copies taken by indexing share one string per id
+    return ids.astype(object)
+
+def _generate_block(rng, start_date, num_days, first_transaction=1,
+                    num_customers=NUM_CUSTOMERS, mean_daily_transactions=25):
+    """Generate num_days of sales starting at start_date as whole NumPy arrays"""
+    dates = pd.date_range(start_date, periods=num_days, freq='D')
+    daily_transactions = _daily_transaction_counts(rng, dates, mean_daily_transactions)
+    num_transactions = int(daily_transactions.sum())
+    
+    # One entry per transaction
+    txn_day = np.repeat(np.arange(num_days), daily_transactions)
+    txn_customer = rng.integers(0, num_customers, num_transactions)
+    basket_size = rng.poisson(2, num_transactions) + 1  # At least 1 item, average of 3
+    
+    # One entry per basket item
+    item_txn = np.repeat(np.arange(num_transactions), basket_size)
+    num_items = len(item_txn)
+    category = rng.choice(len(CATEGORY_NAMES), size=num_items, p=CATEGORY_WEIGHTS)
+    
+    # Apply seasonal trend
+    item_day = txn_day[item_txn]
+    month_idx = dates.month.to_numpy()[item_day] - 1
+    keep = rng.random(num_items) <= SEASONAL_FACTORS[category, month_idx]
+    
+    product = rng.integers(0, PRODUCT_NAMES.shape[1], num_items)
+    low, high = PRICE_BOUNDS[category, 0], PRICE_BOUNDS[category, 1]
+    price = np.round(rng.uniform(low, high), 2)
+    quantity = rng.geometric(p=0.7, size=num_items)
+    total_price = np.round(quantity * price, 2)
+    
+    # Add some random discounts (about 10% of line items)
+    discount_mask = rng.random(num_items) < 0.1
+    discount = np.where(discount_mask, total_price * rng.uniform(0.05, 0.25, num_items), 0.0)
+    total_price = np.round(total_price - discount, 2)
+    
+    item_txn, item_day, category, product = item_txn[keep], item_day[keep], category[keep], product[keep]
+    customer_ids = _format_ids('CUST-', np.arange(1, num_customers + 1), 4)
+    transaction_ids = _format_ids('TXN-', np.arange(first_transaction, first_transaction + num_transactions), 6)
+    
+    return pd.DataFrame({
+        'transaction_id': transaction_ids[item_txn],
+        'date': dates.to_numpy()[item_day],
+        'customer_id': customer_ids[txn_customer[item_txn]],
+        'category': CATEGORY_NAMES[category],
+        'product': PRODUCT_NAMES[category, product],
+        'quantity': quantity[keep],
+        'unit_price': price[keep],
+        'total_price': total_price[keep],
+        'discount': discount[keep]
+    })
+
+def generate_sales_data_fast(num_customers=NUM_CUSTOMERS, start_date=START_DATE, num_days=NUM_DAYS,
+                             mean_daily_transactions=25, seed=42):
+    """Generate synthetic pet shop sales data with batched NumPy draws.
+    
+    Uses the same distributions as generate_sales_data() but draws every
+    column as a whole array, so it is suitable for datasets far larger than
+    the bundled CSV. Output is reproducible for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    return _generate_block(rng, start_date, num_days,
+                           num_customers=num_customers,
+                           mean_daily_transactions=mean_daily_transactions)
+
+def _plan_chunks(chunk_freq, start_date, num_days, mean_daily_transactions, seed):
+    """Split the date range into day or month chunks, each with its own seed and first transaction id.
+    
+    Every chunk draws from an independent SeedSequence child of seed, so the
+    plan does not depend on how many processes later generate the chunks.
+    """
+    if chunk_freq not in ('D', 'M'):
+        raise ValueError(f"chunk_freq must be 'D' or 'M', got {chunk_freq!r}")
+    
+    start_date = pd.Timestamp(start_date)
+    end_date = start_date + pd.Timedelta(days=num_days)
+    boundaries = pd.date_range(start_date, end_date, freq='D' if chunk_freq == 'D' else 'MS')
+    boundaries = boundaries.union([start_date, end_date])
+    chunk_seeds = np.random.SeedSequence(seed).spawn(len(boundaries) - 1)
+    
+    plan = []
+    next_transaction = 1
+    for chunk_start, chunk_end, chunk_seed in zip(boundaries[:-1], boundaries[1:], chunk_seeds):
+        chunk_days = (chunk_end - chunk_start).days
+        # The transaction counts are the first draw of the chunk's stream, so
+        # they can be replayed here to number transactions ahead of time
+        dates = pd.date_range(chunk_start, periods=chunk_days, freq='D')
+        counts = _daily_transaction_counts(np.random.default_rng(chunk_seed), dates, mean_daily_transactions)
+        plan.append((chunk_start, chunk_days, chunk_seed, next_transaction))
+        next_transaction += int(counts.sum())
+    return plan
+
+def _generate_chunk(task):
+    """Generate one planned chunk; runs in a worker process"""
+    chunk_start, chunk_days, chunk_seed, first_transaction, num_customers, mean_daily_transactions = task
+    chunk_df = _generate_block(np.random.default_rng(chunk_seed), chunk_start, chunk_days,
+                               first_transaction=first_transaction,
+                               num_customers=num_customers,
+                               mean_daily_transactions=mean_daily_transactions)
+    return chunk_start, chunk_df
+
+def _write_partition(task, output, file_format, label_format):
+    """Generate one planned chunk and write it as its own partition file; runs in a worker process"""
+    chunk_start, chunk_df = _generate_chunk(task)
+    path = os.path.join(output, f"sales_{chunk_start.strftime(label_format)}.{file_format}")
+    if file_format == 'csv':
+        chunk_df.to_csv(path, index=False)
+    else:
+        chunk_df.to_parquet(path, index=False)
+    return len(chunk_df)
+
+def _chunk_tasks(chunk_freq='M', num_customers=NUM_CUSTOMERS, start_date=START_DATE,
+                 num_days=NUM_DAYS, mean_daily_transactions=25, seed=42):
+    """Build the picklable work items for every chunk of the date range"""
+    return [chunk + (num_customers, mean_daily_transactions)
+            for chunk in _plan_chunks(chunk_freq, start_date, num_days, mean_daily_transactions, seed)]
+
+def _run_tasks(func, tasks, workers):
+    """Yield func(task) for every task in order, on a process pool when workers > 1"""
+    if workers == 1:
+        for task in tasks:
+            yield func(task)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of chunks in flight so memory stays bounded
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(func, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_sales_chunks(chunk_freq='M', workers=1, **kwargs):
+    """Yield (chunk_start, DataFrame) pairs covering the date range one day or month at a time.
+    
+    Keyword arguments are the scale knobs of generate_sales_data_fast().
+    Transaction ids continue across chunks, so concatenating the chunks gives
+    one consistent dataset while only a few chunks are held in memory. With
+    workers > 1 chunks are generated on a process pool; the output is the
+    same for any number of workers.
+    """
+    return _run_tasks(_generate_chunk, _chunk_tasks(chunk_freq, **kwargs), workers)
+
+def generate_sales_data_sharded(chunk_freq='M', workers=None, **kwargs):
+    """Generate sales data on a process pool, one shard per month (or day).
+    
+    Keyword arguments are passed to iter_sales_chunks(). The result is
+    identical for any worker count given the same seed and chunk_freq.
+    """
+    chunks = iter_sales_chunks(chunk_freq=chunk_freq, workers=workers or os.cpu_count(), **kwargs)
+    return pd.concat([chunk_df for _, chunk_df in chunks], ignore_index=True)
+
+def write_sales_data_chunked(output, file_format='csv', partitioned=False, chunk_freq='M', workers=1, **kwargs):
+    """Stream generated sales data to disk one chunk at a time.
+    
+    With partitioned=False all chunks are appended to the single file output.
+    With partitioned=True output is a directory holding one file per chunk,
+    named after the chunk's start date, and each worker process writes its
+    own partitions. Remaining keyword arguments are passed to
+    iter_sales_chunks(). Returns the number of rows written.
+    """
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"file_format must be 'csv' or 'parquet', got {file_format!r}")
+    
+    if partitioned:
+        os.makedirs(output, exist_ok=True)
+        label_format = '%Y-%m-%d' if chunk_freq == 'D' else '%Y-%m'
+        write_partition = partial(_write_partition, output=output, file_format=file_format,
+                                  label_format=label_format)
+        return sum(_run_tasks(write_partition, _chunk_tasks(chunk_freq, **kwargs), workers))
+    
+    num_rows = 0
+    parquet_writer = None
+    try:
+        for _, chunk_df in iter_sales_chunks(chunk_freq=chunk_freq, workers=workers, **kwargs):
+            if file_format == 'csv':
+                chunk_df.to_csv(output, mode='w' if num_rows == 0 else 'a', header=num_rows == 0, index=False)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk_df, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(output, table.schema)
+                parquet_writer.write_table(table)
+            num_rows += len(chunk_df)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+    
+    return num_rows
+
+def parse_args(argv=None):
+    """Parse command line options for the data generator"""
+    parser = argparse.ArgumentParser(description='Generate synthetic pet shop sales data')
+    parser.add_argument('--output', default='pet_shop_sales_data.csv', help='CSV file to write')
+    parser.add_argument('--fast', action='store_true', help='use the vectorized NumPy generator')
+    parser.add_argument('--customers', type=int, default=NUM_CUSTOMERS, help='number of distinct customers')
+    parser.add_argument('--days', type=int, default=NUM_DAYS, help='number of days starting at START_DATE')
+    parser.add_argument('--transactions-per-day', type=float, default=25, help='mean transactions per day')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the vectorized generator')
+    parser.add_argument('--stream', action='store_true',
+                        help='write the vectorized data chunk by chunk instead of building it in memory')
+    parser.add_argument('--chunk', choices=['D', 'M'], default='M', help='streaming chunk size: day or month')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='streaming output format')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='write one file per chunk into the --output directory')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='generate chunks on this many processes (implies the vectorized generator)')
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    
+    if args.stream:
+        num_rows = write_sales_data_chunked(args.output, file_format=args.format,
+                                            partitioned=args.partitioned, chunk_freq=args.chunk,
+                                            num_customers=args.customers, num_days=args.days,
+                                            mean_daily_transactions=args.transactions_per_day,
+                                            seed=args.seed, workers=args.workers)
+        print(f"Streamed {num_rows} sales records spanning {args.days} days to {args.output}")
+        sys.exit(0)
+    
     # Generate sales data
-    sales_df = generate_sales_data()
+    if args.workers > 1:
+        sales_df = generate_sales_data_sharded(chunk_freq=args.chunk, workers=args.workers,
+                                               num_customers=args.customers, num_days=args.days,
+                                               mean_daily_transactions=args.transactions_per_day,
+                                               seed=args.seed)
+    elif args.fast:
+        sales_df = generate_sales_data_fast(num_customers=args.customers, num_days=args.days,
+                                            mean_daily_transactions=args.transactions_per_day,
+                                            seed=args.seed)
+    else:
+        sales_df = generate_sales_data()
     
     # Save to CSV
-    sales_df.to_csv('pet_shop_sales_data.csv', index=False)
-    print(f"Generated {len(sales_df)} sales records spanning {NUM_DAYS} days")
-    print(f"Data saved to pet_shop_sales_data.csv")
+    sales_df.to_csv(args.output, index=False)
+    print(f"Generated {len(sales_df)} sales records spanning {sales_df['date'].nunique()} days")
+    print(f"Data saved to {args.output}")
     
     # Print some basic statistics
     print("\nBasic Statistics:")
@@ -0,0 +1,122 @@
+from basket import MIN_PAIR_BASKETS
+
+DAY_NAMES = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
+
+MONTH_NAMES = {1: 'January', 2: 'February', 3: 'March', 4: 'April', 5: 'May', 6: 'June',
+               7: 'July', 8: 'August', 9: 'September', 10: 'October', 11: 'November', 12: 'December'}
+
+def compute_insights(selection):
+    """Business insights and recommendations for a selection, as plain data.
+
+    Returns a dict with 'insights' and 'recommendations' lists of
+    (title, parts) pairs, where parts is a list of sentences. The dashboard
+    renders them as Dash components and the batch reports as JSON and HTML.
+    """
+    if selection.total_transactions() == 0:
+        return {'insights': [("No Sales: ", ["There were no sales in the selected period and categories."])],
+                'recommendations': []}
+
+    insights = []
+
+    # Top category
+    category_sales = selection.revenue_by('category').sort_values(ascending=False)
+    top_category = category_sales.index[0]
+    top_category_sales = category_sales.iloc[0]
+    total_sales = selection.total_revenue()
+    top_category_percentage = (top_category_sales / total_sales) * 100
+
+    insights.append(("Top Performing Category: ", [
+        f"{top_category} accounts for ${top_category_sales:,.2f} in sales ({top_category_percentage:.1f}% of total revenue)."
+    ]))
+
+    # Top product
+    product_sales = selection.revenue_by('product').sort_values(ascending=False)
+    top_product = product_sales.index[0]
+    top_product_sales = product_sales.iloc[0]
+    top_product_percentage = (top_product_sales / total_sales) * 100
+
+    insights.append(("Best-Selling Product: ", [
+        f"{top_product} generates ${top_product_sales:,.2f} in sales ({top_product_percentage:.1f}% of total revenue)."
+    ]))
+
+    # Weekly pattern insight
+    day_sales = selection.revenue_by_weekday()
+    best_day_idx = day_sales.idxmax()
+    worst_day_idx = day_sales.idxmin()
+
+    insights.append(("Weekly Sales Pattern: ", [
+        f"{DAY_NAMES[best_day_idx]} is the highest-grossing day, while {DAY_NAMES[worst_day_idx]} has the lowest sales. ",
+        "Consider running promotions on slower days to boost traffic and revenue."
+    ]))
+
+    # Seasonal insights
+    month_sales = selection.revenue_by_month()
+    worst_month_idx = None
+    if len(month_sales) > 3:  # Only if we have enough months
+        best_month_idx = month_sales.idxmax()
+        worst_month_idx = month_sales.idxmin()
+
+        insights.append(("Seasonal Trends: ", [
+            f"{MONTH_NAMES[best_month_idx]} shows the highest sales, while {MONTH_NAMES[worst_month_idx]} has the lowest. ",
+            "Plan inventory and staffing accordingly for these seasonal fluctuations."
+        ]))
+
+    # Average basket size
+    avg_basket = selection.average_basket()
+
+    insights.append(("Basket Size: ", [
+        f"The average transaction value is ${avg_basket:.2f}. ",
+        "Consider implementing cross-selling strategies to increase basket size."
+    ]))
+
+    # Customer frequency
+    if selection.approximate:
+        # Sketches count distinct customers but not purchases per customer
+        total_customers = selection.distinct_customers()
+        purchases_per_customer = selection.total_transactions() / total_customers
+
+        insights.append(("Customer Loyalty: ", [
+            f"About {total_customers:,.0f} customers made {purchases_per_customer:.1f} purchases each on average. ",
+            "Implement a loyalty program to increase customer retention and frequency."
+        ]))
+    else:
+        customer_freq = selection.customer_frequency()
+        repeat_customers = (customer_freq > 1).sum()
+        total_customers = len(customer_freq)
+        repeat_percentage = (repeat_customers / total_customers) * 100
+
+        insights.append(("Customer Loyalty: ", [
+            f"{repeat_percentage:.1f}% of customers are repeat shoppers. ",
+            "Implement a loyalty program to increase customer retention and frequency."
+        ]))
+
+    # Cross-selling: the pair bought together most often relative to chance
+    pairs = selection.product_pairs(min_baskets=MIN_PAIR_BASKETS)
+    pairs = pairs[pairs['lift'] > 1]
+    if len(pairs):
+        pair = pairs.iloc[0]
+        cross_selling = [
+            f"Customers who buy {pair['product']} are {pair['lift']:.1f}x as likely as average to also buy {pair['other_product']}. ",
+            "Suggest such complementary products at checkout to increase average transaction value."
+        ]
+    else:
+        cross_selling = ["Train staff to suggest complementary products to increase average transaction value."]
+
+    # Recommendations section
+    recommendations = [
+        ("1. Inventory Optimization: ", [
+            f"Focus on maintaining optimal stock levels for top-selling products, especially {top_product} and other items in the {top_category} category."
+        ]),
+        ("2. Marketing Strategy: ", [
+            f"Increase marketing efforts during {DAY_NAMES[worst_day_idx]} and {MONTH_NAMES.get(worst_month_idx, 'slower months')} to boost sales during slower periods."
+        ]),
+        ("3. Customer Retention: ", [
+            "Implement a customer loyalty program with personalized offers based on purchase history to increase repeat business."
+        ]),
+        ("4. Cross-Selling: ", cross_selling),
+        ("5. Seasonal Promotions: ", [
+            "Plan seasonal promotions and product bundles to capitalize on peak selling periods and mitigate slow seasons."
+        ])
+    ]
+
+    return {'insights': insights, 'recommendations': recommendations}
@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Share of clicks per time period option, roughly as analysts use them
+PERIOD_WEIGHTS = {'30D': 0.3, '90D': 0.25, '6M': 0.15, '1Y': 0.15, 'ALL': 0.15}
+
+# Share of clicks per category selection size; 0 means all categories
+CATEGORY_COUNT_WEIGHTS = {0: 0.5, 1: 0.3, 2: 0.2}
+
+TRIGGER = 'apply-filters-button.n_clicks'
+
+
+def layout_props(layout):
+    """Initial props of every component in a /_dash-layout tree, by component id"""
+    props = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            if isinstance(node['props'].get('id'), str):
+                props[node['props']['id']] = node['props']
+            stack.extend(value for value in node['props'].values() if isinstance(value, (list, dict)))
+    return props
+
+def filter_callbacks(dependencies):
+    """Callbacks the browser fires when Apply Filters is clicked"""
+    return [callback for callback in dependencies
+            if any(f"{item['id']}.{item['property']}" == TRIGGER for item in callback['inputs'])]
+
+def callback_body(callback, values):
+    """_dash-update-component request body for one callback, with values by 'id.property'"""
+    def items(dependencies):
+        return [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in dependencies]
+
+    outputs = [dict(zip(('id', 'property'), output.split('.')))
+               for output in callback['output'].strip('.').split('...')]
+    return {
+        'output': callback['output'],
+        'outputs': outputs if len(outputs) > 1 else outputs[0],
+        'inputs': items(callback['inputs']),
+        'state': items(callback.get('state', [])),
+        'changedPropIds': [TRIGGER],
+    }
+
+def filter_state(rng, props, custom_ranges):
+    """One analyst's filter choice, starting from the layout defaults"""
+    values = {f'{component}.{prop}': value for component, component_props in props.items()
+              for prop, value in component_props.items()}
+    categories = [option['value'] for option in props['category-dropdown']['options']]
+    count = rng.choices(list(CATEGORY_COUNT_WEIGHTS), weights=list(CATEGORY_COUNT_WEIGHTS.values()))[0]
+    values['category-dropdown.value'] = rng.sample(categories, count) if count else categories
+    values['time-period-dropdown.value'] = rng.choices(list(PERIOD_WEIGHTS), weights=list(PERIOD_WEIGHTS.values()))[0]
+
+    if custom_ranges:
+        # Arbitrary ranges mostly miss the result cache
+        first = datetime.fromisoformat(str(props['date-range-picker']['min_date_allowed']))
+        last = datetime.fromisoformat(str(props['date-range-picker']['max_date_allowed']))
+        start = first + timedelta(days=rng.randrange(max((last - first).days, 1)))
+        end = min(last, start + timedelta(days=rng.randrange(7, 365)))
+        values['time-period-dropdown.value'] = 'CUSTOM'
+        values['date-range-picker.start_date'] = start.date().isoformat()
+        values['date-range-picker.end_date'] = end.date().isoformat()
+    return values
+
+async def post_json(host, port, path, body, timeout):
+    """POST body as JSON on a fresh connection; returns the HTTP status and response size"""
+    payload = json.dumps(body).encode()
+    request = (f'POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n'
+               f'Accept-Encoding: gzip\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n').encode()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(request + payload)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1])
+    return status, len(response) - response.find(b'\r\n\r\n') - 4
+
+async def client(number, args, props, callbacks, deadline, results):
+    """One analyst clicking Apply Filters with a new filter choice until the deadline"""
+    rng = random.Random(args.seed + number)
+    n_clicks = 0
+    while time.perf_counter() < deadline:
+        n_clicks += 1
+        values = filter_state(rng, props, args.custom_ranges)
+        values[TRIGGER] = n_clicks
+
+        async def request(callback):
+            started = time.perf_counter()
+            try:
+                status, size = await post_json(args.host, args.port, '/_dash-update-component',
+                                               callback_body(callback, values), args.timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+                status, size = type(e).__name__, 0
+            results['requests'].append((time.perf_counter() - started, status, size))
+
+        # Like the browser, every chart callback of the click is sent at once
+        started = time.perf_counter()
+        await asyncio.gather(*(request(callback) for callback in callbacks))
+        results['clicks'].append(time.perf_counter() - started)
+        if args.think_time:
+            await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+def process_tree(pid):
+    """pid and all its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+def process_usage(pid):
+    """CPU seconds and resident bytes of a server process and its workers (Linux only)"""
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu, rss = 0.0, 0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{member}/statm') as f:
+                rss += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / ticks
+    return cpu, rss
+
+async def sample_usage(pid, samples, stop):
+    while not stop.is_set():
+        samples.append(process_usage(pid)[1])
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+
+def summarize(latencies):
+    """Latency percentiles in milliseconds"""
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    return {name: round(float(np.percentile(values, q)), 2)
+            for name, q in (('p50_ms', 50), ('p90_ms', 90), ('p95_ms', 95), ('p99_ms', 99), ('max_ms', 100))}
+
+async def run_load(args, props, callbacks, server_pid):
+    results = {'requests': [], 'clicks': []}
+    if args.warmup:
+        warmup_deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(client(i, args, props, callbacks, warmup_deadline, {'requests': [], 'clicks': []})
+                               for i in range(args.clients)))
+
+    usage_before = process_usage(server_pid) if server_pid else None
+    stop, rss_samples = asyncio.Event(), []
+    sampler = asyncio.create_task(sample_usage(server_pid, rss_samples, stop)) if server_pid else None
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i, args, props, callbacks, started + args.duration, results)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    if sampler is not None:
+        stop.set()
+        await sampler
+
+    requests = results['requests']
+    errors = [status for _, status, _ in requests if status != 200]
+    report = {
+        'clients': args.clients,
+        'callbacks_per_click': len(callbacks),
+        'seconds': round(elapsed, 2),
+        'requests': len(requests),
+        'clicks': len(results['clicks']),
+        'requests_per_second': round(len(requests) / elapsed, 2),
+        'clicks_per_second': round(len(results['clicks']) / elapsed, 2),
+        'error_rate': round(len(errors) / len(requests), 4) if requests else None,
+        'errors': {str(status): errors.count(status) for status in set(errors)},
+        'mean_response_bytes': round(float(np.mean([size for _, _, size in requests])), 1) if requests else None,
+        'request_latency': summarize([latency for latency, _, _ in requests]),
+        'click_latency': summarize(results['clicks']),
+    }
+    if server_pid:
+        cpu_after, rss_after = process_usage(server_pid)
+        report['server'] = {
+            'cpu_percent': round((cpu_after - usage_before[0]) / elapsed * 100, 1),
+            'rss_mb': round(rss_after / 1e6, 1),
+            'peak_rss_mb': round(max(rss_samples + [rss_after]) / 1e6, 1),
+        }
+    return report
+
+def get_json(url, timeout=10):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+def wait_until_ready(base_url, timeout):
+    """Poll /health until the dashboard has loaded its data"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f'{base_url}/health', timeout=5) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.time() > deadline:
+            raise TimeoutError(f'{base_url} not ready after {timeout:.0f}s')
+        time.sleep(0.5)
+
+def start_server(args):
+    """Run the dashboard on a local port with the threaded Flask server, or args.server_cmd"""
+    if args.server_cmd:
+        # exec, so terminating the shell stops the server and its workers are its children
+        return subprocess.Popen(f'exec {args.server_cmd}', shell=True, env=dict(os.environ, PORT=str(args.port)))
+    command = [sys.executable, '-c',
+               f'import app; app.app.run(host={args.host!r}, port={args.port}, debug=False, threaded=True)']
+    return subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def print_report(report):
+    print(f"{report['clients']} clients for {report['seconds']}s: {report['clicks']} clicks, "
+          f"{report['requests']} callback requests ({report['callbacks_per_click']} per click)")
+    print(f"  throughput   {report['requests_per_second']:>9.1f} req/s  {report['clicks_per_second']:>7.1f} clicks/s")
+    print(f"  errors       {report['error_rate'] or 0:>9.2%}  {report['errors'] or ''}")
+    for name in ('request_latency', 'click_latency'):
+        latency = report[name]
+        print(f"  {name.replace('_', ' '):<15} " + '  '.join(f"{key[:-3]} {value:.1f} ms" for key, value in latency.items()))
+    if 'server' in report:
+        server = report['server']
+        print(f"  server       cpu {server['cpu_percent']:.0f}%  rss {server['rss_mb']:.0f} MB  "
+              f"peak rss {server['peak_rss_mb']:.0f} MB")
+
+def parse_args(argv=None):
+    """Parse command line options for the load test"""
+    parser = argparse.ArgumentParser(description='Replay Apply Filters callbacks against the dashboard from '
+                                                 'concurrent clients')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16],
+                        help='concurrent clients; one run per value')
+    parser.add_argument('--duration', type=float, default=20, help='seconds measured per run')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured load before each run')
+    parser.add_argument('--think-time', type=float, default=0, help='mean seconds a client waits between clicks')
+    parser.add_argument('--custom-ranges', action='store_true',
+                        help='use random custom date ranges, which mostly miss the result cache')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8051)
+    parser.add_argument('--external', action='store_true',
+                        help='load an already running server instead of starting one')
+    parser.add_argument('--server-cmd', help='shell command starting the server on $PORT, '
+                                             'e.g. "gunicorn -w 4 -b 127.0.0.1:$PORT app:server"')
+    parser.add_argument('--server-pid', type=int, help='process to measure CPU and RSS of with --external')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--timeout', type=float, default=60, help='seconds before a request counts as failed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file for the results')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    base_url = f'http://{args.host}:{args.port}'
+    server = None if args.external else start_server(args)
+    try:
+        wait_until_ready(base_url, args.startup_timeout)
+        props = layout_props(get_json(f'{base_url}/_dash-layout'))
+        callbacks = filter_callbacks(get_json(f'{base_url}/_dash-dependencies'))
+        server_pid = server.pid if server is not None else args.server_pid
+        if server_pid and not os.path.exists('/proc'):
+            server_pid = None
+
+        reports = []
+        for clients in args.clients:
+            args.clients = clients
+            report = asyncio.run(run_load(args, props, callbacks, server_pid))
+            print_report(report)
+            reports.append(report)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'timestamp': datetime.now().isoformat(timespec='seconds'), 'runs': reports}, f, indent=2)
+        print(f"Results saved to {args.output}")
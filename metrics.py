@@ -0,0 +1,155 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('dashboard.metrics')
+
+# Histogram bucket upper bounds in seconds, from cache hits to full loads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+    """Per-stage latency histograms, row counters and gauges in Prometheus text format.
+
+    Every stage observation is also logged as one JSON line on the
+    'dashboard.metrics' logger at INFO level. A fraction profile_rate of
+    profiled() blocks run under cProfile; their top functions are logged, and
+    written as .prof files to profile_dir when it is set.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, profile_rate=0.0, profile_dir=None):
+        self.buckets = tuple(buckets)
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self._histograms = {}
+        self._rows = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Time the enclosed block as stage name; set .rows on the yielded record to count rows"""
+        record = StageRecord()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.observe(name, time.perf_counter() - start, record.rows, **labels)
+
+    def observe(self, name, seconds, rows=None, **labels):
+        """Record one run of a stage that took seconds and processed rows"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            if rows is not None:
+                self._rows[key] = self._rows.get(key, 0) + rows
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'stage': name, 'seconds': round(seconds, 6), 'rows': rows, **labels},
+                                   default=str))
+
+    def set_gauge(self, name, value, **labels):
+        """Current value of a point-in-time measurement, e.g. the dataset size"""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def timed(self, name, rows=None):
+        """Decorator timing a method as a stage, counting len(getattr(self, rows)) rows"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(obj, *args, **kwargs):
+                with self.stage(name) as record:
+                    if rows is not None:
+                        record.rows = len(getattr(obj, rows))
+                    return func(obj, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def profiled(self, label):
+        """Run the enclosed block under cProfile for a sampled fraction of calls"""
+        if not self.profile_rate or random.random() >= self.profile_rate:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._report_profile(label, profiler)
+
+    def _report_profile(self, label, profiler):
+        if self.profile_dir:
+            filename = f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}.prof"
+            profiler.dump_stats(os.path.join(self.profile_dir, filename))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+        logger.info(json.dumps({'profile': label, 'stats': summary.getvalue()}))
+
+    def render(self, prefix='dashboard'):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(counts), total, count)
+                          for key, (counts, total, count) in self._histograms.items()}
+            rows = dict(self._rows)
+            gauges = dict(self._gauges)
+
+        lines = [f'# HELP {prefix}_stage_seconds Time spent in each stage',
+                 f'# TYPE {prefix}_stage_seconds histogram']
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            base = (('stage', name),) + labels
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{prefix}_stage_seconds_bucket{_labels(base + (("le", bound),))} {bucket_count}')
+            lines.append(f'{prefix}_stage_seconds_bucket{_labels(base + (("le", "+Inf"),))} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{_labels(base)} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{_labels(base)} {count}')
+
+        lines += [f'# HELP {prefix}_stage_rows_total Rows processed by each stage',
+                  f'# TYPE {prefix}_stage_rows_total counter']
+        for (name, labels), total in sorted(rows.items()):
+            lines.append(f'{prefix}_stage_rows_total{_labels((("stage", name),) + labels)} {total}')
+
+        for gauge in sorted({name for name, _ in gauges}):
+            lines += [f'# TYPE {prefix}_{gauge} gauge']
+            for (name, labels), value in sorted(gauges.items()):
+                if name == gauge:
+                    lines.append(f'{prefix}_{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageRecord:
+    """Mutable details of one stage run"""
+
+    def __init__(self):
+        self.rows = None
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+# Process-wide registry used by the dataset and the app
+registry = Metrics(
+    profile_rate=float(os.environ.get('DASHBOARD_PROFILE_RATE', 0)),
+    profile_dir=os.environ.get('DASHBOARD_PROFILE_DIR')
+)
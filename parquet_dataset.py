@@ -0,0 +1,220 @@
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from basket import scan_pair_statistics
+from customers import CustomerHistory
+from dataset import SalesSelection, _build_aggregates, _typed_frame
+from metrics import registry as metrics
+
+# Columns read from the partitions
+SCAN_COLUMNS = ['transaction_id', 'date', 'customer_id', 'category', 'product',
+                'quantity', 'unit_price', 'total_price', 'discount']
+
+
+class ParquetSalesDataset:
+    """Sales data queried in place from date-partitioned Parquet files.
+
+    A drop-in for SalesDataset when the data does not fit in memory, e.g. the
+    directory written by generate_data.py --stream --partitioned --format
+    parquet. Opening reads only file footers (row counts and date
+    statistics) and the category column. select() scans just the files
+    whose dates overlap the range, one file at a time, with the date and
+    category filters pushed down into the Parquet reader, and keeps only the
+    reduced aggregates of each file, so memory is bounded by the largest
+    partition rather than the whole history.
+
+    Transactions must not span files, which holds for files partitioned by
+    day or month.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        paths = sorted(glob.glob(os.path.join(directory, '*.parquet')))
+        if not paths:
+            raise FileNotFoundError(f"No Parquet files in {directory}")
+        # Taken before reading, so a partition rewritten meanwhile shows up as a change
+        self.version = _files_version(paths)
+
+        self.files = []
+        categories = set()
+        for path in paths:
+            parquet_file = pq.ParquetFile(path)
+            first_date, last_date = _date_statistics(path, parquet_file)
+            self.files.append((path, first_date, last_date, parquet_file.metadata.num_rows))
+            categories.update(pc.unique(pq.read_table(path, columns=['category'])['category']).to_pylist())
+
+        self.categories = sorted(categories)
+        self.start_date = min(first for _, first, _, _ in self.files)
+        self.end_date = max(last for _, _, last, _ in self.files)
+        self.num_rows = sum(rows for _, _, _, rows in self.files)
+        self._customers = None
+        self._customers_lock = threading.Lock()
+
+    def memory_usage(self):
+        """Bytes held between queries: file metadata, which is negligible, and the customer history once built"""
+        return self._customers.nbytes if self._customers is not None else 0
+
+    def refresh(self):
+        """This dataset, or a new one if partitions were added or changed since it was opened"""
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.parquet')))
+        if paths and _files_version(paths) == self.version:
+            return self
+        return ParquetSalesDataset(self.directory)
+
+    def select(self, start_date=None, categories=None, end_date=None):
+        """Aggregates for start_date..end_date (inclusive, open ends when None) and categories (all when empty)"""
+        return ParquetSelection(self, start_date, categories, end_date)
+
+    @property
+    def customer_history(self):
+        """CustomerHistory of every transaction, built on first use from one pass over the partitions in date order"""
+        with self._customers_lock:
+            if self._customers is None:
+                history = CustomerHistory()
+                with metrics.stage('build_customer_history') as stage:
+                    stage.rows = 0
+                    for path, _, last_date, rows in sorted(self.files, key=lambda file: file[1]):
+                        frame = _typed_frame(pq.read_table(path, columns=SCAN_COLUMNS).to_pandas())
+                        history = history.extend(_build_aggregates(frame)['transactions'],
+                                                 last_date.normalize() + pd.Timedelta(days=1))
+                        stage.rows += rows
+                self._customers = history
+            return self._customers
+
+    def scan(self, start_date=None, end_date=None, categories=None):
+        """Yield the line items of each file overlapping the date range, filtered on read"""
+        start = None if start_date is None else pd.Timestamp(start_date)
+        # The end date is inclusive of the whole day
+        stop = None if end_date is None else pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+        conditions = []
+        if start is not None:
+            conditions.append(pc.field('date') >= pa.scalar(start, type=pa.timestamp('ns')))
+        if stop is not None:
+            conditions.append(pc.field('date') < pa.scalar(stop, type=pa.timestamp('ns')))
+        if categories:
+            conditions.append(pc.field('category').isin(sorted(set(categories))))
+        condition = None
+        for part in conditions:
+            condition = part if condition is None else condition & part
+
+        for path, first_date, last_date, _ in self.files:
+            if (start is not None and last_date < start) or (stop is not None and first_date >= stop):
+                continue
+            table = pq.read_table(path, columns=SCAN_COLUMNS, filters=condition)
+            if table.num_rows:
+                yield table.to_pandas()
+
+
+class ParquetSelection(SalesSelection):
+    """One filter applied to a ParquetSalesDataset, reduced to small aggregate tables in one scan.
+
+    Cube-based queries are inherited from SalesSelection. Transaction-based
+    ones are answered from per-day and per-customer transaction counts,
+    which add up exactly across files because transactions never span files.
+    """
+
+    def __init__(self, dataset, start_date=None, categories=None, end_date=None):
+        self.dataset = dataset
+        self.start_date = start_date
+        self.end_date = end_date
+        self.categories = categories
+        self.approximate = False
+
+        cubes, daily_counts, customer_counts = [], [], []
+        with metrics.stage('parquet_scan') as stage:
+            stage.rows = 0
+            for frame in dataset.scan(start_date, end_date, categories):
+                stage.rows += len(frame)
+                aggregates = _build_aggregates(_typed_frame(frame))
+                transactions = aggregates['transactions']
+                cubes.append(aggregates['cube'].astype({'category': str, 'product': str}))
+                daily_counts.append(transactions.groupby('date').size())
+                customer_counts.append(transactions['customer_id'].astype(str).value_counts())
+
+        category_dtype = pd.CategoricalDtype(dataset.categories)
+        if cubes:
+            cube = (pd.concat(cubes, ignore_index=True)
+                    .groupby(['date', 'category', 'product'])[['total_price', 'quantity', 'discount']]
+                    .sum()
+                    .reset_index())
+        else:
+            cube = pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'category': pd.Series(dtype=str),
+                                 'product': pd.Series(dtype=str), 'total_price': pd.Series(dtype=np.float64),
+                                 'quantity': pd.Series(dtype=np.int64), 'discount': pd.Series(dtype=np.float64)})
+        self.cube = cube.astype({'category': category_dtype, 'product': 'category'})
+
+        daily = pd.concat(daily_counts) if daily_counts else pd.Series(dtype=np.int64)
+        self.daily_transactions = daily.groupby(level=0).sum().sort_index().rename_axis('date')
+        customers = pd.concat(customer_counts) if customer_counts else pd.Series(dtype=np.int64)
+        self.customer_transactions = customers.groupby(level=0).sum().rename_axis('customer_id')
+
+    def totals(self):
+        """Headline totals, with revenue summed in cents like the in-memory prefix sums"""
+        return {
+            'revenue': np.round(self.cube['total_price'].to_numpy() * 100).sum() / 100,
+            'quantity': int(self.cube['quantity'].sum()),
+            'discount': float(self.cube['discount'].sum()),
+            'transactions': int(self.daily_transactions.sum()),
+        }
+
+    def compare_previous(self):
+        """Headline totals for this selection and the previous period of the same length (a second scan)"""
+        start_date = self.dataset.start_date.normalize() if self.start_date is None \
+            else pd.Timestamp(self.start_date).normalize()
+        end_date = self.dataset.end_date if self.end_date is None else pd.Timestamp(self.end_date)
+        length = end_date.normalize() - start_date + pd.Timedelta(days=1)
+        previous = self.dataset.select(start_date - length, self.categories, start_date - pd.Timedelta(days=1))
+        return self.totals(), previous.totals()
+
+    def distinct_customers(self):
+        return len(self.customer_transactions)
+
+    def transactions_by_date(self, freq=None):
+        daily = self.daily_transactions.rename('transactions')
+        return daily.resample(freq).sum() if freq else daily
+
+    def transactions_by_weekday(self):
+        daily = self.daily_transactions
+        return daily.groupby(daily.index.dayofweek.rename('day_of_week')).sum().rename('transactions')
+
+    def customer_frequency(self):
+        return self.customer_transactions.rename('transactions')
+
+    def product_pairs(self, min_baskets=1):
+        """Product pair statistics, from a second scan of the selected line items"""
+        with metrics.stage('product_pairs'):
+            frames = self.dataset.scan(self.start_date, self.end_date, self.categories)
+            return scan_pair_statistics(frames, self.total_transactions(), min_baskets)
+
+
+def _files_version(paths):
+    """Digest of the names, sizes and mtimes of paths; changes whenever a partition is added, removed or rewritten"""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+def _date_statistics(path, parquet_file):
+    """First and last date in a Parquet file, from its row group statistics"""
+    column = parquet_file.schema_arrow.get_field_index('date')
+    first_date = last_date = None
+    for i in range(parquet_file.metadata.num_row_groups):
+        statistics = parquet_file.metadata.row_group(i).column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            # No statistics: read the column itself
+            dates = pq.read_table(path, columns=['date'])
+            return pd.Timestamp(pc.min(dates['date']).as_py()), pd.Timestamp(pc.max(dates['date']).as_py())
+        low, high = pd.Timestamp(statistics.min), pd.Timestamp(statistics.max)
+        first_date = low if first_date is None else min(first_date, low)
+        last_date = high if last_date is None else max(last_date, high)
+    return first_date, last_date
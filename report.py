@@ -0,0 +1,276 @@
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.utils
+
+from charts import (dashboard_filters, compact_figure, build_revenue_time_figure, build_category_sales_figure,
+                    build_top_products_figure, build_seasonal_trends_figure, build_weekly_pattern_figure,
+                    build_customer_frequency_figure, build_frequently_bought_together_figure, build_rfm_segments_figure,
+                    build_cohort_retention_figure)
+from dataset import load_sales_data, SalesDataset
+from insights import compute_insights
+
+PERIODS = ['30D', '90D', '6M', '1Y', 'ALL']
+
+# (name, title, builder) for every chart of a report, as on the dashboard
+REPORT_CHARTS = [
+    ('revenue-time', 'Revenue Over Time', build_revenue_time_figure),
+    ('category-sales', 'Sales by Category', build_category_sales_figure),
+    ('top-products', 'Top 10 Best-Selling Products', build_top_products_figure),
+    ('seasonal-trends', 'Seasonal Trends', build_seasonal_trends_figure),
+    ('weekly-pattern', 'Weekly Sales Pattern', build_weekly_pattern_figure),
+    ('customer-frequency', 'Customer Purchasing Frequency', build_customer_frequency_figure),
+    ('frequently-bought-together', 'Frequently Bought Together', build_frequently_bought_together_figure),
+    ('rfm-segments', 'Customer Segments', build_rfm_segments_figure),
+    ('cohort-retention', 'Cohort Retention', build_cohort_retention_figure),
+]
+
+# Datasets by store name; loaded once in the parent and inherited by forked
+# workers, or loaded once per worker where processes are spawned
+_datasets = {}
+
+def open_dataset(path):
+    """Sales data for one store: a CSV loaded in memory or a directory of Parquet partitions"""
+    if os.path.isdir(path):
+        from parquet_dataset import ParquetSalesDataset
+        return ParquetSalesDataset(path)
+    return SalesDataset(load_sales_data(path))
+
+def store_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+def store_names(sources):
+    """A name per source, from its file name, qualified by its directories where file names collide.
+
+    Report files are named after the store, so e.g. north/sales.csv and
+    south/sales.csv become north/sales and south/sales rather than both
+    writing sales_*.html.
+    """
+    paths = [os.path.abspath(path) for path in sources]
+    groups = {}
+    for path in dict.fromkeys(paths):
+        groups.setdefault(slugify(store_name(path)), []).append(path)
+
+    names = {}
+    for group in groups.values():
+        if len(group) == 1:
+            names[group[0]] = store_name(group[0])
+            continue
+        parent = os.path.commonpath(group)
+        for path in group:
+            names[path] = os.path.splitext(os.path.relpath(path, parent))[0].replace(os.sep, '/')
+
+    taken = {}
+    for path, name in names.items():
+        other = taken.setdefault(slugify(name), path)
+        if other != path:
+            raise ValueError(f"Stores {other} and {path} would write reports under the same name")
+    return [names[path] for path in paths]
+
+def _load_datasets(sources):
+    for path, name in zip(sources, store_names(sources)):
+        if name not in _datasets:
+            _datasets[name] = open_dataset(path)
+
+def _warm_datasets():
+    """Build the tables datasets otherwise build on first use, so forked workers inherit them"""
+    for dataset in _datasets.values():
+        if isinstance(dataset, SalesDataset):
+            dataset.baskets
+        dataset.customer_history
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def figure_data(figure):
+    """The traces of a chart reduced to their names and data arrays"""
+    traces = []
+    for trace in figure.data:
+        entry = {'name': trace.name, 'type': trace.type}
+        for prop in ('x', 'y', 'labels', 'values'):
+            if prop in trace and trace[prop] is not None:
+                entry[prop] = trace[prop]
+        traces.append(entry)
+    return traces
+
+def build_report(dataset, time_period, categories):
+    """KPIs, chart figures and insights for one filter combination"""
+    filters = dashboard_filters(dataset, time_period, categories)
+    selection = dataset.select(filters['start_date'], list(filters['categories']), filters['end_date'])
+    totals = selection.totals()
+    figures = {name: compact_figure(builder(selection, filters)) for name, _, builder in REPORT_CHARTS}
+    return {
+        'period': time_period,
+        'categories': list(filters['categories']),
+        'start_date': None if filters['start_date'] is None else filters['start_date'].date().isoformat(),
+        'end_date': (dataset.end_date if filters['end_date'] is None else filters['end_date']).date().isoformat(),
+        'kpis': {
+            'total_revenue': totals['revenue'],
+            'total_transactions': totals['transactions'],
+            'average_basket': totals['revenue'] / totals['transactions'] if totals['transactions'] else 0.0,
+        },
+        'insights': compute_insights(selection),
+    }, figures
+
+def render_html(store, report, figures):
+    """A standalone page for one report, styled like pet_shop_sales_analysis.html"""
+    scope = 'All categories' if not report['categories'] else ', '.join(report['categories'])
+    kpis = report['kpis']
+    cards = ''.join(
+        f'<div class="col-md-4"><div class="card p-3 text-center"><h5>{label}</h5>'
+        f'<h3 class="text-primary">{value}</h3></div></div>'
+        for label, value in [('Total Revenue', f"${kpis['total_revenue']:,.2f}"),
+                             ('Total Transactions', f"{kpis['total_transactions']:,}"),
+                             ('Avg. Basket Size', f"${kpis['average_basket']:.2f}")])
+    charts = ''.join(
+        f'<div class="card p-3"><h5>{title}</h5>'
+        f'{figures[name].to_html(full_html=False, include_plotlyjs=False)}</div>'
+        for name, title, _ in REPORT_CHARTS)
+
+    def paragraphs(items, css_class=''):
+        return ''.join(f'<p class="{css_class}"><strong>{html.escape(title)}</strong>'
+                       f'{html.escape("".join(parts))}</p>' for title, parts in items)
+
+    insights = report['insights']
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Pet Shop Sales Report - {html.escape(store)} - {report['period']}</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
+    <script src="https://cdn.plot.ly/plotly-2.24.2.min.js"></script>
+    <style>
+        body {{ background-color: #f8f9fa; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; padding: 20px; }}
+        .card {{ border-radius: 10px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); margin-bottom: 20px; border: none; }}
+        .recommendation {{ background-color: #f1f8ff; border-left: 4px solid #0d6efd; padding: 10px 15px;
+                          margin-bottom: 10px; border-radius: 0 5px 5px 0; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header class="text-center my-4">
+            <h1 class="display-5">Pet Shop Sales Report</h1>
+            <p class="lead text-muted">{html.escape(store)} &middot; {report['start_date'] or 'start'} to {report['end_date']} &middot; {html.escape(scope)}</p>
+        </header>
+        <div class="row">{cards}</div>
+        {charts}
+        <div class="card p-3">
+            <h5>Key Insights</h5>{paragraphs(insights['insights'])}
+            <h5 class="mt-3">Recommendations</h5>{paragraphs(insights['recommendations'], 'recommendation')}
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+def run_job(job, output_dir, formats):
+    """Build and write one report; runs in a worker process"""
+    store, time_period, categories = job
+    started = time.perf_counter()
+    report, figures = build_report(_datasets[store], time_period, categories)
+    report['store'] = store
+    scope = 'all' if not report['categories'] else '+'.join(slugify(c) for c in report['categories'])
+    basename = f"{slugify(store)}_{time_period}_{scope}"
+
+    files = []
+    if 'json' in formats:
+        report_json = dict(report, charts={name: figure_data(figure) for name, figure in figures.items()})
+        report_json['insights'] = {section: [{'title': title.rstrip(': '), 'text': ''.join(parts)}
+                                             for title, parts in items]
+                                   for section, items in report['insights'].items()}
+        with open(os.path.join(output_dir, basename + '.json'), 'w') as f:
+            json.dump(report_json, f, cls=plotly.utils.PlotlyJSONEncoder)
+        files.append(basename + '.json')
+    if 'html' in formats:
+        with open(os.path.join(output_dir, basename + '.html'), 'w') as f:
+            f.write(render_html(store, report, figures))
+        files.append(basename + '.html')
+
+    return {'store': store, 'period': time_period, 'categories': report['categories'],
+            'kpis': report['kpis'], 'files': files, 'seconds': round(time.perf_counter() - started, 3)}
+
+def plan_jobs(stores, periods, category_sets):
+    return [(store, period, categories) for store in stores for period in periods for categories in category_sets]
+
+def run_reports(sources, output_dir, periods=PERIODS, category_sets=None, per_category=False,
+                formats=('json', 'html'), workers=None):
+    """Write a report for every store, period and category set; returns the index entries in job order.
+
+    Datasets are loaded once before the pool starts. With the fork start
+    method their basket and customer tables are built too, and the workers
+    share all of it copy-on-write; otherwise each worker loads them once in
+    its initializer.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    _load_datasets(sources)
+    stores = store_names(sources)
+
+    category_sets = list(category_sets or [[]])
+    if per_category:
+        categories = sorted(set().union(*(_datasets[store].categories for store in stores)))
+        category_sets += [[category] for category in categories]
+    jobs = plan_jobs(stores, periods, category_sets)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_job(job, output_dir, formats) for job in jobs]
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    if context.get_start_method() == 'fork':
+        # Otherwise every worker would build its own copy
+        _warm_datasets()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_load_datasets, initargs=(sources,)) as executor:
+        futures = [executor.submit(run_job, job, output_dir, formats) for job in jobs]
+        return [future.result() for future in futures]
+
+def write_index(entries, output_dir):
+    """index.json and an index.html linking every report"""
+    with open(os.path.join(output_dir, 'index.json'), 'w') as f:
+        json.dump(entries, f, indent=2)
+    def links(files):
+        return ' '.join(f'<a href="{name}">{os.path.splitext(name)[1][1:]}</a>' for name in files)
+
+    rows = ''.join(
+        f"<tr><td>{html.escape(e['store'])}</td><td>{e['period']}</td>"
+        f"<td>{html.escape(', '.join(e['categories']) or 'All')}</td>"
+        f"<td>${e['kpis']['total_revenue']:,.2f}</td><td>{e['kpis']['total_transactions']:,}</td>"
+        f"<td>{links(e['files'])}</td></tr>"
+        for e in entries)
+    with open(os.path.join(output_dir, 'index.html'), 'w') as f:
+        f.write('<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>Pet Shop Sales Reports</title>'
+                '<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">'
+                '</head><body class="container my-4"><h1>Pet Shop Sales Reports</h1><table class="table table-sm">'
+                '<tr><th>Store</th><th>Period</th><th>Categories</th><th>Revenue</th><th>Transactions</th>'
+                f'<th>Files</th></tr>{rows}</table></body></html>\n')
+
+def parse_args(argv=None):
+    """Parse command line options for batch report generation"""
+    parser = argparse.ArgumentParser(description='Write KPI, chart and insight reports for many filter combinations')
+    parser.add_argument('--data', nargs='+', default=['pet_shop_sales_data.csv'],
+                        help='one sales CSV or Parquet partition directory per store')
+    parser.add_argument('--periods', nargs='+', default=PERIODS, choices=PERIODS, help='time periods to report')
+    parser.add_argument('--categories', action='append', default=None, metavar='CAT1,CAT2',
+                        help='comma-separated category set to report (repeatable; default all categories)')
+    parser.add_argument('--per-category', action='store_true', help='also report every category on its own')
+    parser.add_argument('--format', nargs='+', default=['json', 'html'], choices=['json', 'html'],
+                        help='output formats')
+    parser.add_argument('--output', default='reports', help='directory for the reports')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    category_sets = [[c.strip() for c in spec.split(',') if c.strip()] for spec in args.categories or []]
+    started = time.perf_counter()
+    entries = run_reports(args.data, args.output, periods=args.periods, category_sets=category_sets or None,
+                          per_category=args.per_category, formats=args.format, workers=args.workers)
+    write_index(entries, args.output)
+    print(f"Wrote {len(entries)} reports to {args.output} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Bounded LRU cache for computed dashboard outputs, with optional TTL.
+
+    Entries live in process memory by default. Given a directory, entries are
+    pickled there instead so every worker process sharing the directory
+    shares the cache; least recently used files are removed once more than
+    maxsize are stored. Hit, miss and eviction counters are kept per process.
+    """
+
+    def __init__(self, maxsize=128, ttl=None, directory=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() and storing its result on a miss.
+
+        Concurrent misses for the same key wait for the first caller's result
+        instead of computing it again.
+        """
+        found, value = self._get(key)
+        if not found:
+            with self._lock:
+                event = self._pending.get(key)
+                leader = event is None
+                if leader:
+                    event = self._pending[key] = threading.Event()
+            if not leader:
+                event.wait()
+                found, value = self._get(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if found:
+            return value
+
+        try:
+            value = compute()
+            self._set(key, value)
+        finally:
+            if leader:
+                with self._lock:
+                    del self._pending[key]
+                event.set()
+        return value
+
+    def discard(self, predicate):
+        """Drop the in-memory entries whose key satisfies predicate(key); returns how many"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            if self.directory:
+                for name in os.listdir(self.directory):
+                    if name.endswith('.pkl'):
+                        os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """Counters and current size, for sizing the cache"""
+        with self._lock:
+            size = len(self._disk_entries()) if self.directory else len(self._entries)
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': size,
+                'maxsize': self.maxsize,
+            }
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _get(self, key):
+        if self.directory:
+            return self._disk_get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def _set(self, key, value):
+        if self.directory:
+            self._disk_set(key, value)
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # On-disk backend: one pickle file per key, recency tracked by mtime
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f'{digest}.pkl')
+
+    def _disk_entries(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith('.pkl')]
+
+    def _disk_get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_key, stored_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+        if stored_key != key or self._expired(stored_at):
+            return False, None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, value
+
+    def _disk_set(self, key, value):
+        path = self._path(key)
+        tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((key, time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        entries = self._disk_entries()
+        if len(entries) > self.maxsize:
+            def mtime(entry):
+                try:
+                    return os.path.getmtime(entry)
+                except OSError:
+                    return 0
+            for entry in sorted(entries, key=mtime)[:len(entries) - self.maxsize]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    continue
+                with self._lock:
+                    self.evictions += 1
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import load_sales_data, load_sales_data_and_tail, SalesDataset
+
+# Name of the file holding the version workers should attach to
+CURRENT_FILE = 'CURRENT'
+
+# Tables of a SalesDataset written as column files
+TABLES = ('df', 'cube', 'transactions')
+
+
+def current_version(directory):
+    """Version named by directory's CURRENT file"""
+    with open(os.path.join(directory, CURRENT_FILE)) as f:
+        return f.read().strip()
+
+def is_shared_directory(path):
+    return os.path.isfile(os.path.join(path, CURRENT_FILE))
+
+def publish_dataset(dataset, directory, keep=2):
+    """Write a dataset's tables as memory-mappable column files and make them current.
+
+    Each version lives in its own subdirectory, written under a temporary
+    name and renamed into place once complete; then CURRENT is replaced
+    atomically, so a worker never sees a half-written version. The newest
+    keep versions are kept for workers still attaching to an older one.
+    Returns the version.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f'{dataset.version}-{dataset.num_rows}'
+    target = os.path.join(directory, version)
+    if not os.path.isdir(target):
+        staging = f'{target}.tmp-{os.getpid()}'
+        os.makedirs(staging)
+        meta = {'version': version, 'tables': {}}
+        for name in TABLES:
+            frame = getattr(dataset, name)
+            columns = []
+            for column in frame.columns:
+                values = frame[column]
+                entry = {'name': column}
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    entry['categories'] = values.cat.categories.tolist()
+                    values = values.cat.codes
+                np.save(os.path.join(staging, f'{name}.{column}.npy'), values.to_numpy())
+                columns.append(entry)
+            meta['tables'][name] = columns
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.rename(staging, target)
+
+    pointer = os.path.join(directory, f'{CURRENT_FILE}.tmp-{os.getpid()}')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+    _prune_versions(directory, keep)
+    return version
+
+def _prune_versions(directory, keep):
+    # Workers that mapped a removed version keep reading it until they
+    # refresh; the files are only freed once the last mapping goes away
+    versions = [entry for entry in os.scandir(directory) if entry.is_dir() and '.tmp-' not in entry.name]
+    versions.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    for entry in versions[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def _attach_table(path, name, columns):
+    """DataFrame over memory-mapped column files; no column is copied"""
+    data = {}
+    for entry in columns:
+        values = np.load(os.path.join(path, f"{name}.{entry['name']}.npy"), mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, categories=entry['categories'], validate=False)
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+class SharedSalesDataset(SalesDataset):
+    """A SalesDataset whose tables are memory-mapped from a version published by another process.
+
+    Every worker process attaching to the same version shares one copy of
+    the line items, cube and transaction table through the page cache; only
+    the small prefix sums (and sketches) are built per process. Put the
+    directory on a tmpfs such as /dev/shm to keep it in memory.
+
+    refresh() returns a dataset for the version CURRENT names now, so a
+    publisher can swap in new data without restarting the workers.
+    """
+
+    def __init__(self, directory, version=None, sketch_error=None, exact_below=50000):
+        self.directory = directory
+        self.shared_version = version or current_version(directory)
+        path = os.path.join(directory, self.shared_version)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        tables = {name: _attach_table(path, name, columns) for name, columns in meta['tables'].items()}
+        super().__init__(tables['df'], {'cube': tables['cube'], 'transactions': tables['transactions']},
+                         sketch_error=sketch_error, exact_below=exact_below)
+
+    def refresh(self):
+        """This dataset, or the newly published one if CURRENT has moved on"""
+        version = current_version(self.directory)
+        if version == self.shared_version:
+            return self
+        return SharedSalesDataset(self.directory, version, self.sketch_error, self.exact_below)
+
+    def memory_usage(self):
+        """Bytes private to this process; the mapped tables are shared"""
+        arrays = list(self.range_totals.cumulative.values()) + [self.range_totals.cumulative_transactions]
+        sketch_bytes = self.sketches.nbytes if self.sketches is not None else 0
+        basket_bytes = self._baskets.nbytes if self._baskets is not None else 0
+        customer_bytes = self._customers.nbytes if self._customers is not None else 0
+        return int(sum(a.nbytes for a in arrays)) + sketch_bytes + basket_bytes + customer_bytes
+
+
+def watch_and_publish(csv_path, directory, interval):
+    """Publish the CSV, then republish whenever rows are appended to it or it is rewritten"""
+    df, tail = load_sales_data_and_tail(csv_path)
+    dataset = SalesDataset(df)
+    print(f"Published version {publish_dataset(dataset, directory)} ({dataset.num_rows} rows)")
+    while True:
+        time.sleep(interval)
+        new_rows = tail.read_new_rows()
+        if new_rows is None:
+            df, tail = load_sales_data_and_tail(csv_path)
+            dataset = SalesDataset(df)
+        elif new_rows.empty:
+            continue
+        else:
+            dataset = dataset.append(new_rows)
+        print(f"Published version {publish_dataset(dataset, directory)} ({dataset.num_rows} rows)")
+
+def parse_args(argv=None):
+    """Parse command line options for the shared dataset publisher"""
+    parser = argparse.ArgumentParser(description='Publish sales data as memory-mapped columns for dashboard workers')
+    parser.add_argument('--data', default='pet_shop_sales_data.csv', help='sales CSV to publish')
+    parser.add_argument('--output', default='/dev/shm/pet_shop_sales', help='directory the workers attach to')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help='keep running and republish when the CSV changes, checking this often')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.watch:
+        watch_and_publish(args.data, args.output, args.watch)
+    else:
+        dataset = SalesDataset(load_sales_data(args.data))
+        print(f"Published version {publish_dataset(dataset, args.output)} ({dataset.num_rows} rows) to {args.output}")
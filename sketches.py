@@ -0,0 +1,301 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def precision_for_error(error):
+    """HyperLogLog precision (log2 of the register count) giving at most the relative standard error"""
+    # The standard error of an estimate from m registers is 1.04 / sqrt(m)
+    return min(max(math.ceil(math.log2((1.04 / error) ** 2)), 4), 16)
+
+
+def hash_ranks(hashes, precision):
+    """Register index and rank (position of the first set bit) for 64-bit hashes"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    buckets = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+
+    # Count leading zeros by halving the search width
+    zeros = np.zeros(len(rest), dtype=np.int64)
+    shifted = rest.copy()
+    for width in (32, 16, 8, 4, 2, 1):
+        small = shifted < (np.uint64(1) << np.uint64(64 - width))
+        zeros[small] += width
+        shifted[small] <<= np.uint64(width)
+    ranks = np.minimum(zeros + 1, 64 - precision + 1)
+    ranks[rest == 0] = 64 - precision + 1
+    return buckets, ranks.astype(np.uint8)
+
+
+def estimate(registers):
+    """Distinct-count estimates from HyperLogLog registers along the last axis"""
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    # Linear counting is more accurate while many registers are still empty
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class CellRegisters:
+    """HyperLogLog registers of every (day, category) cell, dense or sparse per cell.
+
+    A cell with few nonzero registers keeps them as (bucket, rank) entries,
+    which is much smaller than a full row of registers for the quiet days
+    and categories of a store; busier cells keep a dense row. Cells are
+    numbered day-major (cell = day * num_categories + category), dense rows
+    and sparse entries are both stored in cell order, so any range of days
+    is a contiguous slice of each.
+    """
+
+    def __init__(self, num_days, num_categories, num_registers, dense_cells, dense, offsets, buckets, ranks):
+        self.num_days = num_days
+        self.num_categories = num_categories
+        self.num_registers = num_registers
+        self.dense_cells = dense_cells
+        self.dense = dense
+        # Sparse entries of cell i are offsets[i]:offsets[i + 1]
+        self.offsets = offsets
+        self.buckets = buckets
+        self.ranks = ranks
+
+    @classmethod
+    def empty(cls, num_days, num_categories, num_registers):
+        return cls(num_days, num_categories, num_registers, np.zeros(0, dtype=np.int64),
+                   np.zeros((0, num_registers), dtype=np.uint8), np.zeros(num_days * num_categories + 1, dtype=np.int64),
+                   np.zeros(0, dtype=np.uint16), np.zeros(0, dtype=np.uint8))
+
+    @classmethod
+    def from_entries(cls, num_days, num_categories, num_registers, cells, buckets, ranks):
+        """Registers holding the largest rank seen for each (cell, bucket) entry"""
+        codes, inverse = np.unique(np.asarray(cells, dtype=np.int64) * num_registers + buckets, return_inverse=True)
+        best = np.zeros(len(codes), dtype=np.uint8)
+        np.maximum.at(best, inverse, ranks)
+        cells, buckets = codes // num_registers, codes % num_registers
+
+        # A sparse entry takes three bytes, a dense register one
+        counts = np.bincount(cells, minlength=num_days * num_categories)
+        is_dense = counts * 3 >= num_registers
+        dense_cells = np.flatnonzero(is_dense)
+        dense = np.zeros((len(dense_cells), num_registers), dtype=np.uint8)
+        in_dense = is_dense[cells]
+        dense[np.searchsorted(dense_cells, cells[in_dense]), buckets[in_dense]] = best[in_dense]
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(np.where(is_dense, 0, counts), out=offsets[1:])
+        return cls(num_days, num_categories, num_registers, dense_cells, dense, offsets,
+                   buckets[~in_dense].astype(np.uint16), best[~in_dense])
+
+    @classmethod
+    def concat(cls, parts):
+        """Registers of consecutive day ranges, in order"""
+        first = parts[0]
+        cell_bases = np.cumsum([0] + [len(part.offsets) - 1 for part in parts])
+        entry_bases = np.cumsum([0] + [part.offsets[-1] for part in parts])
+        offsets = [part.offsets[:-1] + base for part, base in zip(parts, entry_bases)] + [entry_bases[-1:]]
+        return cls(sum(part.num_days for part in parts), first.num_categories, first.num_registers,
+                   np.concatenate([part.dense_cells + base for part, base in zip(parts, cell_bases)]),
+                   np.concatenate([part.dense for part in parts]),
+                   np.concatenate(offsets).astype(np.int64),
+                   np.concatenate([part.buckets for part in parts]),
+                   np.concatenate([part.ranks for part in parts]))
+
+    @property
+    def nbytes(self):
+        return int(sum(a.nbytes for a in (self.dense_cells, self.dense, self.offsets, self.buckets, self.ranks)))
+
+    def entries(self):
+        """Cell, bucket and rank of every nonzero register"""
+        rows, dense_buckets = np.nonzero(self.dense)
+        sparse_cells = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        return (np.concatenate([self.dense_cells[rows], sparse_cells]),
+                np.concatenate([dense_buckets, self.buckets.astype(np.int64)]),
+                np.concatenate([self.dense[rows, dense_buckets], self.ranks]))
+
+    def days(self, start, stop):
+        """Registers of days start..stop-1 (a view, nothing is copied)"""
+        lo, hi = start * self.num_categories, stop * self.num_categories
+        first, last = np.searchsorted(self.dense_cells, [lo, hi])
+        entries = slice(self.offsets[lo], self.offsets[hi])
+        return CellRegisters(stop - start, self.num_categories, self.num_registers,
+                             self.dense_cells[first:last] - lo, self.dense[first:last],
+                             self.offsets[lo:hi + 1] - self.offsets[lo], self.buckets[entries], self.ranks[entries])
+
+    def merged(self, start, stop, codes=None):
+        """Dense registers per day of days start..stop-1, merged over the category codes (all when None)"""
+        part = self.days(start, stop)
+        merged = np.zeros((part.num_days, self.num_registers), dtype=np.uint8)
+
+        cells = part.dense_cells
+        keep = np.ones(len(cells), dtype=bool) if codes is None else np.isin(cells % self.num_categories, codes)
+        cells, rows = cells[keep], part.dense[keep]
+        if len(cells):
+            # Dense rows are in day order, so each day's rows are one run
+            day = cells // self.num_categories
+            runs = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+            merged[day[runs]] = np.maximum.reduceat(rows, runs, axis=0)
+
+        cells = np.repeat(np.arange(len(part.offsets) - 1), np.diff(part.offsets))
+        keep = slice(None) if codes is None else np.isin(cells % self.num_categories, codes)
+        np.maximum.at(merged, (cells[keep] // self.num_categories, part.buckets[keep].astype(np.int64)),
+                      part.ranks[keep])
+        return merged
+
+
+def combine_registers(placed, num_days):
+    """Registers over num_days holding the maximum of each (registers, first day) pair in placed.
+
+    Days covered by a single input are sliced from it as they are and days
+    covered by none are empty, so only overlapping days are recomputed.
+    """
+    num_categories, num_registers = placed[0][0].num_categories, placed[0][0].num_registers
+    bounds = sorted({0, num_days} | {day for registers, offset in placed
+                                     for day in (offset, offset + registers.num_days)})
+    parts = []
+    for start, stop in zip(bounds, bounds[1:]):
+        covering = [(registers, offset) for registers, offset in placed
+                    if offset <= start and stop <= offset + registers.num_days]
+        if not covering:
+            parts.append(CellRegisters.empty(stop - start, num_categories, num_registers))
+        elif len(covering) == 1:
+            registers, offset = covering[0]
+            parts.append(registers.days(start - offset, stop - offset))
+        else:
+            entries = [registers.days(start - offset, stop - offset).entries() for registers, offset in covering]
+            parts.append(CellRegisters.from_entries(stop - start, num_categories, num_registers,
+                                                    *(np.concatenate(column) for column in zip(*entries))))
+    return CellRegisters.concat(parts)
+
+
+class DistinctSketches:
+    """Per-day, per-category HyperLogLog sketches of transactions and customers.
+
+    Registers are kept for every (day, category) cell, so the distinct count
+    for any date range and category selection is the element-wise maximum of
+    the selected cells' registers. Sketches of different stores, of
+    overlapping datasets or of later days merge the same way. Values are
+    hashed from their labels rather than category codes, so sketches built in
+    different processes agree. Only transactions on or after start_date are
+    sketched when it is given.
+    """
+
+    def __init__(self, dataset, error=0.05, start_date=None):
+        self.error = error
+        self.precision = precision_for_error(error)
+        self.categories = list(dataset.categories)
+        self.first_day = dataset.start_date.normalize()
+        if start_date is not None:
+            self.first_day = max(self.first_day, pd.Timestamp(start_date).normalize())
+        num_days = max((dataset.end_date.normalize() - self.first_day).days + 1, 0)
+        num_registers = 1 << self.precision
+
+        transactions = dataset.transactions
+        transactions = transactions[transactions['date'] >= self.first_day]
+        day = (transactions['date'] - self.first_day).dt.days.to_numpy()
+        masks = transactions['mask'].to_numpy()
+        customers = transactions['customer_id']
+        hashes = {
+            'transactions': pd.util.hash_array(transactions['transaction_id'].to_numpy()),
+            'customers': pd.util.hash_array(customers.cat.categories.to_numpy())[customers.cat.codes.to_numpy()],
+        }
+
+        self.registers = {}
+        for name, values in hashes.items():
+            buckets, ranks = hash_ranks(values, self.precision)
+            cells, cell_buckets, cell_ranks = [], [], []
+            for code in range(len(self.categories)):
+                rows = (masks >> code) & 1 == 1
+                cells.append(day[rows] * len(self.categories) + code)
+                cell_buckets.append(buckets[rows])
+                cell_ranks.append(ranks[rows])
+            self.registers[name] = CellRegisters.from_entries(
+                num_days, len(self.categories), num_registers,
+                np.concatenate(cells), np.concatenate(cell_buckets), np.concatenate(cell_ranks))
+
+    @property
+    def num_days(self):
+        return self.registers['transactions'].num_days
+
+    @property
+    def dates(self):
+        return pd.date_range(self.first_day, periods=self.num_days, freq='D')
+
+    @property
+    def nbytes(self):
+        return sum(registers.nbytes for registers in self.registers.values())
+
+    def _with_registers(self, first_day, registers):
+        sketches = object.__new__(DistinctSketches)
+        sketches.error, sketches.precision, sketches.categories = self.error, self.precision, self.categories
+        sketches.first_day = first_day
+        sketches.registers = registers
+        return sketches
+
+    def before(self, date):
+        """Sketches of the days before date"""
+        stop = min(max((pd.Timestamp(date).normalize() - self.first_day).days, 0), self.num_days)
+        return self._with_registers(self.first_day, {name: registers.days(0, stop)
+                                                     for name, registers in self.registers.items()})
+
+    def daily(self, name, start_date=None, end_date=None, categories=None):
+        """Registers per day within start_date..end_date, merged over the selected categories"""
+        num_days = self.num_days
+        start = 0 if start_date is None else (pd.Timestamp(start_date).normalize() - self.first_day).days
+        stop = num_days if end_date is None else (pd.Timestamp(end_date).normalize() - self.first_day).days + 1
+        start, stop = min(max(start, 0), num_days), min(max(stop, 0), num_days)
+        codes = None
+        if categories:
+            codes = sorted(self.categories.index(c) for c in set(categories) if c in self.categories)
+        return self.dates[start:max(start, stop)], self.registers[name].merged(start, max(start, stop), codes)
+
+    def count(self, name, start_date=None, end_date=None, categories=None):
+        """Estimated distinct transactions or customers for a date range and categories"""
+        _, daily = self.daily(name, start_date, end_date, categories)
+        return float(estimate(daily.max(axis=0, initial=0)))
+
+    def count_by_date(self, name, start_date=None, end_date=None, categories=None, freq=None):
+        """Estimated distinct count per day with sales, or per resample bin when freq is given"""
+        dates, daily = self.daily(name, start_date, end_date, categories)
+        active = daily.any(axis=1)
+        if not freq:
+            return pd.Series(np.round(estimate(daily[active])), index=dates[active], name=name).rename_axis('date')
+
+        # Resample bins over the days with sales, as the exact counts do
+        dates, daily = dates[active], daily[active]
+        bins = pd.Series(np.arange(len(dates)), index=dates).resample(freq).agg(['min', 'max'])
+        merged = np.zeros((len(bins), daily.shape[1]), dtype=np.uint8)
+        for i, (first, last) in enumerate(zip(bins['min'], bins['max'])):
+            if not np.isnan(first):
+                merged[i] = daily[int(first):int(last) + 1].max(axis=0)
+        counts = np.where(merged.any(axis=1), np.round(estimate(merged)), 0.0)
+        return pd.Series(counts, index=bins.index, name=name).rename_axis('date')
+
+    def count_by_weekday(self, name, start_date=None, end_date=None, categories=None):
+        """Estimated distinct count per day of week (0 is Monday) with sales"""
+        dates, daily = self.daily(name, start_date, end_date, categories)
+        weekday = dates.dayofweek.to_numpy()
+        counts = {}
+        for day in range(7):
+            registers = daily[weekday == day].max(axis=0, initial=0)
+            if registers.any():
+                counts[day] = float(np.round(estimate(registers)))
+        return pd.Series(counts, name=name, dtype=np.float64).rename_axis('day_of_week')
+
+    def merge(self, other):
+        """Sketches covering both self and other (e.g. two stores), which must share precision and categories"""
+        if other.precision != self.precision or other.categories != self.categories:
+            raise ValueError("Only sketches with the same precision and categories can be merged")
+        if not other.num_days:
+            return self
+        if not self.num_days:
+            return other
+        first_day = min(self.first_day, other.first_day)
+        last_day = max(self.first_day + pd.Timedelta(days=self.num_days - 1),
+                       other.first_day + pd.Timedelta(days=other.num_days - 1))
+        num_days = (last_day - first_day).days + 1
+        return self._with_registers(first_day, {
+            name: combine_registers([(sketches.registers[name], (sketches.first_day - first_day).days)
+                                     for sketches in (self, other)], num_days)
+            for name in self.registers})
@@ -0,0 +1,208 @@
+import os
+import threading
+from collections import OrderedDict
+
+from dataset import load_sales_data_and_tail, read_sales_metadata, SalesDataset
+from metrics import registry as metrics
+from shared_dataset import is_shared_directory, SharedSalesDataset
+
+
+def parse_store_sources(spec):
+    """Store names and data paths from 'name=path,name=path'; a bare path is named after its file"""
+    sources = OrderedDict()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, path = item.partition('=')
+        if not sep:
+            path = name
+            name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+        sources[name.strip()] = path.strip()
+    return sources
+
+
+class StoreRegistry:
+    """Datasets of many stores, loaded on first access and evicted least recently used.
+
+    Each store is a sales CSV, held in memory as a SalesDataset, a
+    directory published by shared_dataset.py, mapped as a SharedSalesDataset,
+    or a directory of Parquet partitions queried in place. Loaded datasets are
+    kept while their combined memory_usage() fits in memory_budget bytes
+    (unbounded when None); the store loaded last is always kept. Memory is
+    measured afresh each time, so baskets and customer histories built since
+    the load count too. on_evict(name), when given, is called after a store
+    is evicted so caches of its results can let go of the dataset. Concurrent
+    first requests for the same store wait for a single load.
+    """
+
+    def __init__(self, sources, memory_budget=None, options=None, on_evict=None):
+        self.sources = OrderedDict(sources)
+        self.memory_budget = memory_budget
+        self.options = options or {}
+        self.on_evict = on_evict
+        self.loads = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Serializes ingest per store so two appends never race
+        self._ingest_locks = {name: threading.Lock() for name in self.sources}
+
+    def names(self):
+        return list(self.sources)
+
+    def peek(self, name):
+        """The store's dataset if it is loaded, without loading it"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return None if entry is None else entry['dataset']
+
+    def metadata(self, name):
+        """Categories and first/last date of a store, cheaply when it is not loaded yet"""
+        dataset = self.peek(name)
+        path = self.sources[name]
+        if dataset is None and os.path.isdir(path):
+            # Opening a Parquet store only reads footers and the category column
+            dataset = self.get(name)
+        if dataset is not None:
+            return {'categories': sorted(dataset.categories),
+                    'start_date': dataset.start_date, 'end_date': dataset.end_date}
+        return read_sales_metadata(path)
+
+    def get(self, name):
+        """The store's dataset, loading it first if needed"""
+        if name not in self.sources:
+            raise KeyError(f"Unknown store: {name}")
+        while True:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    return entry['dataset']
+                event = self._pending.get(name)
+                leader = event is None
+                if leader:
+                    event = self._pending[name] = threading.Event()
+            if not leader:
+                # Another request is loading this store; use its result (or
+                # retry the load if it failed)
+                event.wait()
+                continue
+            try:
+                entry = self._load(name)
+                with self._lock:
+                    self._entries[name] = entry
+                    self.loads += 1
+                    evicted = self._evict(keep=name)
+                self._notify_evicted(evicted)
+                return entry['dataset']
+            finally:
+                with self._lock:
+                    del self._pending[name]
+                event.set()
+
+    def ingest(self, name):
+        """Fold data added to a loaded store's source into its dataset; returns the rows added"""
+        with self._ingest_locks[name]:
+            with self._lock:
+                entry = self._entries.get(name)
+            if entry is None:
+                # Not loaded: the next load reads the source as it is then
+                return 0
+
+            dataset, tail = entry['dataset'], entry['tail']
+            if tail is None:
+                # Parquet or shared store: pick up partitions added or rewritten, or
+                # the version published, since the last check
+                new_dataset = dataset.refresh()
+                if new_dataset is dataset:
+                    return 0
+                rows_added = new_dataset.num_rows - dataset.num_rows
+            else:
+                new_rows = tail.read_new_rows()
+                if new_rows is None:
+                    # The file was rewritten rather than appended to, or its new rows cannot
+                    # be numbered apart from the loaded ones; reload it in full
+                    entry = self._load(name)
+                    new_dataset, tail = entry['dataset'], entry['tail']
+                    rows_added = new_dataset.num_rows
+                elif new_rows.empty:
+                    return 0
+                else:
+                    new_dataset = dataset.append(new_rows)
+                    rows_added = len(new_rows)
+
+            evicted = []
+            with self._lock:
+                if name in self._entries:
+                    self._entries[name] = {'dataset': new_dataset, 'tail': tail}
+                    evicted = self._evict(keep=name)
+            self._notify_evicted(evicted)
+            metrics.set_gauge('dataset_rows', new_dataset.num_rows, store=name)
+            return rows_added
+
+    def stats(self):
+        """Loaded stores with their memory use, and load/eviction counters"""
+        with self._lock:
+            loaded = {name: entry['dataset'].memory_usage() for name, entry in self._entries.items()}
+            return {
+                'stores': len(self.sources),
+                'loaded': loaded,
+                'memory': sum(loaded.values()),
+                'memory_budget': self.memory_budget,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
+
+    def _load(self, name):
+        path = self.sources[name]
+        if os.path.isdir(path) and is_shared_directory(path):
+            # Published by shared_dataset.py: map the current version's columns
+            with metrics.stage('attach_dataset', store=name) as stage:
+                dataset = SharedSalesDataset(path, **self.options)
+                stage.rows = dataset.num_rows
+            tail = None
+        elif os.path.isdir(path):
+            from parquet_dataset import ParquetSalesDataset
+            # Only file footers and the category column are read up front
+            with metrics.stage('open_dataset', store=name) as stage:
+                dataset = ParquetSalesDataset(path)
+                stage.rows = dataset.num_rows
+            tail = None
+        else:
+            # Load data (typed, through the columnar cache when available), with a
+            # tail starting where the load stopped so later rows are ingested alone
+            with metrics.stage('load_sales_data', store=name) as stage:
+                df, tail = load_sales_data_and_tail(path)
+                stage.rows = len(df)
+            # Precompute the aggregate tables every callback is answered from
+            with metrics.stage('build_dataset', store=name) as stage:
+                dataset = SalesDataset(df, **self.options)
+                stage.rows = len(df)
+        metrics.set_gauge('dataset_rows', dataset.num_rows, store=name)
+        return {'dataset': dataset, 'tail': tail}
+
+    def _evict(self, keep):
+        """Evict least recently used stores until the rest fit the budget; returns their names"""
+        # Called with self._lock held
+        evicted = []
+        if self.memory_budget is None:
+            return evicted
+        # Measured now rather than at load: lazily built tables may have grown a dataset since
+        memory = {name: entry['dataset'].memory_usage() for name, entry in self._entries.items()}
+        while sum(memory.values()) > self.memory_budget:
+            victim = next((name for name in self._entries if name != keep), None)
+            if victim is None:
+                break
+            del self._entries[victim]
+            del memory[victim]
+            self.evictions += 1
+            evicted.append(victim)
+        return evicted
+
+    def _notify_evicted(self, evicted):
+        # Called without self._lock, so the callback may use the registry
+        if self.on_evict is not None:
+            for name in evicted:
+                self.on_evict(name)
@@ -0,0 +1,92 @@
+import collections
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import basket
+from basket import BasketIndex, cooccurrence, pair_statistics, scan_pair_statistics
+from dataset import SalesDataset
+
+
+def brute_force_pairs(rows):
+    """Baskets, per-item and per-pair basket counts of line items, by enumeration"""
+    items, pairs = collections.Counter(), collections.Counter()
+    baskets = rows.groupby('transaction_id')[['category', 'product']].apply(
+        lambda group: sorted(set(zip(group['category'].astype(str), group['product'].astype(str)))))
+    for held in baskets:
+        items.update(held)
+        pairs.update(itertools.combinations(held, 2))
+    return len(baskets), items, pairs
+
+@pytest.fixture(params=['scipy', 'numpy'])
+def cooccurrence_path(request, monkeypatch):
+    """Run a test on the sparse matrix product (when scipy is installed) and on the index arithmetic"""
+    if request.param == 'numpy':
+        monkeypatch.setattr(basket, 'sparse', None)
+    elif basket.sparse is None:
+        pytest.skip('scipy is not installed')
+    return request.param
+
+def test_cooccurrence_counts_each_row_once(cooccurrence_path):
+    rng = np.random.default_rng(5)
+    rows = rng.integers(0, 300, 2000)
+    columns = rng.integers(0, 25, 2000)
+    column_counts, first, second, counts = cooccurrence(rows, columns, 25)
+
+    held = collections.defaultdict(set)
+    for row, column in zip(rows, columns):
+        held[row].add(column)
+    expected_columns = collections.Counter(column for row_columns in held.values() for column in row_columns)
+    expected_pairs = collections.Counter(pair for row_columns in held.values()
+                                         for pair in itertools.combinations(sorted(row_columns), 2))
+    assert column_counts.tolist() == [expected_columns[c] for c in range(25)]
+    assert list(zip(first.tolist(), second.tolist())) == sorted(expected_pairs)
+    assert counts.tolist() == [expected_pairs[pair] for pair in sorted(expected_pairs)]
+
+def test_pair_statistics_formulas():
+    pairs = pair_statistics(['a', 'b', 'c'], ['x', 'x', 'y'], np.array([4, 5, 2]),
+                            np.array([0, 1]), np.array([1, 2]), np.array([3, 2]), 10)
+    # Lift of (b, c) is 2 * 10 / (5 * 2) = 2, of (a, b) 3 * 10 / (4 * 5) = 1.5
+    assert pairs[['product', 'other_product']].values.tolist() == [['b', 'c'], ['a', 'b']]
+    np.testing.assert_allclose(pairs['lift'], [2.0, 1.5])
+    np.testing.assert_allclose(pairs['support'], [0.2, 0.3])
+    np.testing.assert_allclose(pairs['confidence'], [0.4, 0.75])
+    np.testing.assert_allclose(pairs['reverse_confidence'], [1.0, 0.6])
+
+@pytest.mark.parametrize('start_date, end_date, categories', [
+    (None, None, []),
+    ('2024-02-01', '2024-03-15', ['Dog Food', 'Dog Toys', 'Cat Food']),
+    ('2024-05-20', None, ['Pet Accessories', 'Health Products']),
+])
+def test_basket_index_matches_enumeration(sales_frame, cooccurrence_path, start_date, end_date, categories):
+    dataset = SalesDataset(sales_frame)
+    pairs = dataset.select(start_date, categories, end_date).product_pairs()
+
+    rows = sales_frame
+    if start_date is not None:
+        rows = rows[rows['date'] >= start_date]
+    if end_date is not None:
+        rows = rows[rows['date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    if categories:
+        rows = rows[rows['category'].isin(categories)]
+    num_baskets, items, expected = brute_force_pairs(rows)
+
+    got = {((p.category, p.product), (p.other_category, p.other_product)): p for p in pairs.itertuples()}
+    assert {pair: p.baskets for pair, p in got.items()} == dict(expected)
+    for (a, b), p in got.items():
+        assert p.lift == pytest.approx(expected[(a, b)] * num_baskets / (items[a] * items[b]))
+        assert p.confidence == pytest.approx(expected[(a, b)] / items[a])
+
+def test_scan_over_frames_matches_the_index(sales_frame):
+    months = sales_frame['date'].dt.to_period('M')
+    frames = [frame for _, frame in sales_frame.groupby(months)]
+    num_baskets = sales_frame['transaction_id'].nunique()
+    scanned = scan_pair_statistics(frames, num_baskets, min_baskets=3)
+    indexed = BasketIndex(SalesDataset(sales_frame)).pair_statistics(num_baskets, min_baskets=3)
+
+    columns = ['product', 'category', 'other_product', 'other_category']
+    scanned, indexed = (pairs.astype({c: str for c in columns}).sort_values(columns, ignore_index=True)
+                        for pairs in (scanned, indexed))
+    pd.testing.assert_frame_equal(scanned, indexed, check_dtype=False)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from customers import CustomerHistory
+from dataset import SalesDataset
+
+
+def assert_same_history(a, b):
+    pd.testing.assert_frame_equal(a.state.sort_index(), b.state.sort_index())
+    pd.testing.assert_series_equal(a.activity.sort_index(), b.activity.sort_index())
+    assert a.through == b.through
+
+def test_extend_in_batches_equals_a_full_build(sales_frame):
+    transactions = SalesDataset(sales_frame).transactions
+    through = transactions['date'].max() + pd.Timedelta(days=1)
+    full = CustomerHistory().extend(transactions, through)
+
+    # Batches cut within a month and on a month boundary
+    history = CustomerHistory()
+    for start, stop in [(None, '2024-02-10'), ('2024-02-10', '2024-03-01'), ('2024-03-01', None)]:
+        dates = transactions['date']
+        batch = transactions[(start is None or dates >= start) & (stop is None or dates < stop)]
+        history = history.extend(batch, through if stop is None else pd.Timestamp(stop))
+    assert_same_history(history, full)
+
+def test_append_extends_the_customer_history(sales_frame):
+    cut = int(np.searchsorted(sales_frame['date'].to_numpy(), np.datetime64('2024-04-20'))) + 5
+    dataset = SalesDataset(sales_frame.iloc[:cut].reset_index(drop=True))
+    dataset.customer_history
+    appended = dataset.append(sales_frame.iloc[cut:].reset_index(drop=True))
+    assert_same_history(appended.customer_history, SalesDataset(sales_frame).customer_history)
+
+def test_rfm_segment_boundaries():
+    # One customer per (recency score, frequency score) pair; five tied
+    # values per column fall into one quintile each
+    last_day = pd.Timestamp('2024-06-30')
+    r_scores, f_scores = np.meshgrid(np.arange(1, 6), np.arange(1, 6), indexing='ij')
+    r_scores, f_scores = r_scores.ravel(), f_scores.ravel()
+    state = pd.DataFrame({
+        'first_date': pd.Timestamp('2024-01-01'),
+        'last_date': last_day - pd.to_timedelta((5 - r_scores) * 10, unit='D'),
+        'transactions': f_scores.astype(np.int64),
+        'revenue': f_scores * 10.0,
+    }, index=pd.Index([f'CUST-{r}{f}' for r, f in zip(r_scores, f_scores)], name='customer_id'))
+    rfm = CustomerHistory(state).rfm()
+
+    assert rfm['r_score'].tolist() == r_scores.tolist()
+    assert rfm['f_score'].tolist() == f_scores.tolist()
+    expected = {
+        5: ['New & Promising', 'New & Promising', 'Loyal', 'Champions', 'Champions'],
+        4: ['New & Promising', 'New & Promising', 'Loyal', 'Champions', 'Champions'],
+        3: ['New & Promising', 'New & Promising', 'Loyal', 'Loyal', 'Loyal'],
+        2: ['Hibernating', 'Hibernating', 'At Risk', 'At Risk', 'At Risk'],
+        1: ['Hibernating', 'Hibernating', 'At Risk', 'At Risk', 'At Risk'],
+    }
+    for r in range(1, 6):
+        assert rfm['segment'][r_scores == r].tolist() == expected[r]
@@ -0,0 +1,108 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import _cache_paths, load_sales_data, load_sales_data_and_tail, SalesDataset
+
+
+def sorted_table(table, keys):
+    """table in a canonical row order with plain string labels, for comparing builds"""
+    labels = {column: str for column in ('category', 'product', 'customer_id') if column in table.columns}
+    return table.astype(labels).sort_values(keys, ignore_index=True)
+
+def test_cache_round_trip_and_invalidation(sales_csv, tmp_path):
+    csv_path = tmp_path / 'sales.csv'
+    shutil.copy(sales_csv, csv_path)
+    cache_dir = tmp_path / 'cache'
+
+    parsed = load_sales_data(csv_path, cache_dir=cache_dir)
+    cached = load_sales_data(csv_path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cached, parsed)
+    assert isinstance(cached['category'].dtype, pd.CategoricalDtype)
+    assert cached['date'].dtype == 'datetime64[ns]'
+
+    # An unchanged CSV is served from the cache, whatever the cache holds
+    cache_path, _ = _cache_paths(csv_path, cache_dir)
+    parsed.head(5).to_parquet(cache_path, index=False)
+    assert len(load_sales_data(csv_path, cache_dir=cache_dir)) == 5
+
+    # Appending to the CSV changes its size, so it is parsed again
+    with open(csv_path, 'a') as f:
+        f.write('TXN-999999,2024-05-29,CUST-0001,Dog Food,Puppy Kibble,1,10.0,10.0,0.0\n')
+    reloaded = load_sales_data(csv_path, cache_dir=cache_dir)
+    assert len(reloaded) == len(parsed) + 1
+    assert len(load_sales_data(csv_path, cache_dir=cache_dir)) == len(parsed) + 1
+
+def test_tail_starts_where_the_load_stopped(sales_csv, tmp_path):
+    csv_path = tmp_path / 'sales.csv'
+    lines = open(sales_csv, 'rb').read().splitlines(keepends=True)
+    # The last line is still being written
+    with open(csv_path, 'wb') as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:12])
+
+    df, tail = load_sales_data_and_tail(csv_path, cache_dir=tmp_path / 'cache')
+    assert len(df) == len(lines) - 2
+    with open(csv_path, 'ab') as f:
+        f.write(lines[-1][12:])
+    new_rows = tail.read_new_rows()
+    assert len(new_rows) == 1
+    assert len(tail.read_new_rows()) == 0
+
+def test_tail_asks_for_a_reload_of_ids_without_numbers(tmp_path):
+    csv_path = tmp_path / 'sales.csv'
+    header = 'transaction_id,date,customer_id,category,product,quantity,unit_price,total_price,discount\n'
+    with open(csv_path, 'w') as f:
+        f.write(header + 'A,2024-05-29,CUST-0001,Dog Food,Puppy Kibble,1,10.0,10.0,0.0\n')
+
+    _, tail = load_sales_data_and_tail(csv_path, use_cache=False)
+    with open(csv_path, 'a') as f:
+        f.write('B,2024-05-29,CUST-0002,Dog Food,Puppy Kibble,1,10.0,10.0,0.0\n')
+    # Numbered on their own, B would get the code of A and merge into its basket
+    assert tail.read_new_rows() is None
+
+@pytest.mark.parametrize('cut_date', ['2024-03-01', '2024-05-20'])
+def test_append_equals_a_full_build(sales_frame, cut_date):
+    # Cut a few rows into the day, so the appended rows share its transactions
+    cut = int(np.searchsorted(sales_frame['date'].to_numpy(), np.datetime64(cut_date))) + 5
+    dataset = SalesDataset(sales_frame.iloc[:cut].reset_index(drop=True))
+    appended = dataset.append(sales_frame.iloc[cut:].reset_index(drop=True))
+    full = SalesDataset(sales_frame)
+
+    assert appended.version == full.version
+    pd.testing.assert_frame_equal(sorted_table(appended.cube, ['date', 'category', 'product']),
+                                  sorted_table(full.cube, ['date', 'category', 'product']), check_dtype=False)
+    pd.testing.assert_frame_equal(sorted_table(appended.transactions, ['transaction_id']),
+                                  sorted_table(full.transactions, ['transaction_id']), check_dtype=False)
+    for name, cumulative in full.range_totals.cumulative.items():
+        np.testing.assert_array_equal(appended.range_totals.cumulative[name], cumulative)
+
+@pytest.mark.parametrize('start_date, end_date, categories', [
+    (None, None, []),
+    ('2024-02-03', '2024-02-03', []),
+    ('2024-01-15', '2024-04-10', ['Dog Food', 'Cat Toys']),
+    ('2024-03-01', None, ['Grooming Services']),
+    ('2023-06-01', '2023-12-31', []),
+])
+def test_range_totals_match_line_items(sales_frame, start_date, end_date, categories):
+    totals = SalesDataset(sales_frame).range_totals.totals(start_date, end_date, categories)
+
+    rows = sales_frame
+    if start_date is not None:
+        rows = rows[rows['date'] >= start_date]
+    if end_date is not None:
+        rows = rows[rows['date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    if categories:
+        rows = rows[rows['category'].isin(categories)]
+    assert totals['revenue'] == pytest.approx(rows['total_price'].sum(), abs=1e-6)
+    assert totals['quantity'] == rows['quantity'].sum()
+    assert totals['discount'] == pytest.approx(rows['discount'].astype(np.float64).sum(), abs=1e-3)
+    assert totals['transactions'] == rows['transaction_id'].nunique()
+
+def test_compare_previous_is_the_range_of_the_same_length_before(sales_frame):
+    range_totals = SalesDataset(sales_frame).range_totals
+    current, previous = range_totals.compare_previous('2024-03-11', '2024-03-20', ['Cat Food'])
+    assert current == range_totals.totals('2024-03-11', '2024-03-20', ['Cat Food'])
+    assert previous == range_totals.totals('2024-03-01', '2024-03-10', ['Cat Food'])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from downsample import downsample_series, lttb_indices
+
+
+def test_short_series_are_kept_whole():
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), np.arange(5), 10), np.arange(5))
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), np.arange(5), 2), np.arange(5))
+
+def test_keeps_threshold_points_in_order_with_both_ends():
+    rng = np.random.default_rng(3)
+    y = rng.normal(size=1000).cumsum()
+    kept = lttb_indices(np.arange(1000), y, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert (np.diff(kept) > 0).all()
+
+def test_keeps_isolated_peaks_and_troughs():
+    y = np.zeros(500)
+    y[123], y[377] = 50.0, -40.0
+    kept = lttb_indices(np.arange(500), y, 20)
+    assert 123 in kept and 377 in kept
+
+def test_matches_a_per_bucket_reference():
+    rng = np.random.default_rng(11)
+    x = np.sort(rng.uniform(0, 100, 257))
+    y = rng.normal(size=257)
+    threshold = 31
+
+    # Each interior bucket keeps the point with the largest triangle spanned
+    # with the previously kept point and the next bucket's mean
+    edges = np.linspace(1, len(y) - 1, threshold - 1).astype(np.int64)
+    buckets = [range(edges[i], edges[i + 1]) for i in range(threshold - 2)] + [range(len(y) - 1, len(y))]
+    expected = [0]
+    for bucket, following in zip(buckets[:-1], buckets[1:]):
+        mean_x, mean_y = x[list(following)].mean(), y[list(following)].mean()
+        a = expected[-1]
+        areas = [abs((x[a] - mean_x) * (y[i] - y[a]) - (x[a] - x[i]) * (mean_y - y[a])) for i in bucket]
+        expected.append(bucket[int(np.argmax(areas))])
+    expected.append(len(y) - 1)
+    np.testing.assert_array_equal(lttb_indices(x, y, threshold), expected)
+
+def test_downsample_series_by_date():
+    index = pd.date_range('2024-01-01', periods=400, freq='D')
+    series = pd.Series(np.sin(np.arange(400) / 10.0), index=index)
+    assert downsample_series(series, 500) is series
+    reduced = downsample_series(series, 50)
+    assert len(reduced) == 50
+    assert reduced.index[0] == index[0] and reduced.index[-1] == index[-1]
+    assert reduced.index.is_monotonic_increasing
+    pd.testing.assert_series_equal(reduced, series.loc[reduced.index])
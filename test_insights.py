@@ -0,0 +1,24 @@
+import pandas as pd
+
+from dataset import SalesDataset
+from insights import compute_insights
+
+
+def test_insights_for_selection_without_sales(sales_frame):
+    dataset = SalesDataset(sales_frame)
+    day = dataset.end_date.normalize() + pd.Timedelta(days=3)
+    selection = dataset.select(day, ['Grooming Services'], day)
+    assert selection.total_transactions() == 0
+
+    report = compute_insights(selection)
+    assert [title for title, _ in report['insights']] == ["No Sales: "]
+    assert report['recommendations'] == []
+
+def test_insights_name_top_category_and_product(sales_frame):
+    selection = SalesDataset(sales_frame).select(None, [], None)
+    report = compute_insights(selection)
+    titles = dict(report['insights'])
+    top_category = selection.revenue_by('category').idxmax()
+    top_product = selection.revenue_by('product').idxmax()
+    assert titles["Top Performing Category: "][0].startswith(top_category)
+    assert titles["Best-Selling Product: "][0].startswith(top_product)
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import SalesDataset
+from parquet_dataset import ParquetSalesDataset
+
+SELECTIONS = [
+    (None, [], None),
+    (pd.Timestamp('2024-02-10'), ['Dog Food', 'Cat Toys'], pd.Timestamp('2024-04-05')),
+    (pd.Timestamp('2024-05-01'), ['Grooming Services'], None),
+]
+
+
+def assert_same_series(a, b):
+    """Equal values under the same labels, whatever the label dtypes"""
+    if not isinstance(a.index, (pd.DatetimeIndex, pd.MultiIndex)):
+        a, b = a.rename(index=str), b.rename(index=str)
+    a, b = a.sort_index(), b.sort_index()
+    assert list(a.index) == list(b.index)
+    np.testing.assert_allclose(a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64), atol=1e-6)
+
+@pytest.fixture
+def datasets(sales_partitions, sales_frame):
+    return ParquetSalesDataset(str(sales_partitions)), SalesDataset(sales_frame)
+
+def test_open_reads_the_same_extent(datasets):
+    parquet, memory = datasets
+    assert parquet.categories == memory.categories
+    assert (parquet.start_date, parquet.end_date) == (memory.start_date, memory.end_date)
+    assert parquet.num_rows == memory.num_rows
+
+@pytest.mark.parametrize('start_date, categories, end_date', SELECTIONS)
+def test_selections_match_the_in_memory_dataset(datasets, start_date, categories, end_date):
+    parquet, memory = (dataset.select(start_date, categories, end_date) for dataset in datasets)
+    assert parquet.totals() == memory.totals()
+    assert parquet.compare_previous() == memory.compare_previous()
+    assert parquet.distinct_customers() == memory.distinct_customers()
+    for method, args in [('revenue_by_date', ('M',)), ('transactions_by_date', ()),
+                         ('transactions_by_date', ('W-MON',)), ('revenue_by', ('product',)),
+                         ('revenue_by_month_and_category', ()),
+                         ('revenue_by_weekday', ()), ('transactions_by_weekday', ()), ('customer_frequency', ())]:
+        assert_same_series(getattr(parquet, method)(*args), getattr(memory, method)(*args))
+
+    columns = ['product', 'category', 'other_product', 'other_category', 'baskets']
+    pairs = [selection.product_pairs(min_baskets=2)[columns + ['lift']].astype({c: str for c in columns[:4]})
+             .sort_values(columns[:4], ignore_index=True) for selection in (parquet, memory)]
+    pd.testing.assert_frame_equal(pairs[0], pairs[1], check_dtype=False)
+
+def test_customer_history_matches(datasets):
+    parquet, memory = (dataset.customer_history for dataset in datasets)
+    pd.testing.assert_frame_equal(parquet.state.sort_index(), memory.state.sort_index(), check_index_type=False)
+    pd.testing.assert_series_equal(parquet.activity.sort_index(), memory.activity.sort_index())
+
+def test_refresh_reopens_only_after_a_change(sales_partitions, tmp_path):
+    for name in os.listdir(sales_partitions):
+        shutil.copy(sales_partitions / name, tmp_path / name)
+    dataset = ParquetSalesDataset(str(tmp_path))
+    assert dataset.refresh() is dataset
+
+    os.remove(tmp_path / sorted(os.listdir(tmp_path))[-1])
+    refreshed = dataset.refresh()
+    assert refreshed is not dataset
+    assert refreshed.version != dataset.version
+    assert refreshed.end_date < dataset.end_date
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset import SalesDataset
+from shared_dataset import current_version, is_shared_directory, publish_dataset, SharedSalesDataset, TABLES
+
+
+def in_memory(frame):
+    """frame with every column read into ordinary arrays"""
+    columns = {}
+    for column, values in frame.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = pd.Categorical.from_codes(np.array(values.cat.codes), dtype=values.dtype)
+        else:
+            columns[column] = np.array(values)
+    return pd.DataFrame(columns, index=frame.index)
+
+def test_attached_dataset_equals_the_published_one(sales_frame, tmp_path):
+    dataset = SalesDataset(sales_frame)
+    version = publish_dataset(dataset, tmp_path)
+    assert is_shared_directory(tmp_path)
+    assert current_version(tmp_path) == version
+
+    attached = SharedSalesDataset(str(tmp_path))
+    assert attached.version == dataset.version
+    for name in TABLES:
+        pd.testing.assert_frame_equal(in_memory(getattr(attached, name)), getattr(dataset, name))
+    # The line items are read from the mapped files rather than copied
+    assert isinstance(attached.df['customer_id'].array.codes, np.memmap)
+
+    for start_date, categories, end_date in [(None, [], None), ('2024-03-01', ['Cat Food', 'Dog Toys'], '2024-04-30')]:
+        shared = attached.select(start_date, categories, end_date)
+        memory = dataset.select(start_date, categories, end_date)
+        assert shared.totals() == memory.totals()
+        pd.testing.assert_series_equal(shared.customer_frequency(), memory.customer_frequency())
+        pd.testing.assert_series_equal(shared.revenue_by('product'), memory.revenue_by('product'))
+
+def test_refresh_attaches_to_newly_published_versions(sales_frame, tmp_path):
+    cut = int(np.searchsorted(sales_frame['date'].to_numpy(), np.datetime64('2024-05-01')))
+    first = SalesDataset(sales_frame.iloc[:cut].reset_index(drop=True))
+    publish_dataset(first, tmp_path)
+    attached = SharedSalesDataset(str(tmp_path))
+    assert attached.refresh() is attached
+
+    appended = first.append(sales_frame.iloc[cut:].reset_index(drop=True))
+    publish_dataset(appended, tmp_path)
+    refreshed = attached.refresh()
+    assert refreshed.num_rows == len(sales_frame)
+    assert refreshed.version == SalesDataset(sales_frame).version
+    # The old version is still readable by workers that have not refreshed
+    assert attached.select().totals() == first.select().totals()
+
+def test_publish_keeps_the_newest_versions(sales_frame, tmp_path):
+    days = sales_frame['date'].dt.normalize().to_numpy()
+    for cut_date in ['2024-02-01', '2024-03-01', '2024-04-01']:
+        cut = int(np.searchsorted(days, np.datetime64(cut_date)))
+        latest = publish_dataset(SalesDataset(sales_frame.iloc[:cut].reset_index(drop=True)), tmp_path, keep=2)
+    versions = [entry.name for entry in os.scandir(tmp_path) if entry.is_dir()]
+    assert len(versions) == 2
+    assert latest in versions
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import SalesDataset
+from sketches import CellRegisters, DistinctSketches, estimate, hash_ranks, precision_for_error
+
+
+def test_precision_for_error():
+    assert precision_for_error(0.05) == 9
+    assert precision_for_error(0.02) == 12
+    assert precision_for_error(0.5) == 4
+    assert precision_for_error(0.0001) == 16
+
+@pytest.mark.parametrize('num_values', [10, 1000, 100000])
+def test_estimates_are_within_the_standard_error(num_values):
+    precision = 10
+    hashes = np.random.default_rng(num_values).integers(0, np.iinfo(np.uint64).max, num_values, dtype=np.uint64,
+                                                       endpoint=True)
+    buckets, ranks = hash_ranks(hashes, precision)
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    np.maximum.at(registers, buckets, ranks)
+    # Four standard errors of 1.04 / sqrt(m)
+    assert abs(estimate(registers) - num_values) <= 4 * 1.04 / 2 ** (precision / 2) * num_values
+
+def test_hash_ranks_count_leading_zeros():
+    hashes = np.array([0xFFFF_FFFF_FFFF_FFFF, 0x0000_8000_0000_0000, 0x0000_0000_0000_0000], dtype=np.uint64)
+    buckets, ranks = hash_ranks(hashes, 4)
+    np.testing.assert_array_equal(buckets, [15, 0, 0])
+    # After the 4 bucket bits: a set bit right away, 12 zeros first, and all zeros
+    np.testing.assert_array_equal(ranks, [1, 13, 61])
+
+@pytest.mark.parametrize('start_date, end_date, categories', [
+    (None, None, []),
+    ('2024-02-01', '2024-03-31', ['Dog Food', 'Cat Toys']),
+])
+def test_dataset_counts_are_within_the_error(sales_frame, start_date, end_date, categories):
+    dataset = SalesDataset(sales_frame, sketch_error=0.05)
+    selection = SalesDataset(sales_frame).select(start_date, categories, end_date)
+    sketches = dataset.sketches
+    exact = {'transactions': selection.total_transactions(), 'customers': selection.distinct_customers()}
+    for name, count in exact.items():
+        assert abs(sketches.count(name, start_date, end_date, categories) - count) <= 4 * 0.05 * count
+    daily = sketches.count_by_date('transactions', start_date, end_date, categories)
+    expected = selection.transactions_by_date()
+    assert daily.index.equals(expected.index)
+    assert (abs(daily - expected) <= np.maximum(4 * 0.05 * expected, 1)).all()
+
+def assert_same_registers(a, b):
+    assert (a.num_days, a.num_categories, a.num_registers) == (b.num_days, b.num_categories, b.num_registers)
+    for field in ('dense_cells', 'dense', 'offsets', 'buckets', 'ranks'):
+        np.testing.assert_array_equal(getattr(a, field), getattr(b, field))
+
+def test_append_extends_sketches_like_a_full_build(sales_frame):
+    # Cut inside the last week, in the middle of a day
+    dates = sales_frame['date'].to_numpy()
+    cut = int(np.searchsorted(dates, (sales_frame['date'].max() - pd.Timedelta(days=5)).to_datetime64())) + 3
+    dataset = SalesDataset(sales_frame.iloc[:cut].reset_index(drop=True), sketch_error=0.05)
+    appended = dataset.append(sales_frame.iloc[cut:].reset_index(drop=True))
+    rebuilt = SalesDataset(sales_frame, sketch_error=0.05)
+
+    assert appended.sketches.first_day == rebuilt.sketches.first_day
+    for name in ('transactions', 'customers'):
+        assert_same_registers(appended.sketches.registers[name], rebuilt.sketches.registers[name])
+
+def test_merge_of_overlapping_sketches_takes_register_maxima(sales_frame):
+    dataset = SalesDataset(sales_frame)
+    first = DistinctSketches(dataset, 0.1).before('2024-03-15')
+    second = DistinctSketches(dataset, 0.1, start_date='2024-02-01')
+    merged = first.merge(second)
+    full = DistinctSketches(dataset, 0.1)
+    for name in ('transactions', 'customers'):
+        assert_same_registers(merged.registers[name], full.registers[name])
+
+def test_cells_with_few_registers_are_sparse():
+    cells = np.array([0, 0, 1, 1, 1, 3])
+    buckets = np.array([2, 2, 0, 1, 2, 3])
+    ranks = np.array([1, 4, 2, 2, 2, 5], dtype=np.uint8)
+    registers = CellRegisters.from_entries(2, 2, 4, cells, buckets, ranks)
+
+    # Three nonzero registers of four make cell 1 dense
+    np.testing.assert_array_equal(registers.dense_cells, [1])
+    np.testing.assert_array_equal(registers.dense, [[2, 2, 2, 0]])
+    np.testing.assert_array_equal(registers.offsets, [0, 1, 1, 1, 2])
+    np.testing.assert_array_equal(registers.merged(0, 2), [[2, 2, 4, 0], [0, 0, 0, 5]])
+    np.testing.assert_array_equal(registers.merged(0, 2, [0]), [[0, 0, 4, 0], [0, 0, 0, 0]])
@@ -0,0 +1,19 @@
+from stores import StoreRegistry
+
+
+def test_eviction_counts_tables_built_after_the_load(sales_csv):
+    evicted = []
+    stores = StoreRegistry({'north': str(sales_csv), 'south': str(sales_csv)}, on_evict=evicted.append)
+    north = stores.get('north')
+    loaded = north.memory_usage()
+    north.customer_history
+    grown = north.memory_usage() - loaded
+    assert grown > 0
+    assert stores.stats()['loaded'] == {'north': loaded + grown}
+
+    # Both stores fit as loaded, but not with north's customer history
+    stores.memory_budget = 2 * loaded + grown // 2
+    stores.get('south')
+    assert stores.peek('north') is None
+    assert evicted == ['north']
+    assert stores.stats()['evictions'] == 1